@@ -6,7 +6,9 @@ import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.settings import GEMINI_API_KEY, GEMINI_MODEL
+from config.settings import GEMINI_API_KEY, GEMINI_MODEL, LLM_CACHE_ENABLED
+from utils.llm_cache import get_llm_cache
+from utils.llm_client import generate_text, CircuitOpenError
 
 class BaseAgent:
     """
@@ -17,29 +19,52 @@ class BaseAgent:
         self.agent_type = agent_type
         genai.configure(api_key=GEMINI_API_KEY)
         self.model = genai.GenerativeModel(GEMINI_MODEL)
+        self.model_name = GEMINI_MODEL
+        self.response_cache = get_llm_cache() if LLM_CACHE_ENABLED else None
     
-    def call_gemini(self, prompt, temperature=0.7, timeout=120):
+    def call_gemini(self, prompt, temperature=0.7, timeout=120, use_cache=True):
         """
         Call Gemini AI with given prompt
         
+        Identical (model, prompt, temperature) requests are answered from the
+        shared response cache; failed calls are never cached. Transient errors
+        are retried within the timeout, and while the circuit breaker is open
+        the call returns None immediately so callers use their fallbacks.
+        
         Args:
             prompt: The prompt to send to Gemini
             temperature: Creativity level (0.0-1.0)
-            timeout: Request timeout in seconds (not currently enforced by SDK)
+            timeout: Total seconds allowed, including retries
+            use_cache: Set False to always call the model
             
         Returns:
             The AI response text
         """
+        cache_key = None
+        if use_cache and self.response_cache is not None:
+            cache_key = self.response_cache.make_key(self.model_name, prompt, temperature)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                print(f"[{self.agent_type}] Gemini response served from cache")
+                return cached
+        
         try:
             print(f"[{self.agent_type}] Calling Gemini AI...")
-            response = self.model.generate_content(
+            text = generate_text(
+                self.model,
                 prompt,
+                timeout=timeout,
                 generation_config=genai.types.GenerationConfig(
                     temperature=temperature,
                 )
             )
             print(f"[{self.agent_type}] Gemini response received")
-            return response.text
+            if cache_key is not None:
+                self.response_cache.set(cache_key, text)
+            return text
+        except CircuitOpenError:
+            print(f"[{self.agent_type}] Gemini circuit open - skipping AI call")
+            return None
         except Exception as e:
             print(f"[{self.agent_type}] Error calling Gemini: {str(e)}")
             import traceback
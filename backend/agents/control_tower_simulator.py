@@ -158,8 +158,11 @@ CRITICAL RULES:
 Generate the simulation plan now:"""
 
         try:
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
+            # Simulations should differ run to run, so bypass the response cache
+            response_text = self.call_gemini(prompt, temperature=1.0, timeout=120, use_cache=False)
+            if not response_text:
+                raise ValueError("No response from Gemini")
+            response_text = response_text.strip()
             
             # Extract JSON from markdown code blocks if present
             if "```json" in response_text:
@@ -12,8 +12,11 @@ from config.settings import (
     BASE_RATE_PER_MILE,
     FUEL_SURCHARGE_PERCENT,
     DETENTION_RATE_PER_HOUR,
-    AVERAGE_MPG
+    AVERAGE_MPG,
+    MIN_TRUCK_UTILIZATION
 )
+from utils.cost_engine import cost_load_rows, summarize_costs
+from utils.stop_sequencer import StopSequencer
 
 class CostAnalyzerAgent(BaseAgent):
     """
@@ -23,19 +26,46 @@ class CostAnalyzerAgent(BaseAgent):
     def __init__(self):
         super().__init__(agent_type="CostAnalyzer")
     
-    def analyze_costs(self, load_plan, route_plan):
+    def analyze_costs(self, load_plan, route_plan, use_ai=True, facilities=None):
         """
         Analyze costs for loads and routes
         
+        Every number comes from the deterministic cost engine; Gemini only
+        writes the narrative recommendations.
+        
         Args:
             load_plan: Optimized load plan from LoadOptimizerAgent
-            route_plan: Route plan from RoutePlannerAgent
+            route_plan: Route plan from RoutePlannerAgent (single or batch)
+            use_ai: Ask Gemini for recommendations
+            facilities: Optional facility rows used to geocode stops
             
         Returns:
             Detailed cost analysis with savings opportunities
         """
+        load_rows = cost_load_rows(load_plan, route_plan, sequencer=StopSequencer(facilities))
+        return self.analyze_cost_rows(load_rows, use_ai=use_ai)
+    
+    def analyze_cost_rows(self, load_rows, use_ai=True):
+        """
+        Build the cost analysis from per-load cost rows (fresh or stored)
+        
+        Args:
+            load_rows: Rows from utils.cost_engine.cost_load_rows
+            use_ai: Ask Gemini for recommendations
+            
+        Returns:
+            Cost analysis wrapped in {"cost_analysis": ...}
+        """
+        analysis = dict(summarize_costs(load_rows), loads=load_rows)
         
-        analysis_data = self._format_data_for_ai(load_plan, route_plan)
+        recommendations = self._ai_recommendations(analysis) if use_ai and analysis['loads'] else None
+        analysis['recommendations'] = recommendations or self._basic_recommendations(analysis)
+        analysis['recommendations_source'] = 'ai' if recommendations else 'rules'
+        return {"cost_analysis": analysis}
+    
+    def _ai_recommendations(self, analysis):
+        """Narrative recommendations from Gemini for an already-costed plan (None on failure)"""
+        analysis_data = self._format_data_for_ai(analysis)
         
         prompt = f"""You are a logistics cost analyst specializing in transportation economics.
 
@@ -45,143 +75,69 @@ COST PARAMETERS:
 - Detention Rate: ${DETENTION_RATE_PER_HOUR}/hour
 - Average Fuel Economy: {AVERAGE_MPG} MPG
 
-LOAD AND ROUTE DATA:
+COSTED PLAN (figures are final - do not recalculate them):
 {analysis_data}
 
 TASK:
-Provide a comprehensive cost analysis that includes:
-1. Detailed cost breakdown per load
-2. Total transportation costs
-3. Cost per order
-4. Comparison to unoptimized baseline (estimated)
-5. Specific savings opportunities identified
-6. Recommendations for further cost reduction
+Recommend specific actions to reduce cost further (lanes, consolidation,
+utilization, detention, carrier negotiation).
 
 Return your response as a JSON object with this structure:
 {{
-    "cost_analysis": {{
-        "loads": [
-            {{
-                "load_id": "LOAD_001",
-                "base_freight_cost": 2125.00,
-                "fuel_surcharge": 318.75,
-                "detention_fees": 0,
-                "total_load_cost": 2443.75,
-                "cost_per_mile": 2.875,
-                "orders_in_load": 3,
-                "cost_per_order": 814.58
-            }}
-        ],
-        "totals": {{
-            "total_freight_cost": 6500.00,
-            "total_fuel_surcharge": 975.00,
-            "total_detention": 0,
-            "grand_total": 7475.00,
-            "total_orders": 10,
-            "avg_cost_per_order": 747.50
-        }},
-        "baseline_comparison": {{
-            "unoptimized_cost_estimate": 10200.00,
-            "optimized_cost": 7475.00,
-            "savings_amount": 2725.00,
-            "savings_percent": 26.7
-        }},
-        "savings_breakdown": [
-            {{
-                "category": "Load Consolidation",
-                "amount": 1800.00,
-                "description": "Reduced from 6 trucks to 3 through optimal consolidation"
-            }},
-            {{
-                "category": "Route Optimization",
-                "amount": 625.00,
-                "description": "Eliminated 250 miles through efficient routing"
-            }},
-            {{
-                "category": "Truck Utilization",
-                "amount": 300.00,
-                "description": "Improved capacity utilization from 65% to 85%"
-            }}
-        ],
-        "recommendations": [
-            "Consider negotiating volume discounts with carriers for this lane",
-            "Explore backhaul opportunities to reduce empty miles",
-            "Implement real-time fuel price monitoring for route adjustments"
-        ]
-    }}
+    "recommendations": [
+        "Consider negotiating volume discounts with carriers for this lane",
+        "Explore backhaul opportunities to reduce empty miles"
+    ]
 }}
 """
         
-        # Call Gemini AI
         response = self.call_gemini(prompt, temperature=0.4)
-        
-        if response:
-            try:
-                # Extract JSON from response
-                json_start = response.find('{')
-                json_end = response.rfind('}') + 1
-                json_str = response[json_start:json_end]
-                cost_analysis = json.loads(json_str)
-                return cost_analysis
-            except Exception as e:
-                print(f"Error parsing AI response: {str(e)}")
-                return self._create_basic_analysis(load_plan, route_plan)
-        else:
-            return self._create_basic_analysis(load_plan, route_plan)
+        if not response:
+            return None
+        try:
+            json_start = response.find('{')
+            json_end = response.rfind('}') + 1
+            recommendations = json.loads(response[json_start:json_end]).get('recommendations')
+            if isinstance(recommendations, list) and recommendations:
+                return [str(r) for r in recommendations]
+        except Exception as e:
+            print(f"Error parsing AI response: {str(e)}")
+        return None
     
-    def _format_data_for_ai(self, load_plan, route_plan):
-        """Format load and route data for AI analysis"""
-        summary = ["LOAD PLAN SUMMARY:"]
-        
-        if load_plan and 'loads' in load_plan:
-            for load in load_plan['loads']:
-                summary.append(
-                    f"  {load.get('load_id', 'N/A')}: "
-                    f"{len(load.get('orders', []))} orders, "
-                    f"{load.get('total_weight_lbs', 0)} lbs, "
-                    f"{load.get('utilization_percent', 0)}% utilization"
-                )
-        
-        summary.append("\nROUTE PLAN SUMMARY:")
-        if route_plan and 'route' in route_plan:
-            route = route_plan['route']
+    def _format_data_for_ai(self, analysis, max_loads=10):
+        """Summarize a costed plan for the prompt (totals plus the most expensive loads)"""
+        totals = analysis['totals']
+        baseline = analysis['baseline_comparison']
+        summary = [
+            f"Loads: {totals['total_loads']}, Orders: {totals['total_orders']}, Miles: {totals['total_miles']}",
+            f"Grand Total: ${totals['grand_total']} (freight ${totals['total_freight_cost']}, "
+            f"fuel surcharge ${totals['total_fuel_surcharge']}, detention ${totals['total_detention']})",
+            f"Avg Cost/Order: ${totals['avg_cost_per_order']}, Avg Cost/Mile: ${totals['avg_cost_per_mile']}",
+            f"Unconsolidated Baseline: ${baseline['unoptimized_cost_estimate']} "
+            f"(savings {baseline['savings_percent']}%)",
+            f"Loads Below Target Utilization: {len(analysis['low_utilization_loads'])}",
+            f"Loads With Detention: {len(analysis['detention_loads'])}",
+            "\nMOST EXPENSIVE LOADS:"
+        ]
+        for load in sorted(analysis['loads'], key=lambda l: l['total_load_cost'], reverse=True)[:max_loads]:
             summary.append(
-                f"  Total Miles: {route.get('total_miles', 0)}, "
-                f"Drive Time: {route.get('total_drive_time_hours', 0)} hours, "
-                f"Stops: {len(route.get('stops', []))}"
+                f"  {load['load_id']}: ${load['total_load_cost']}, {load['miles']} mi, "
+                f"{load['orders_in_load']} orders, ${load['cost_per_order']}/order"
             )
-        
         return "\n".join(summary)
     
-    def _create_basic_analysis(self, load_plan, route_plan):
-        """Fallback: Create basic cost analysis without AI"""
-        total_miles = 0
-        total_loads = 0
-        
-        if route_plan and 'route' in route_plan:
-            total_miles = route_plan['route'].get('total_miles', 0)
-        
-        if load_plan and 'loads' in load_plan:
-            total_loads = len(load_plan['loads'])
-        
-        base_cost = total_miles * BASE_RATE_PER_MILE
-        fuel_surcharge = base_cost * FUEL_SURCHARGE_PERCENT
-        total_cost = base_cost + fuel_surcharge
-        
-        return {
-            "cost_analysis": {
-                "totals": {
-                    "total_freight_cost": round(base_cost, 2),
-                    "total_fuel_surcharge": round(fuel_surcharge, 2),
-                    "grand_total": round(total_cost, 2),
-                    "total_loads": total_loads
-                },
-                "baseline_comparison": {
-                    "optimized_cost": round(total_cost, 2),
-                    "savings_percent": 0
-                },
-                "recommendations": [
-                    "AI analysis unavailable - basic calculation performed"
-                ]
-            }
-        }
+    def _basic_recommendations(self, analysis):
+        """Rule-based recommendations when AI is off or unavailable"""
+        recommendations = []
+        if analysis['low_utilization_loads']:
+            recommendations.append(
+                f"{len(analysis['low_utilization_loads'])} loads are below {int(MIN_TRUCK_UTILIZATION * 100)}% "
+                f"utilization - hold them for incremental planning or consolidate by lane")
+        if analysis['detention_loads']:
+            recommendations.append(
+                f"{len(analysis['detention_loads'])} loads incur detention - shift departures to match delivery windows")
+        if analysis['baseline_comparison']['savings_amount'] > 0:
+            recommendations.append(
+                f"Consolidation saves ${analysis['baseline_comparison']['savings_amount']} "
+                f"({analysis['baseline_comparison']['savings_percent']}%) versus direct shipments")
+        return recommendations or ["No cost issues detected in this plan"]
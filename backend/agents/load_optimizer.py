@@ -12,8 +12,14 @@ from config.settings import (
     MAX_TRUCK_WEIGHT_LBS, 
     MAX_TRUCK_VOLUME_CUFT,
     TRUCK_TYPES,
-    TARGET_TRUCK_UTILIZATION
+    TARGET_TRUCK_UTILIZATION,
+    LOAD_PACKING_STRATEGY,
+    LOAD_OPTIMIZER_AI_POSTPASS,
+    LOAD_OPTIMIZER_AI_MAX_ORDERS,
+    LOAD_OPTIMIZER_WORKERS
 )
+from utils.load_packer import pack_orders, pack_into_open_loads
+from utils.stop_sequencer import StopSequencer
 
 class LoadOptimizerAgent(BaseAgent):
     """
@@ -23,26 +29,94 @@ class LoadOptimizerAgent(BaseAgent):
     def __init__(self):
         super().__init__(agent_type="LoadOptimizer")
     
-    def optimize_loads(self, orders):
+    def optimize_loads(self, orders, use_ai=None, strategy=LOAD_PACKING_STRATEGY, facilities=None,
+                       workers=LOAD_OPTIMIZER_WORKERS, first_load_number=1):
         """
         Optimize orders into efficient truck loads
         
         Args:
             orders: List of order dictionaries with weight, volume, origin, destination
+            use_ai: Run Gemini as a refinement pass over the packed plan
+                    (defaults to LOAD_OPTIMIZER_AI_POSTPASS)
+            strategy: Bin packing strategy ('best_fit' or 'first_fit')
+            facilities: Optional facility rows used to geocode stops
+            workers: Processes used to pack origins in parallel (1 = in-process)
+            first_load_number: Number of the first LOAD_### created
             
         Returns:
             Optimized load plan with truck assignments
         """
         
-        # If too many orders, use fallback instead of AI
-        if len(orders) > 500:
-            print(f"[LOAD OPTIMIZER] {len(orders)} orders detected - using fallback algorithm instead of AI")
-            return self._create_basic_load_plan(orders)
+        # Deterministic bin packing is always the baseline plan
+        sequencer = StopSequencer(facilities)
+        load_plan = self._create_basic_load_plan(orders, strategy=strategy, sequencer=sequencer, workers=workers,
+                                                 first_load_number=first_load_number)
+        print(f"[LOAD OPTIMIZER] Packed {len(orders)} orders into {len(load_plan['loads'])} loads ({strategy})")
         
-        print(f"[LOAD OPTIMIZER] Optimizing {len(orders)} orders with AI")
+        if use_ai is None:
+            use_ai = LOAD_OPTIMIZER_AI_POSTPASS
+        if not use_ai:
+            return load_plan
+        
+        # If too many orders, keep the packed plan instead of prompting the AI
+        if len(orders) > LOAD_OPTIMIZER_AI_MAX_ORDERS:
+            print(f"[LOAD OPTIMIZER] {len(orders)} orders detected - skipping AI post-pass")
+            return load_plan
+        
+        return self._refine_with_ai(orders, load_plan)
+    
+    def extend_load_plan(self, orders, open_loads, strategy=LOAD_PACKING_STRATEGY, facilities=None,
+                         first_load_number=1):
+        """
+        Incrementally plan new orders against loads that are still open
+        
+        New orders go into the residual capacity of open loads first (same
+        origin and direction), and only the remainder opens new loads.
+        
+        Args:
+            orders: New unplanned orders
+            open_loads: Open loads with 'id', 'load_number', 'origin' and current 'orders'
+            strategy: Bin packing strategy ('best_fit' or 'first_fit')
+            facilities: Optional facility rows used to geocode stops
+            first_load_number: Number of the first new LOAD_### created
+            
+        Returns:
+            Load plan with new 'loads' plus 'extended_loads' (open loads that
+            received orders, fully re-sequenced)
+        """
+        sequencer = StopSequencer(facilities)
+        orders_by_origin = {}
+        for order in orders:
+            orders_by_origin.setdefault(order.get('origin', 'Unknown'), []).append(order)
+        
+        extended, new_loads = pack_into_open_loads(open_loads, orders_by_origin, strategy=strategy, sequencer=sequencer)
+        for load_counter, load in enumerate(new_loads, first_load_number):
+            load['load_id'] = f"LOAD_{str(load_counter).zfill(3)}"
+        self._annotate_loads(extended + new_loads)
+        
+        added = sum(len(load['added_order_ids']) for load in extended)
+        print(f"[LOAD OPTIMIZER] Incremental: {added} orders into {len(extended)} open loads, "
+              f"{len(orders) - added} orders into {len(new_loads)} new loads")
+        
+        plan = self._summarize_plan(new_loads, len(orders), strategy)
+        plan['extended_loads'] = extended
+        plan['summary'].update({
+            'incremental': True,
+            'open_loads_considered': len(open_loads),
+            'open_loads_extended': len(extended),
+            'orders_added_to_open_loads': added
+        })
+        return plan
+    
+    def _refine_with_ai(self, orders, baseline_plan):
+        """
+        Ask Gemini to improve a packed plan; keep the baseline unless the AI plan is valid
+        """
+        print(f"[LOAD OPTIMIZER] Refining {len(baseline_plan['loads'])} packed loads with AI")
         
         # Build context for AI
         orders_summary = self._format_orders_for_ai(orders)
+        baseline_summary = self._format_plan_for_ai(baseline_plan)
         
         prompt = f"""You are a logistics expert specializing in load optimization for trucking.
 
@@ -55,8 +129,11 @@ TRUCK CONSTRAINTS:
 ORDERS TO OPTIMIZE:
 {orders_summary}
 
+BASELINE PLAN (from bin packing - every order is already assigned):
+{baseline_summary}
+
 TASK:
-Create an optimal load plan that:
+Improve the baseline plan (or return it unchanged) so that it:
 1. Groups orders from the SAME ORIGIN into multi-stop loads
 2. Creates efficient delivery routes with multiple destination stops per truck
 3. Sequences stops logically (e.g., geographic proximity, delivery windows)
@@ -127,12 +204,33 @@ IMPORTANT: Include the full order object with stop_sequence field in the "orders
                 json_end = response.rfind('}') + 1
                 json_str = response[json_start:json_end]
                 load_plan = json.loads(json_str)
-                return load_plan
+                if self._is_valid_plan(load_plan, orders):
+                    return load_plan
+                print("[LOAD OPTIMIZER] AI plan failed validation - keeping packed plan")
             except Exception as e:
                 print(f"Error parsing AI response: {str(e)}")
-                return self._create_basic_load_plan(orders)
-        else:
-            return self._create_basic_load_plan(orders)
+        return baseline_plan
+    
+    def _is_valid_plan(self, load_plan, orders):
+        """Check that a plan assigns every order exactly once within truck capacity"""
+        weights = {o.get('id'): o.get('weight_lbs') or 0 for o in orders}
+        volumes = {o.get('id'): o.get('volume_cuft') or 0 for o in orders}
+        seen = set()
+        
+        for load in load_plan.get('loads', []):
+            load_ids = [o.get('id') for o in load.get('orders', [])]
+            if any(order_id not in weights or order_id in seen for order_id in load_ids):
+                return False
+            seen.update(load_ids)
+            
+            # Single-order loads may be oversized; consolidated loads must fit
+            if len(load_ids) > 1:
+                if sum(weights[i] for i in load_ids) > MAX_TRUCK_WEIGHT_LBS:
+                    return False
+                if sum(volumes[i] for i in load_ids) > MAX_TRUCK_VOLUME_CUFT:
+                    return False
+        
+        return len(seen) == len(weights)
     
     def _format_orders_for_ai(self, orders):
         """Format orders into readable text for AI"""
@@ -147,8 +245,30 @@ IMPORTANT: Include the full order object with stop_sequence field in the "orders
             )
         return "\n".join(summary)
     
-    def _create_basic_load_plan(self, orders):
-        """Fallback: Create basic multi-stop load plan without AI"""
+    def _format_plan_for_ai(self, load_plan):
+        """Format a packed load plan into readable text for AI"""
+        summary = []
+        for load in load_plan.get('loads', []):
+            order_ids = ', '.join(str(o.get('id')) for o in load['orders'])
+            summary.append(
+                f"{load['load_id']} ({load['origin']}): "
+                f"{load['total_weight_lbs']} lbs, {load['total_volume_cuft']} cu.ft, "
+                f"Orders: {order_ids}"
+            )
+        return "\n".join(summary)
+    
+    def _create_basic_load_plan(self, orders, strategy=LOAD_PACKING_STRATEGY, sequencer=None,
+                                workers=LOAD_OPTIMIZER_WORKERS, first_load_number=1):
+        """
+        Deterministic multi-stop load plan without AI
+
+        Orders are grouped by origin (loads never mix pickup points), each
+        origin is packed with weight + volume aware bin packing, and stops are
+        sequenced geographically by the given StopSequencer. With
+        sequencer=None stop ordering is skipped: stops keep destination order
+        and loads carry no route miles. With workers > 1 the origins are
+        packed in a process pool.
+        """
         # Group orders by origin
         orders_by_origin = {}
         for order in orders:
@@ -157,94 +277,29 @@ IMPORTANT: Include the full order object with stop_sequence field in the "orders
                 orders_by_origin[origin] = []
             orders_by_origin[origin].append(order)
         
-        loads = []
-        load_counter = 1
-        
-        # Create multi-stop loads for each origin
-        for origin, origin_orders in orders_by_origin.items():
-            current_load = {
-                "load_id": f"LOAD_{str(load_counter).zfill(3)}",
-                "truck_type": "DRY_VAN",
-                "origin": origin,
-                "orders": [],
-                "total_weight_lbs": 0,
-                "total_volume_cuft": 0
-            }
-            
-            # Sort orders by destination (simple alphabetical for basic version)
-            # In real optimization, this would use geographic coordinates
-            sorted_orders = sorted(origin_orders, key=lambda x: x.get('destination', ''))
-            
-            stop_sequence = 1
-            
-            for order in sorted_orders:
-                weight = order.get('weight_lbs', 0)
-                volume = order.get('volume_cuft', 0)
-                
-                # Check if order fits in current load
-                if (current_load['total_weight_lbs'] + weight <= MAX_TRUCK_WEIGHT_LBS and
-                    current_load['total_volume_cuft'] + volume <= MAX_TRUCK_VOLUME_CUFT):
-                    # Add to current load with stop sequence
-                    current_load['orders'].append({
-                        'id': order.get('id'),
-                        'order_number': order.get('order_number'),
-                        'customer': order.get('customer'),
-                        'origin': order.get('origin'),
-                        'destination': order.get('destination'),
-                        'weight_lbs': weight,
-                        'volume_cuft': volume,
-                        'priority': order.get('priority', 'Normal'),
-                        'stop_sequence': stop_sequence
-                    })
-                    current_load['total_weight_lbs'] += weight
-                    current_load['total_volume_cuft'] += volume
-                    stop_sequence += 1
-                else:
-                    # Close current load and start new one
-                    if current_load['orders']:
-                        loads.append(current_load)
-                        load_counter += 1
-                    
-                    # Start new load with this order
-                    current_load = {
-                        "load_id": f"LOAD_{str(load_counter).zfill(3)}",
-                        "truck_type": "DRY_VAN",
-                        "origin": origin,
-                        "orders": [{
-                            'id': order.get('id'),
-                            'order_number': order.get('order_number'),
-                            'customer': order.get('customer'),
-                            'origin': order.get('origin'),
-                            'destination': order.get('destination'),
-                            'weight_lbs': weight,
-                            'volume_cuft': volume,
-                            'priority': order.get('priority', 'Normal'),
-                            'stop_sequence': 1
-                        }],
-                        "total_weight_lbs": weight,
-                        "total_volume_cuft": volume
-                    }
-                    stop_sequence = 2
-            
-            # Add last load for this origin
-            if current_load['orders']:
-                loads.append(current_load)
-                load_counter += 1
+        # Create multi-stop loads for each origin, numbered in a stable order
+        loads = pack_orders(orders_by_origin, strategy=strategy, sequencer=sequencer, workers=workers)
+        for load_counter, load in enumerate(loads, first_load_number):
+            load['load_id'] = f"LOAD_{str(load_counter).zfill(3)}"
         
-        # Calculate utilization for each load
-        total_utilization = 0
+        self._annotate_loads(loads)
+        return self._summarize_plan(loads, len(orders), strategy)
+    
+    def _annotate_loads(self, loads):
+        """Add utilization and reasoning to packed loads"""
         for load in loads:
             weight_util = (load['total_weight_lbs'] / MAX_TRUCK_WEIGHT_LBS) * 100
             volume_util = (load['total_volume_cuft'] / MAX_TRUCK_VOLUME_CUFT) * 100
             load['utilization_percent'] = round(min(weight_util, volume_util))
-            total_utilization += load['utilization_percent']
             
             # Add reasoning
             num_stops = len(load['orders'])
             destinations = [o['destination'] for o in load['orders']]
-            load['reasoning'] = f"Multi-stop load from {load['origin']} with {num_stops} delivery stops: {', '.join(destinations[:3])}{'...' if num_stops > 3 else ''}"
-        
-        avg_util = round(total_utilization / len(loads)) if loads else 0
+            load['reasoning'] = f"Multi-stop load from {load['origin']} with {num_stops} delivery stops: {', '.join(destinations[:3])}{'...' if num_stops > 3 else ''} ({load.get('total_miles', 0)} mi)"
+    
+    def _summarize_plan(self, loads, total_orders, strategy):
+        """Wrap annotated loads in a plan with summary statistics"""
+        avg_util = round(sum(load['utilization_percent'] for load in loads) / len(loads)) if loads else 0
         
         # Calculate estimated cost savings from consolidation
         # More stops per load = higher savings
@@ -254,9 +309,10 @@ IMPORTANT: Include the full order object with stop_sequence field in the "orders
         return {
             "loads": loads,
             "summary": {
-                "total_orders": len(orders),
+                "total_orders": total_orders,
                 "total_loads": len(loads),
                 "avg_utilization": avg_util,
-                "cost_savings_percent": cost_savings
+                "cost_savings_percent": cost_savings,
+                "packing_strategy": strategy
             }
         }
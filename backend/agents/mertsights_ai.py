@@ -4,7 +4,8 @@ Converts natural language questions into SQL queries and returns insights as tab
 """
 
 import google.generativeai as genai
-from config.settings import GEMINI_API_KEY, GEMINI_MODEL
+from config.settings import GEMINI_API_KEY, GEMINI_MODEL, MERTSIGHTS_LLM_TIMEOUT_SECONDS
+from utils.llm_client import generate_text
 import json
 import re
 from datetime import datetime
@@ -67,9 +68,10 @@ products: id, product_id, name, description, carton_length_in, carton_width_in,
           carton_height_in, carton_weight_lbs, units_per_pallet, is_hazmat, hs_code,
           created_at, updated_at
 
--- COST_ANALYSIS TABLE (load cost breakdowns)
+-- COST_ANALYSIS TABLE (precomputed load cost breakdowns, one row per load; join loads ON loads.id = load_id)
 cost_analysis: id, load_id, base_freight_cost, fuel_surcharge, detention_fees,
-               total_cost, cost_per_mile, analysis_data, created_at
+               total_cost, cost_per_mile, cost_per_order, total_miles, baseline_cost,
+               analysis_data, content_hash, created_at, updated_at
 
 COMMON QUERIES:
 - Orders: status (Pending, Assigned, In Transit, Delivered), priority (Normal, High, Urgent)
@@ -150,8 +152,7 @@ Respond with ONLY this JSON (no markdown):
 }}"""
 
         try:
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
+            result_text = generate_text(self.model, prompt, timeout=MERTSIGHTS_LLM_TIMEOUT_SECONDS).strip()
             
             # Clean markdown if present
             result_text = re.sub(r'^```json\s*', '', result_text)
@@ -327,8 +328,7 @@ SECURITY RULES (CRITICAL):
 Generate the SQL query now:"""
 
         try:
-            response = self.model.generate_content(prompt)
-            sql = response.text.strip()
+            sql = generate_text(self.model, prompt, timeout=MERTSIGHTS_LLM_TIMEOUT_SECONDS).strip()
             
             # Clean up response (remove markdown code blocks if present)
             sql = re.sub(r'^```sql\s*', '', sql)
@@ -595,8 +595,7 @@ Respond with ONLY a JSON object (no markdown, no explanation):
 }}"""
         
         try:
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
+            result_text = generate_text(self.model, prompt, timeout=MERTSIGHTS_LLM_TIMEOUT_SECONDS).strip()
             
             # Clean up response
             result_text = re.sub(r'^```json\s*', '', result_text)
@@ -664,8 +663,7 @@ Generate a brief, conversational insight (2-3 sentences) that:
 Insight:"""
 
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            return generate_text(self.model, prompt, timeout=MERTSIGHTS_LLM_TIMEOUT_SECONDS).strip()
         except Exception as e:
             print(f"[MERTSIGHTS] Insight generation failed: {str(e)}")
             return f"Found {num_rows} results matching your query."
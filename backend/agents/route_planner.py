@@ -3,6 +3,8 @@ Route Planner Agent
 Optimizes delivery routes for efficiency
 """
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import sys
 import os
 
@@ -10,28 +12,175 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from agents.base_agent import BaseAgent
 from config.settings import (
     MAX_DRIVING_HOURS_PER_DAY,
-    AVERAGE_SPEED_MPH
+    AVERAGE_SPEED_MPH,
+    ROUTE_PLANNER_USE_AI,
+    ROUTE_PLANNER_AI_MIN_STOPS,
+    ROUTE_PLANNER_AI_WORKERS
 )
+from utils.stop_sequencer import StopSequencer
+from utils.hos_eta import schedule_routes
 
 class RoutePlannerAgent(BaseAgent):
     """
     AI Agent that optimizes delivery routes
     """
     
-    def __init__(self):
+    def __init__(self, facilities=None):
         super().__init__(agent_type="RoutePlanner")
+        self.sequencer = StopSequencer(facilities)
     
-    def plan_route(self, load_data):
+    def plan_route(self, load_data, use_ai=None):
         """
         Create optimized delivery route for a load
         
         Args:
             load_data: Dictionary with origin, destinations, and constraints
+            use_ai: Ask Gemini for the route instead of the local sequencer
+                    (defaults to ROUTE_PLANNER_USE_AI)
             
         Returns:
             Optimized route plan with stops and timing
         """
         
+        if use_ai is None:
+            use_ai = ROUTE_PLANNER_USE_AI
+        if not use_ai:
+            return self._create_basic_route(load_data)
+        
+        return self._plan_route_ai(load_data) or self._create_basic_route(load_data)
+    
+    def plan_routes(self, loads, use_ai=None, workers=ROUTE_PLANNER_AI_WORKERS,
+                    ai_min_stops=ROUTE_PLANNER_AI_MIN_STOPS, on_progress=None):
+        """
+        Route a whole load plan in one call
+        
+        Every load is sequenced locally (one distance matrix per origin). With
+        AI enabled, loads with at least ai_min_stops stops are sent to Gemini
+        on a bounded thread pool, so wall time follows the slowest call rather
+        than the sum; a failed AI route keeps its local sequence.
+        
+        Args:
+            loads: Loads in load plan format (origin + orders) or route
+                   request format (origin + destinations)
+            use_ai: Ask Gemini for long routes (defaults to ROUTE_PLANNER_USE_AI)
+            workers: Concurrent Gemini calls
+            ai_min_stops: Fewest stops for a load to be worth an AI call
+            on_progress: Optional callback(routed, total)
+            
+        Returns:
+            Dictionary with per-load 'routes' (input order) and a 'summary'
+        """
+        if use_ai is None:
+            use_ai = ROUTE_PLANNER_USE_AI
+        started = time.monotonic()
+        report = on_progress or (lambda routed, total: None)
+        requests = [self.route_request(load) for load in loads]
+        
+        # One matrix per origin covering every stop its loads visit
+        stops_by_origin = {}
+        for request in requests:
+            stops_by_origin.setdefault(request.get('origin'), set()).update(
+                dest.get('location') for dest in request.get('destinations', []))
+        for origin, locations in stops_by_origin.items():
+            if origin:
+                self.sequencer.prepare(origin, sorted(location for location in locations if location))
+        
+        results = [None] * len(requests)
+        ai_indexes = []
+        for i, request in enumerate(requests):
+            try:
+                route = self._create_basic_route(request, schedule=False)
+                results[i] = dict(route, load_id=request.get('load_id'), method='sequencer')
+                if use_ai and len(route['route']['stops']) >= ai_min_stops:
+                    ai_indexes.append(i)
+            except Exception as e:
+                results[i] = {'load_id': request.get('load_id'), 'method': 'sequencer', 'error': str(e)}
+        # HOS timing for the whole batch in one vectorized pass
+        self._apply_schedules([(results[i], requests[i]) for i in range(len(requests)) if 'error' not in results[i]])
+        report(len(requests) - len(ai_indexes), len(requests))
+        
+        routed = len(requests) - len(ai_indexes)
+        if ai_indexes:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(ai_indexes))),
+                                    thread_name_prefix='route-ai') as executor:
+                futures = {executor.submit(self._plan_route_ai, requests[i]): i for i in ai_indexes}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        ai_route = future.result()
+                    except Exception as e:
+                        print(f"[ROUTE PLANNER] AI routing failed for {requests[i].get('load_id')}: {str(e)}")
+                        ai_route = None
+                    if ai_route and isinstance(ai_route.get('route'), dict):
+                        results[i] = dict(ai_route, load_id=requests[i].get('load_id'), method='ai')
+                    else:
+                        results[i]['method'] = 'sequencer_fallback'
+                    routed += 1
+                    report(routed, len(requests))
+        
+        return {'routes': results, 'summary': self._summarize_routes(results, time.monotonic() - started)}
+    
+    @staticmethod
+    def route_request(load):
+        """
+        Route request (origin + destinations) for a load
+        
+        Loads from a load plan carry their 'orders'; those are grouped by
+        destination in stop order. Loads that already have 'destinations'
+        are returned unchanged.
+        """
+        if 'destinations' in load:
+            return load
+        destinations = {}
+        for order in sorted(load.get('orders', []), key=lambda o: o.get('stop_sequence') or 0):
+            location = order.get('destination', 'Unknown')
+            dest = destinations.setdefault(location, {
+                'location': location, 'orders': [], 'delivery_window': None,
+                'delivery_window_start': None, 'delivery_window_end': None, 'must_arrive_by_date': None
+            })
+            dest['orders'].append(str(order.get('order_number') or order.get('id')))
+            for field in ('delivery_window_start', 'delivery_window_end', 'must_arrive_by_date'):
+                value = order.get(field)
+                if value and (dest[field] is None or str(value) < str(dest[field])):
+                    dest[field] = value
+            dest['delivery_window'] = dest['delivery_window_end'] or dest['must_arrive_by_date']
+        return {
+            'load_id': load.get('load_id') or load.get('load_number'),
+            'origin': load.get('origin'),
+            'truck_type': load.get('truck_type', 'DRY_VAN'),
+            'departure_time': load.get('departure_time'),
+            'destinations': [dict(dest, delivery_window=dest['delivery_window'] or 'Flexible')
+                             for dest in destinations.values()]
+        }
+    
+    @staticmethod
+    def _summarize_routes(results, elapsed_seconds):
+        """Aggregate miles, drive time and routing methods over a batch"""
+        def number(value):
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return 0.0
+        
+        routes = [r['route'] for r in results if 'error' not in r]
+        scores = [number(route.get('route_efficiency_score')) for route in routes
+                  if route.get('route_efficiency_score') is not None]
+        methods = [r['method'] for r in results]
+        return {
+            'total_loads': len(results),
+            'routed': len(routes),
+            'failed': len(results) - len(routes),
+            'routed_with_ai': methods.count('ai'),
+            'ai_fallbacks': methods.count('sequencer_fallback'),
+            'total_stops': sum(len(route.get('stops', [])) for route in routes),
+            'total_miles': round(sum(number(route.get('total_miles')) for route in routes), 1),
+            'total_drive_time_hours': round(sum(number(route.get('total_drive_time_hours')) for route in routes), 2),
+            'avg_route_efficiency': round(sum(scores) / len(scores), 1) if scores else 0,
+            'elapsed_seconds': round(elapsed_seconds, 2)
+        }
+    
+    def _plan_route_ai(self, load_data):
+        """Ask Gemini for the route; returns None when there is no usable answer"""
         load_summary = self._format_load_for_ai(load_data)
         
         prompt = f"""You are a logistics expert specializing in route optimization for trucking.
@@ -94,9 +243,7 @@ Return your response as a JSON object with this structure:
                 return route_plan
             except Exception as e:
                 print(f"Error parsing AI response: {str(e)}")
-                return self._create_basic_route(load_data)
-        else:
-            return self._create_basic_route(load_data)
+        return None
     
     def _format_load_for_ai(self, load_data):
         """Format load data into readable text for AI"""
@@ -116,31 +263,86 @@ Return your response as a JSON object with this structure:
         
         return "\n".join(summary)
     
-    def _create_basic_route(self, load_data):
-        """Fallback: Create basic route without AI"""
-        stops = []
-        total_miles = 0
+    def _apply_schedules(self, routed):
+        """
+        Add HOS arrival/departure times to sequencer routes
         
-        for idx, dest in enumerate(load_data.get('destinations', []), 1):
-            # Estimate 300 miles per stop (placeholder)
-            distance = 300
-            total_miles += distance
-            
+        Args:
+            routed: List of (route plan, route request) pairs; plans are updated in place
+        """
+        if not routed:
+            return
+        eta_routes = []
+        for plan, request in routed:
+            windows = {dest.get('location', 'Unknown'): dest for dest in request.get('destinations', [])}
+            eta_routes.append({
+                'departure_time': request.get('departure_time'),
+                'stops': [{
+                    'miles': stop['distance_from_previous_miles'],
+                    'delivery_window_start': windows.get(stop['location'], {}).get('delivery_window_start'),
+                    'delivery_window_end': (windows.get(stop['location'], {}).get('delivery_window_end')
+                                            or windows.get(stop['location'], {}).get('delivery_window')),
+                    'must_arrive_by_date': windows.get(stop['location'], {}).get('must_arrive_by_date')
+                } for stop in plan['route']['stops']]
+            })
+        
+        for (plan, _), schedule in zip(routed, schedule_routes(eta_routes)):
+            route = plan['route']
+            for stop, timing in zip(route['stops'], schedule['stops']):
+                stop.update(timing)
+            route.update(schedule['summary'])
+            summary = schedule['summary']
+            if summary['rest_breaks'] or summary['overnight_resets']:
+                plan['optimization_insights'].append(
+                    f"HOS: {summary['rest_breaks']} rest break(s), {summary['overnight_resets']} 10-hour reset(s), "
+                    f"{summary['total_transit_hours']}h door to door")
+            if summary['late_stops']:
+                plan['optimization_insights'].append(f"{summary['late_stops']} stop(s) miss their delivery window")
+    
+    def _create_basic_route(self, load_data, schedule=True):
+        """Deterministic route: nearest-neighbour + 2-opt over haversine road miles, with HOS timing"""
+        destinations = load_data.get('destinations', [])
+        origin = load_data.get('origin')
+        
+        # Orders delivered per location (several destinations may share a city)
+        orders_by_location = {}
+        for dest in destinations:
+            location = dest.get('location', 'Unknown')
+            orders_by_location.setdefault(location, []).extend(dest.get('orders', []))
+        
+        sequenced = self.sequencer.sequence(origin, list(orders_by_location))
+        
+        stops = []
+        for idx, (location, distance) in enumerate(zip(sequenced['stops'], sequenced['legs']), 1):
             stops.append({
                 "stop_number": idx,
-                "location": dest.get('location', 'Unknown'),
+                "location": location,
                 "distance_from_previous_miles": distance,
-                "orders_delivered": dest.get('orders', [])
+                "orders_delivered": orders_by_location[location]
             })
         
-        return {
+        total_miles = sequenced['total_miles']
+        
+        # Any route must at least reach its farthest stop from the origin
+        direct = [self.sequencer.direct_miles(origin, stop['location']) for stop in stops]
+        farthest = max([d for d in direct if d is not None], default=0)
+        efficiency = round(100 * farthest / total_miles) if total_miles else 0
+        
+        insights = [f"Sequenced {len(stops)} stops by nearest neighbour + 2-opt ({total_miles} road miles)"]
+        if sequenced['unresolved']:
+            insights.append(f"No coordinates for: {', '.join(str(u) for u in sequenced['unresolved'])} - appended at end of route")
+        
+        plan = {
             "route": {
                 "load_id": load_data.get('load_id'),
-                "origin": load_data.get('origin'),
+                "origin": origin,
                 "stops": stops,
                 "total_miles": total_miles,
-                "total_drive_time_hours": total_miles / AVERAGE_SPEED_MPH,
-                "route_efficiency_score": 0
+                "total_drive_time_hours": round(total_miles / AVERAGE_SPEED_MPH, 2),
+                "route_efficiency_score": efficiency
             },
-            "optimization_insights": ["Basic route created without AI optimization"]
+            "optimization_insights": insights
         }
+        if schedule:
+            self._apply_schedules([(plan, load_data)])
+        return plan
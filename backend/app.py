@@ -10,7 +10,7 @@ import os
 # Add backend to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from config.settings import PORT, DEBUG
+from config.settings import PORT
 from utils.keep_alive import keep_alive, initialize_keep_alive
 
 app = Flask(__name__)
@@ -31,11 +31,117 @@ CORS(app, resources={
     }
 })
 
+def job_event_stream(job, after_seq=0):
+    """
+    Server-Sent Events response for a job
+    
+    Emits one "progress" event per recorded stage (id = sequence number, so
+    clients can resume with Last-Event-ID), keep-alive comments while idle,
+    and a final "result" event with the job status and payload.
+    """
+    from flask import Response, stream_with_context
+    from config.settings import JOB_STREAM_HEARTBEAT_SECONDS
+    import json
+    
+    def generate():
+        seq = after_seq
+        while True:
+            events, finished = job.wait_for_events(seq, timeout=JOB_STREAM_HEARTBEAT_SECONDS)
+            if not events and not finished:
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                seq = event['seq']
+                yield f"id: {seq}\nevent: progress\ndata: {json.dumps(event)}\n\n"
+            if finished and seq >= len(job.events):
+                yield f"event: result\ndata: {json.dumps(job.to_dict(), default=str)}\n\n"
+                return
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Disable proxy buffering so events arrive as they happen
+    })
+
+def run_or_queue(job_type, operation, params):
+    """
+    Run an operation inline, or queue it as a background job
+    
+    Clients opt in with "async": true in the body or ?async=true and then
+    poll GET /api/jobs/<job_id> (or stream /api/jobs/<job_id>/events) for
+    progress and the result. "stream": true / ?stream=true queues the job and
+    answers with its event stream directly.
+    
+    Job types in EXCLUSIVE_JOB_TYPES always go through the queue (inline
+    requests wait for their job) and are refused with 409 while another of
+    the same type is unfinished.
+    """
+    from config.settings import EXCLUSIVE_JOB_TYPES
+    from utils.job_queue import get_job_queue, JobAlreadyRunningError
+    params = params or {}
+    exclusive = job_type in EXCLUSIVE_JOB_TYPES
+    stream = params.get('stream') or request.args.get('stream') == 'true'
+    run_async = params.get('async') or request.args.get('async') == 'true'
+    if not (stream or run_async or exclusive):
+        payload, http_status = operation(params)
+        return jsonify(payload), http_status
+    
+    try:
+        job = get_job_queue().submit(job_type, operation, params, exclusive=exclusive)
+    except JobAlreadyRunningError as e:
+        return jsonify({
+            "error": str(e),
+            "job_id": e.job.id,
+            "status": e.job.status,
+            "status_url": f"/api/jobs/{e.job.id}"
+        }), 409
+    if stream:
+        return job_event_stream(job)
+    if run_async:
+        return jsonify({
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/jobs/{job.id}"
+        }), 202
+    job.wait()
+    if job.result is None:
+        return jsonify({"error": job.error}), job.http_status
+    return jsonify(job.result), job.http_status
+
 # Health check endpoint
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy", "service": "TMS Backend"}), 200
 
+# Database health endpoint (reports the out-of-band check of the shared client)
+@app.route('/api/health/database', methods=['GET'])
+def database_health():
+    from database.supabase_client import get_supabase_client
+    try:
+        client = get_supabase_client()
+        if request.args.get('refresh') == 'true':
+            client.check_connection(max_retries=1)
+        status = client.last_health_check
+        if status is None:
+            return jsonify({"success": None, "message": "Health check in progress"}), 202
+        return jsonify(status), 200 if status['success'] else 503
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/health/llm-cache', methods=['GET'])
+def llm_cache_stats():
+    """Gemini response cache counters and circuit breaker state (?clear=true empties the cache)"""
+    from utils.llm_cache import get_llm_cache
+    from utils.llm_client import get_circuit_breaker
+    try:
+        cache = get_llm_cache()
+        if request.args.get('clear') == 'true':
+            cache.clear()
+        stats = cache.stats()
+        stats['circuit_breaker'] = get_circuit_breaker().stats()
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # Supabase Keep-Alive endpoint
 @app.route('/api/keep-alive', methods=['GET'])
 def keep_alive_endpoint():
@@ -65,188 +171,129 @@ def keep_alive_endpoint():
             'message': 'Keep-alive ping failed'
         }), 500
 
+# Background Jobs API
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List retained background jobs (without results)"""
+    from utils.job_queue import get_job_queue
+    try:
+        jobs = get_job_queue().list()
+        return jsonify({"data": [job.to_dict(include_result=False) for job in jobs]}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a background job's status, progress and (once finished) result"""
+    from utils.job_queue import get_job_queue
+    try:
+        job = get_job_queue().get(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Stream a background job's progress as Server-Sent Events"""
+    from utils.job_queue import get_job_queue
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    after_seq = request.headers.get('Last-Event-ID') or request.args.get('after') or 0
+    try:
+        after_seq = int(after_seq)
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an integer"}), 400
+    return job_event_stream(job, after_seq)
+
 # Network Engineering - Facility Location endpoint
 @app.route('/api/network/facility-location', methods=['POST'])
 def facility_location_analysis():
-    from database.supabase_client import SupabaseClient
-    import numpy as np
-    from sklearn.cluster import KMeans
-    from math import radians, sin, cos, sqrt, atan2
+    """
+    Weighted K-means facility location analysis
+    
+    Body: {"k": 3} for a single run, or {"k_min": 2, "k_max": 8} to sweep
+    candidate facility counts and return the recommended (elbow) k in detail.
+    """
+    from database.supabase_client import get_supabase_client
+    from database.postgres_bulk import get_bulk_client
+    from config.settings import FACILITY_SWEEP_MAX_CANDIDATES
+    from utils.facility_index import get_facility_index
+    from utils.facility_location import (
+        DEMAND_COLUMNS, aggregate_demand, facility_metrics, demand_points,
+        fit_facilities, sweep_facility_counts
+    )
     
     try:
         data = request.get_json()
         k = data.get('k', 3)  # Number of facilities/centers
-        
-        # Get orders and facilities from database
-        client = SupabaseClient()
-        orders = client.get_all_orders()
-        facilities = client.get_all_facilities()
+        k_min = data.get('k_min')
+        k_max = data.get('k_max')
+        sweep_mode = k_min is not None or k_max is not None
+        if sweep_mode:
+            k_min = int(k_min if k_min is not None else 1)
+            k_max = int(k_max if k_max is not None else k_min)
+            if k_min < 1 or k_max < k_min:
+                return jsonify({"error": "k_min must be >= 1 and k_max must be >= k_min"}), 400
+            if k_max - k_min + 1 > FACILITY_SWEEP_MAX_CANDIDATES:
+                return jsonify({"error": f"A sweep may try at most {FACILITY_SWEEP_MAX_CANDIDATES} values of k"}), 400
+        
+        # Get orders from database (only the columns the analysis uses), through a
+        # server-side cursor when DATABASE_URL is set; facility coordinates come
+        # from the shared index
+        bulk = get_bulk_client()
+        if bulk:
+            orders = list(bulk.iter_rows('orders', DEMAND_COLUMNS))
+        else:
+            orders = get_supabase_client().get_orders(columns=','.join(DEMAND_COLUMNS))
         
         if not orders or len(orders) == 0:
             return jsonify({"error": "No orders available for analysis"}), 400
         
-        # Create facility lookup by city/name
-        facility_lookup = {}
-        for facility in facilities:
-            facility_name = facility.get('name', '')
-            city = facility.get('city', '')
-            lat = facility.get('latitude')
-            lon = facility.get('longitude')
-            
-            if lat and lon:
-                facility_lookup[facility_name.lower()] = {'lat': lat, 'lon': lon, 'city': city, 'state': facility.get('state', '')}
-                if city:
-                    facility_lookup[city.lower()] = {'lat': lat, 'lon': lon, 'city': city, 'state': facility.get('state', '')}
-        
         # Step 1: Group orders by unique customer location and aggregate weights
-        location_dict = {}
-        
-        for order in orders:
-            destination = order.get('destination', '')
-            weight = order.get('weight_lbs')  # Changed from 'weight' to 'weight_lbs'
-            customer = order.get('customer', 'Unknown')
-            
-            # Skip orders without valid destination or weight
-            if not destination or not weight:
-                continue
-            
-            try:
-                wgt = float(weight)
-            except (ValueError, TypeError):
-                continue
-            
-            # Try to find coordinates for this destination
-            # Parse destination string (e.g., "Orlando, FL" or "Houston, TX - Houston DC")
-            dest_lower = destination.lower()
-            coords = None
-            
-            # Try exact match first
-            if dest_lower in facility_lookup:
-                coords = facility_lookup[dest_lower]
-            else:
-                # Try to extract city from destination string
-                parts = destination.split(',')
-                if len(parts) >= 2:
-                    city = parts[0].strip().lower()
-                    if city in facility_lookup:
-                        coords = facility_lookup[city]
-                elif '-' in destination:
-                    # Handle format like "Houston, TX - Houston DC"
-                    city = destination.split(',')[0].strip().lower()
-                    if city in facility_lookup:
-                        coords = facility_lookup[city]
-            
-            if not coords:
-                continue  # Skip if we can't find coordinates
-            
-            lat = coords['lat']
-            lon = coords['lon']
-            
-            # Create a unique key for this location (rounded to 4 decimals for grouping)
-            location_key = (round(lat, 4), round(lon, 4))
-            
-            if location_key not in location_dict:
-                location_dict[location_key] = {
-                    'lat': lat,
-                    'lon': lon,
-                    'total_weight': 0,
-                    'customer_name': customer,
-                    'city': coords.get('city', ''),
-                    'state': coords.get('state', ''),
-                    'order_count': 0
-                }
-            
-            location_dict[location_key]['total_weight'] += wgt
-            location_dict[location_key]['order_count'] += 1
-            # Update city/state if this location has better info
-            if not location_dict[location_key]['state'] and coords.get('state'):
-                location_dict[location_key]['state'] = coords.get('state', '')
-            if not location_dict[location_key]['city'] and coords.get('city'):
-                location_dict[location_key]['city'] = coords.get('city', '')
-        
-        # Step 2: Convert aggregated locations to list
-        customer_locations = list(location_dict.values())
-        
-        if len(customer_locations) == 0:
+        demand = aggregate_demand(orders, get_facility_index())
+        
+        if len(demand) == 0:
             return jsonify({"error": "No valid customer locations found in orders. Orders may not have matching facilities in database."}), 400
         
-        if len(customer_locations) < k:
+        min_k = k_min if sweep_mode else k
+        if len(demand) < min_k:
             return jsonify({
-                "error": f"Only {len(customer_locations)} unique customer location(s) found. Need at least {k} locations for {k} facilities. Try reducing k."
+                "error": f"Only {len(demand)} unique customer location(s) found. Need at least {min_k} locations for {min_k} facilities. Try reducing k."
             }), 400
         
-        # Step 3: Prepare data for K-means clustering
-        coords = np.array([[loc['lat'], loc['lon']] for loc in customer_locations])
-        weights = np.array([loc['total_weight'] for loc in customer_locations])
-        
-        # Step 4: Perform weighted K-means clustering
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-        labels = kmeans.fit_predict(coords, sample_weight=weights)
-        centers = kmeans.cluster_centers_
-        
-        # Haversine distance function
-        def haversine_distance(lat1, lon1, lat2, lon2):
-            R = 3959  # Earth radius in miles
-            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * atan2(sqrt(a), sqrt(1-a))
-            return R * c
-        
-        # Step 5: Calculate metrics for each facility
-        facilities = []
-        for i, center in enumerate(centers):
-            facility_lat, facility_lon = center[0], center[1]
-            
-            # Get customers assigned to this facility
-            cluster_locations = [customer_locations[j] for j in range(len(customer_locations)) if labels[j] == i]
-            
-            # Calculate average distance to customers
-            distances = [haversine_distance(facility_lat, facility_lon, loc['lat'], loc['lon']) for loc in cluster_locations]
-            avg_distance = sum(distances) / len(distances) if distances else 0
-            total_volume = sum([loc['total_weight'] for loc in cluster_locations])
-            total_orders = sum([loc['order_count'] for loc in cluster_locations])
-            
-            # Find nearest city using reverse geocoding approximation
-            closest_location = min(cluster_locations, key=lambda loc: haversine_distance(facility_lat, facility_lon, loc['lat'], loc['lon']))
-            
-            facilities.append({
-                'facility_id': i + 1,
-                'latitude': float(facility_lat),
-                'longitude': float(facility_lon),
-                'nearest_city': closest_location['city'] or 'Unknown',
-                'nearest_state': closest_location['state'] or 'Unknown',
-                'avg_customer_distance': round(avg_distance, 1),
-                'total_volume': round(total_volume, 0),
-                'num_customers': len(cluster_locations),
-                'total_orders': total_orders,
-                'cluster_label': i
-            })
-        
-        # Step 6: Prepare demand points for visualization
-        demand_points = []
-        for i, location in enumerate(customer_locations):
-            demand_points.append({
-                'latitude': location['lat'],
-                'longitude': location['lon'],
-                'weight': location['total_weight'],
-                'customer': location['customer_name'],
-                'city': location['city'],
-                'state': location['state'],
-                'order_count': location['order_count'],
-                'assigned_facility': int(labels[i]) + 1
-            })
+        # Step 2: Perform weighted K-means clustering (every candidate k in parallel when sweeping)
+        coords = demand[['lat', 'lon']].to_numpy(dtype=float)
+        weights = demand['total_weight'].to_numpy(dtype=float)
+        sweep = None
+        if sweep_mode:
+            k_values = list(range(k_min, min(k_max, len(demand)) + 1))
+            sweep = sweep_facility_counts(demand, k_values)
+            k = sweep['recommended_k']
+            labels, centers = sweep['fits'][k]
+            print(f"[NETWORK] Swept k={k_values[0]}..{k_values[-1]}, recommended k={k}")
+        else:
+            labels, centers, _ = fit_facilities(coords, weights, k)
         
-        return jsonify({
+        # Step 3: Calculate metrics for each facility
+        facilities, _ = facility_metrics(demand, labels, centers)
+        
+        result = {
             'facilities': facilities,
-            'demand_points': demand_points,
+            'demand_points': demand_points(demand, labels),
             'k': k,
-            'total_demand': float(sum(weights)),
-            'unique_locations': len(customer_locations),
-            'total_orders_analyzed': sum([loc['order_count'] for loc in customer_locations]),
+            'total_demand': float(weights.sum()),
+            'unique_locations': len(demand),
+            'total_orders_analyzed': int(demand['order_count'].sum()),
             'analysis_date': pd.Timestamp.now().isoformat()
-        }), 200
+        }
+        if sweep:
+            result['sweep'] = sweep['sweep']
+            result['recommended_k'] = sweep['recommended_k']
+        
+        return jsonify(result), 200
         
     except Exception as e:
         print(f"Facility location analysis error: {str(e)}")
@@ -257,22 +304,51 @@ def facility_location_analysis():
 # Orders API
 @app.route('/api/orders', methods=['GET'])
 def get_orders():
-    """Get all orders from database"""
-    from database.supabase_client import SupabaseClient
+    """
+    Get orders from database
+    
+    Query params (all optional):
+        status: Comma separated statuses (e.g. Pending,Assigned)
+        unplanned: 'true' for orders without a planned_to_load_date
+        columns: Comma separated column projection
+        limit: Page size (at most 1000) - returns one page plus next_cursor
+        cursor: next_cursor from the previous page
+    """
+    from database.supabase_client import get_supabase_client
+    import re
     try:
-        client = SupabaseClient()
-        orders = client.get_all_orders()
-        return jsonify({"data": orders}), 200
+        filters = {}
+        if request.args.get('status'):
+            filters['status'] = [s.strip() for s in request.args['status'].split(',') if s.strip()]
+        if request.args.get('unplanned') == 'true':
+            filters['unplanned'] = True
+        if request.args.get('columns'):
+            columns = request.args['columns']
+            if not re.fullmatch(r'\s*\w+\s*(,\s*\w+\s*)*', columns):
+                return jsonify({"error": "columns must be a comma separated list of column names"}), 400
+            filters['columns'] = columns.replace(' ', '')
+        
+        client = get_supabase_client()
+        limit = request.args.get('limit', type=int)
+        if limit:
+            # Single keyset page (PostgREST returns at most ORDER_PAGE_SIZE rows)
+            limit = min(max(limit, 1), client.ORDER_PAGE_SIZE)
+            orders = client.query_orders(limit=limit, after_id=request.args.get('cursor'), **filters)
+            next_cursor = orders[-1]['id'] if len(orders) == limit else None
+            return jsonify({"data": orders, "next_cursor": next_cursor}), 200
+        
+        orders = client.get_orders(**filters)
+        return jsonify({"data": orders, "next_cursor": None}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/orders', methods=['POST'])
 def create_order():
     """Create new order"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
         data = request.json
-        client = SupabaseClient()
+        client = get_supabase_client()
         order = client.create_order(data)
         return jsonify({"message": "Order created", "order": order}), 201
     except Exception as e:
@@ -280,56 +356,10 @@ def create_order():
 
 @app.route('/api/orders/generate', methods=['POST'])
 def generate_synthetic_orders():
-    """Generate synthetic orders for testing"""
-    from utils.erp_data_generator import ERPDataGenerator
-    from database.supabase_client import SupabaseClient
+    """Generate synthetic orders for testing ("async": true queues monthly batches as a job)"""
+    from utils.operations import generate_orders
     try:
-        data = request.json
-        count = data.get('count', 10)
-        monthly = data.get('monthly', False)
-        
-        gen = ERPDataGenerator()
-        client = SupabaseClient()
-        
-        # Get facilities for ID lookup
-        facilities = client.get_all_facilities()
-        facility_map = {f['facility_code']: f['id'] for f in facilities}
-        
-        if monthly:
-            # Generate a full month of orders (~4,000)
-            orders = gen.generate_monthly_orders()
-        else:
-            orders = gen.generate_orders(count)
-        
-        # Add facility IDs to orders based on facility_code
-        for order in orders:
-            # Match origin facility code to facility ID
-            origin_code = order.get('origin_facility_code')
-            if origin_code and origin_code in facility_map:
-                order['origin_facility_id'] = facility_map[origin_code]
-            
-            # Destination facility ID will be null for now (customer sites)
-            order['destination_facility_id'] = None
-            
-            # Remove the temporary facility_code field
-            order.pop('origin_facility_code', None)
-        
-        # Debug: Print first order structure
-        print(f"[ORDER GEN] Attempting to insert {len(orders)} orders")
-        if orders:
-            print(f"[ORDER GEN] Sample order keys: {list(orders[0].keys())}")
-        
-        # Insert orders
-        if monthly:
-            result = client.create_orders_batch_chunked(orders, chunk_size=100)
-            print(f"[ORDER GEN] Inserted {len(result)} orders (monthly batch)")
-            return jsonify({"message": f"Generated {len(result)} orders", "count": len(result)}), 201
-        else:
-            result = client.create_orders_batch(orders)
-            print(f"[ORDER GEN] Inserted {len(result)} orders")
-            if not result:
-                return jsonify({"error": "Failed to insert orders - result is empty", "count": 0}), 500
-            return jsonify({"message": f"Generated {len(result)} orders", "count": len(result), "orders": result}), 201
+        return run_or_queue('generate_orders', generate_orders, request.json)
     except Exception as e:
         print(f"[ORDER GEN ERROR] {str(e)}")  # Log the error
         import traceback
@@ -338,12 +368,16 @@ def generate_synthetic_orders():
 
 @app.route('/api/orders/clear', methods=['DELETE'])
 def clear_all_orders():
-    """Clear all orders from database"""
-    from database.supabase_client import SupabaseClient
+    """Clear all orders (and their load_orders links) from database"""
+    from database.supabase_client import get_supabase_client
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         result = client.delete_all_orders()
-        return jsonify({"message": "All orders cleared", "deleted_count": len(result)}), 200
+        return jsonify({
+            "message": "All orders cleared",
+            "deleted_count": result['orders_deleted'],
+            "load_orders_deleted": result['load_orders_deleted']
+        }), 200
     except Exception as e:
         print(f"Error clearing orders: {str(e)}")  # Log the error
         return jsonify({"error": str(e)}), 500
@@ -351,121 +385,15 @@ def clear_all_orders():
 # Load Optimization API
 @app.route('/api/loads/optimize', methods=['POST'])
 def optimize_loads():
-    """Optimize orders into truck loads and save to database"""
-    from database.supabase_client import SupabaseClient
-    from agents.load_optimizer import LoadOptimizerAgent
-    from datetime import datetime
+    """
+    Optimize orders into truck loads and save to database ("async": true runs it as a job)
+    
+    "incremental": true fills open Planning loads with the pending, unplanned orders
+    before opening new ones ("since" optionally limits it to orders created/updated after it).
+    """
+    from utils.operations import optimize_loads as run_optimization
     try:
-        data = request.json
-        order_ids = data.get('order_ids', [])
-        
-        # 1. Fetch orders from Supabase
-        client = SupabaseClient()
-        if order_ids:
-            orders = client.get_all_orders()
-            orders = [o for o in orders if o['id'] in order_ids]
-        else:
-            orders = client.get_all_orders()
-            # Filter for Pending status AND no planned_to_load_date (not yet assigned to a load)
-            orders = [o for o in orders if o.get('status') == 'Pending' and not o.get('planned_to_load_date')]
-        
-        if not orders:
-            return jsonify({
-                "loads": [],
-                "summary": {
-                    "total_orders": 0,
-                    "total_loads": 0,
-                    "avg_utilization": 0,
-                    "cost_savings_percent": 0,
-                    "message": "No unplanned orders available for optimization"
-                }
-            }), 200
-        
-        print(f"[LOAD OPTIMIZER] Found {len(orders)} eligible orders (no planned_to_load_date)")
-        
-        # 2. Use LoadOptimizerAgent to create load plan
-        optimizer = LoadOptimizerAgent()
-        load_plan = optimizer.optimize_loads(orders)
-        
-        print(f"[DEBUG] Optimizer returned {len(load_plan.get('loads', []))} loads")
-        print(f"[DEBUG] Starting database save process...")
-        
-        # 3. Save loads to database with date tracking
-        saved_count = 0
-        current_time = datetime.utcnow().isoformat()
-        
-        for load in load_plan.get('loads', []):
-            try:
-                # Handle both AI format (total_weight, total_volume) and fallback format (total_weight_lbs, total_volume_cuft)
-                total_weight = load.get('total_weight_lbs') or load.get('total_weight', 0)
-                total_volume = load.get('total_volume_cuft') or load.get('total_volume', 0)
-                utilization = load.get('utilization_percent') or load.get('utilization', 0)
-                
-                # Calculate must_arrive_by_date (earliest deadline from all orders in load)
-                must_arrive_dates = [o.get('must_arrive_by_date') or o.get('delivery_window_end') 
-                                    for o in load['orders'] if o.get('must_arrive_by_date') or o.get('delivery_window_end')]
-                earliest_deadline = min(must_arrive_dates) if must_arrive_dates else None
-                
-                # Calculate must_pick_up_by_date (48 hours before earliest delivery for now)
-                # TODO: Enhance with actual route planning integration
-                must_pick_up_date = None
-                if earliest_deadline:
-                    from datetime import datetime, timedelta
-                    if isinstance(earliest_deadline, str):
-                        deadline_dt = datetime.fromisoformat(earliest_deadline.replace('Z', '+00:00'))
-                    else:
-                        deadline_dt = earliest_deadline
-                    must_pick_up_date = (deadline_dt - timedelta(hours=48)).isoformat()
-                
-                load_data = {
-                    'load_number': load['load_id'],
-                    'truck_type': 'Dry Van 53ft',
-                    'total_weight_lbs': float(total_weight),
-                    'total_volume_cuft': float(total_volume),
-                    'utilization_percent': float(utilization),
-                    'origin': load['orders'][0]['origin'] if load['orders'] else 'Unknown',
-                    'status': 'Planning',
-                    'load_created_date': current_time,
-                    'must_arrive_by_date': earliest_deadline,
-                    'must_pick_up_by_date': must_pick_up_date,
-                    'assigned_carrier': 'NONE'
-                }
-                print(f"[DEBUG] Attempting to save load {load_data['load_number']}")
-                created_load = client.create_load(load_data)
-                print(f"[SUCCESS] Created load: {created_load.get('id') if created_load else 'NONE'}")
-                saved_count += 1
-                
-                # 4. Create load_orders relationships AND update orders with planned_to_load_date
-                if created_load:
-                    load_orders = []
-                    for order in load['orders']:
-                        load_orders.append({
-                            'load_id': created_load['id'],
-                            'order_id': order['id'],
-                            'sequence_number': order.get('stop_sequence', 1)
-                        })
-                        
-                        # Update order with planned_to_load_date and assigned_load_number
-                        try:
-                            client.update_order(order['id'], {
-                                'planned_to_load_date': current_time,
-                                'assigned_load_number': load['load_id'],
-                                'status': 'Assigned'
-                            })
-                            print(f"[SUCCESS] Updated order {order.get('order_number')} with planned_to_load_date")
-                        except Exception as order_update_error:
-                            print(f"[WARNING] Failed to update order {order.get('order_number')}: {str(order_update_error)}")
-                    
-                    if load_orders:
-                        client.create_load_orders_batch(load_orders)
-                    
-            except Exception as load_error:
-                print(f"[ERROR] Saving load {load.get('load_id')}: {str(load_error)}")
-                import traceback
-                traceback.print_exc()
-        
-        print(f"[COMPLETE] Save process complete. Saved {saved_count} of {len(load_plan.get('loads', []))} loads")
-        return jsonify(load_plan), 200
+        return run_or_queue('optimize_loads', run_optimization, request.json)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -476,55 +404,97 @@ def optimize_loads():
 def optimize_route():
     """Optimize delivery route for a load"""
     from agents.route_planner import RoutePlannerAgent
+    from utils.facility_index import get_facility_index
     try:
         data = request.json
         load_data = data.get('load_data', {})
+        use_ai = data.get('use_ai')  # Optional Gemini routing instead of local sequencer
+        
+        try:
+            facilities = get_facility_index().facilities()
+        except Exception as e:
+            print(f"[ROUTE PLANNER] Facility index unavailable, using built-in network: {e}")
+            facilities = None
         
         # Use RoutePlannerAgent to create optimal route
-        planner = RoutePlannerAgent()
-        route_plan = planner.plan_route(load_data)
+        planner = RoutePlannerAgent(facilities=facilities)
+        route_plan = planner.plan_route(load_data, use_ai=use_ai)
         
         return jsonify(route_plan), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/routes/optimize-batch', methods=['POST'])
+def optimize_routes_batch():
+    """
+    Route every load of a load plan in one call ("async": true runs it as a job)
+    
+    Body: {"loads": [...]} or {"load_plan": {...}}, optional "use_ai" and "workers".
+    Returns per-load routes (input order) plus aggregate miles and drive time.
+    """
+    from utils.operations import plan_routes
+    try:
+        return run_or_queue('plan_routes', plan_routes, request.json)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # Cost Analysis API
 @app.route('/api/costs/analyze', methods=['POST'])
 def analyze_costs():
-    """Analyze costs for loads and routes"""
-    from agents.cost_analyzer import CostAnalyzerAgent
+    """
+    Analyze costs for loads and routes ("async": true runs it as a job)
+    
+    Figures are deterministic and stored per load in cost_analysis; unchanged
+    loads are served from the table. "use_ai": false skips AI recommendations.
+    """
+    from utils.operations import analyze_costs as run_cost_analysis
     try:
-        data = request.json
-        load_plan = data.get('load_plan', {})
-        route_plan = data.get('route_plan', {})
-        
-        # Use CostAnalyzerAgent to analyze costs
-        analyzer = CostAnalyzerAgent()
-        cost_analysis = analyzer.analyze_costs(load_plan, route_plan)
-        
-        return jsonify(cost_analysis), 200
+        return run_or_queue('analyze_costs', run_cost_analysis, request.json)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/costs', methods=['GET'])
+def get_cost_analyses():
+    """
+    Stored per-load cost analyses (precomputed by /api/costs/analyze)
+    
+    Query params: limit (default 1000), cursor (next_cursor of the previous page)
+    """
+    from database.supabase_client import get_supabase_client
+    try:
+        limit = min(max(int(request.args.get('limit', 1000)), 1), 1000)
+        rows = get_supabase_client().get_cost_analyses(limit=limit, after_id=request.args.get('cursor'))
+        return jsonify({
+            "data": rows,
+            "next_cursor": rows[-1]['id'] if len(rows) == limit else None
+        }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 # Analytics Dashboard API
 @app.route('/api/analytics/dashboard', methods=['GET'])
 def get_dashboard_analytics():
-    """Get dashboard analytics and KPIs"""
-    # TODO: Query Supabase for analytics data
-    return jsonify({
-        "active_shipments": 0,
-        "total_orders": 0,
-        "avg_utilization": 0,
-        "cost_savings_ytd": 0
-    }), 200
+    """
+    Get dashboard analytics and KPIs
+    
+    Aggregated server-side and cached for DASHBOARD_CACHE_TTL_SECONDS
+    (?refresh=true recomputes).
+    """
+    from utils.dashboard_kpis import get_dashboard_kpi_cache
+    try:
+        kpis, cached = get_dashboard_kpi_cache().get(refresh=request.args.get('refresh') == 'true')
+        return jsonify(dict(kpis, cached=cached)), 200
+    except Exception as e:
+        print(f"Error computing dashboard analytics: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
 # Products API
 @app.route('/api/products', methods=['GET'])
 def get_products():
     """Get all products from database"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         products = client.get_all_products()
         return jsonify({"data": products}), 200
     except Exception as e:
@@ -535,10 +505,10 @@ def get_products():
 @app.route('/api/products', methods=['POST'])
 def create_product():
     """Create new product"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
         data = request.json
-        client = SupabaseClient()
+        client = get_supabase_client()
         product = client.create_product(data)
         return jsonify({"message": "Product created", "product": product}), 201
     except Exception as e:
@@ -547,7 +517,7 @@ def create_product():
 @app.route('/api/products/seed', methods=['POST'])
 def seed_products():
     """Seed initial product data"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
         products = [
             {
@@ -672,7 +642,7 @@ def seed_products():
             }
         ]
         
-        client = SupabaseClient()
+        client = get_supabase_client()
         result = client.create_products_batch(products)
         return jsonify({"message": f"Seeded {len(result)} products", "products": result}), 201
     except Exception as e:
@@ -684,9 +654,9 @@ def seed_products():
 @app.route('/api/people', methods=['GET'])
 def get_people():
     """Get all people from database"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         people = client.supabase.table('people').select('*').order('name').execute()
         return jsonify({"data": people.data}), 200
     except Exception as e:
@@ -697,10 +667,10 @@ def get_people():
 @app.route('/api/people', methods=['POST'])
 def create_person():
     """Create new person"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
         data = request.json
-        client = SupabaseClient()
+        client = get_supabase_client()
         result = client.supabase.table('people').insert(data).execute()
         return jsonify({"message": "Person created", "person": result.data[0]}), 201
     except Exception as e:
@@ -711,10 +681,10 @@ def create_person():
 @app.route('/api/people/<person_id>', methods=['PUT'])
 def update_person(person_id):
     """Update person by ID"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
         data = request.json
-        client = SupabaseClient()
+        client = get_supabase_client()
         result = client.supabase.table('people').update(data).eq('id', person_id).execute()
         return jsonify({"message": "Person updated", "person": result.data[0]}), 200
     except Exception as e:
@@ -725,9 +695,9 @@ def update_person(person_id):
 @app.route('/api/people/<person_id>', methods=['DELETE'])
 def delete_person(person_id):
     """Delete person by ID"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         client.supabase.table('people').delete().eq('id', person_id).execute()
         return jsonify({"message": "Person deleted"}), 200
     except Exception as e:
@@ -739,9 +709,9 @@ def delete_person(person_id):
 @app.route('/api/projects', methods=['GET'])
 def get_projects():
     """Get all projects from database"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         projects = client.supabase.table('projects').select('*, owner:people!owner_id(*)').order('created_at', desc=True).execute()
         return jsonify({"data": projects.data}), 200
     except Exception as e:
@@ -752,10 +722,10 @@ def get_projects():
 @app.route('/api/projects', methods=['POST'])
 def create_project():
     """Create new project"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
         data = request.json
-        client = SupabaseClient()
+        client = get_supabase_client()
         result = client.supabase.table('projects').insert(data).execute()
         return jsonify({"message": "Project created", "project": result.data[0]}), 201
     except Exception as e:
@@ -766,9 +736,9 @@ def create_project():
 @app.route('/api/projects/<project_id>/stories', methods=['GET'])
 def get_project_stories(project_id):
     """Get all stories for a project"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         stories = client.supabase.table('stories').select('*, assignee:people!assignee_id(*)').eq('project_id', project_id).order('created_at').execute()
         return jsonify({"data": stories.data}), 200
     except Exception as e:
@@ -779,10 +749,10 @@ def get_project_stories(project_id):
 @app.route('/api/stories', methods=['POST'])
 def create_story():
     """Create new story"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
         data = request.json
-        client = SupabaseClient()
+        client = get_supabase_client()
         result = client.supabase.table('stories').insert(data).execute()
         return jsonify({"message": "Story created", "story": result.data[0]}), 201
     except Exception as e:
@@ -793,10 +763,10 @@ def create_story():
 @app.route('/api/stories/<story_id>', methods=['PUT'])
 def update_story(story_id):
     """Update story by ID"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
         data = request.json
-        client = SupabaseClient()
+        client = get_supabase_client()
         result = client.supabase.table('stories').update(data).eq('id', story_id).execute()
         return jsonify({"message": "Story updated", "story": result.data[0]}), 200
     except Exception as e:
@@ -815,9 +785,9 @@ def get_carriers():
 @app.route('/api/facilities', methods=['GET'])
 def get_facilities():
     """Get all facilities from database"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         facilities = client.get_all_facilities()
         return jsonify({"data": facilities}), 200
     except Exception as e:
@@ -828,9 +798,9 @@ def get_facilities():
 @app.route('/api/facilities/code/<facility_code>', methods=['GET'])
 def get_facility_by_code(facility_code):
     """Get facility by facility code"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         facility = client.get_facility_by_code(facility_code)
         if facility:
             return jsonify({"data": facility}), 200
@@ -842,9 +812,9 @@ def get_facility_by_code(facility_code):
 @app.route('/api/facilities/city/<city>', methods=['GET'])
 def get_facility_by_city(city):
     """Get facility by city name"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         facility = client.get_facility_by_city(city)
         if facility:
             return jsonify({"data": facility}), 200
@@ -856,9 +826,9 @@ def get_facility_by_city(city):
 @app.route('/api/facilities/origins', methods=['GET'])
 def get_origins():
     """Get all origin facilities"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         origins = client.get_origins()
         return jsonify({"data": origins}), 200
     except Exception as e:
@@ -867,9 +837,9 @@ def get_origins():
 @app.route('/api/facilities/destinations', methods=['GET'])
 def get_destinations():
     """Get all destination facilities"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         destinations = client.get_destinations()
         return jsonify({"data": destinations}), 200
     except Exception as e:
@@ -878,9 +848,10 @@ def get_destinations():
 @app.route('/api/facilities/seed', methods=['POST'])
 def seed_facilities_endpoint():
     """Seed facilities table with origin and destination coordinates"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
+    from utils.facility_index import invalidate_facility_index
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         
         # Check if already seeded
         existing = client.get_all_facilities()
@@ -899,6 +870,7 @@ def seed_facilities_endpoint():
         
         # Run seed
         result = seed_facilities()
+        invalidate_facility_index()
         
         return jsonify({
             "message": f"Successfully seeded {len(result)} facilities",
@@ -913,262 +885,65 @@ def seed_facilities_endpoint():
 # Loads API
 @app.route('/api/loads', methods=['GET'])
 def get_loads():
-    """Get all loads from database"""
-    from database.supabase_client import SupabaseClient
+    """
+    Get loads from database
+    
+    Query params (all optional):
+        status: Comma separated statuses (e.g. Planning,In Transit)
+        columns: Column set (summary, list, full) or comma separated load columns
+        orders: full (default) | summary (order_count + order_ids) | none
+        order_columns: Comma separated order columns when orders=full
+        limit: Page size (at most 1000) - returns one page plus next_cursor
+        cursor: next_cursor from the previous page
+    """
+    from database.supabase_client import get_supabase_client, SupabaseClient
+    import re
     try:
-        client = SupabaseClient()
-        loads = client.get_all_loads()
-        return jsonify({"data": loads}), 200
+        filters = {}
+        if request.args.get('status'):
+            filters['status'] = [s.strip() for s in request.args['status'].split(',') if s.strip()]
+        for param in ('columns', 'order_columns'):
+            columns = request.args.get(param)
+            if not columns:
+                continue
+            is_set = param == 'columns' and columns in SupabaseClient.LOAD_COLUMN_SETS
+            if not is_set and not re.fullmatch(r'\s*\w+\s*(,\s*\w+\s*)*', columns):
+                return jsonify({"error": f"{param} must be a comma separated list of column names"}), 400
+            filters[param] = columns.replace(' ', '')
+        orders = request.args.get('orders', 'full')
+        if orders not in SupabaseClient.LOAD_ORDER_MODES:
+            return jsonify({"error": f"orders must be one of {', '.join(SupabaseClient.LOAD_ORDER_MODES)}"}), 400
+        order_columns = filters.pop('order_columns', '*')
+        
+        client = get_supabase_client()
+        limit = request.args.get('limit', type=int)
+        if limit:
+            # Single keyset page (PostgREST returns at most ORDER_PAGE_SIZE rows)
+            limit = min(max(limit, 1), client.ORDER_PAGE_SIZE)
+            loads = client.query_loads(limit=limit, after_id=request.args.get('cursor'), **filters)
+            client.attach_load_orders(loads, orders=orders, order_columns=order_columns)
+            next_cursor = loads[-1]['id'] if len(loads) == limit else None
+            return jsonify({"data": loads, "next_cursor": next_cursor}), 200
+        
+        loads = client.get_loads(orders=orders, order_columns=order_columns, **filters)
+        return jsonify({"data": loads, "next_cursor": None}), 200
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
-def generate_fallback_simulation_plan(available_orders, existing_loads, today_str):
-    """
-    Fallback simulation plan generator when AI is not available
-    Creates a simple but realistic simulation plan without AI
-    """
-    from datetime import datetime, timedelta
-    import random
-    
-    today = datetime.strptime(today_str, '%Y-%m-%d').date()
-    tomorrow = today + timedelta(days=1)
-    
-    # Get next CT load number
-    ct_loads = [l for l in existing_loads if l.get('load_number', '').startswith('CT-')]
-    next_ct_num = len(ct_loads) + 1
-    
-    # Create 8 simple load configurations
-    loads = []
-    orders_per_load = len(available_orders) // 8
-    
-    scenarios = [
-        ('delivered', 'Delivered', today_str, today_str),
-        ('delivered', 'Delivered', today_str, today_str),
-        ('on-time', 'In Transit', today_str, today_str),
-        ('on-time', 'In Transit', today_str, today_str),
-        ('on-time', 'In Transit', today_str, today_str),
-        ('at-risk', 'In Transit', today_str, str(tomorrow)),
-        ('at-risk', 'In Transit', today_str, str(tomorrow)),
-        ('at-risk', 'In Transit', today_str, str(tomorrow)),
-    ]
-    
-    for i, (scenario, status, ced, edd) in enumerate(scenarios):
-        start_idx = i * orders_per_load
-        end_idx = start_idx + orders_per_load if i < 7 else len(available_orders)
-        
-        loads.append({
-            'load_number': f'CT-{next_ct_num + i:05d}',
-            'truck_type': random.choice(['DRY_VAN', 'REEFER']),
-            'origin': 'Dallas, TX',
-            'status': status,
-            'estimated_delivery_date': edd,
-            'scenario': scenario,
-            'order_indices': list(range(start_idx, end_idx)),
-            'orders_config': {
-                'status': status,
-                'customer_expected_delivery_date': ced,
-                'delivery_window_start': '08:00:00',
-                'delivery_window_end': '17:00:00'
-            }
-        })
-    
-    return {
-        'loads': loads,
-        'summary': {
-            'delivered': 2,
-            'on_time': 3,
-            'at_risk': 3
-        }
-    }
-
 @app.route('/api/loads/simulate-today', methods=['POST'])
 def simulate_today_loads():
     """Generate simulated loads for today's delivery using AI agent (for Control Tower testing)"""
-    print("\n" + "="*80)
-    print("[SIMULATE-001] ✓ Route handler called - simulate_today_loads()")
-    print("="*80)
-    
-    from database.supabase_client import SupabaseClient
-    from datetime import datetime
-    import random
-    
-    try:
-        print("[SIMULATE-002] ✓ Initializing database client...")
-        client = SupabaseClient()
-        print("[SIMULATE-003] ✓ Database client initialized successfully")
-        
-        # Try to import AI agent, but fallback to manual logic if unavailable
-        try:
-            from agents.control_tower_simulator import ControlTowerSimulatorAgent
-            agent = ControlTowerSimulatorAgent()
-            use_ai = True
-            print("[SIMULATE-003a] ✓ AI agent initialized successfully")
-        except Exception as ai_error:
-            print(f"[SIMULATE-003b] ⚠ AI agent unavailable: {str(ai_error)}")
-            print("[SIMULATE-003c] ℹ Will use fallback simulation logic")
-            agent = None
-            use_ai = False
-        
-        # Get today's date
-        today = datetime.now().date()
-        today_str = str(today)
-        print(f"[SIMULATE-004] ✓ Today's date: {today_str}")
-        
-        # Get orders to assign to loads
-        print("[SIMULATE-005] Querying database for orders...")
-        all_orders = client.get_all_orders()
-        print(f"[SIMULATE-006] ✓ Retrieved {len(all_orders)} total orders from database")
-        
-        available_orders = [o for o in all_orders if o.get('status') in ['Pending', 'Assigned']]
-        print(f"[SIMULATE-007] ✓ Found {len(available_orders)} available orders (Pending/Assigned)")
-        
-        if len(available_orders) < 40:
-            error_msg = f"Not enough available orders. Need at least 40, found {len(available_orders)}"
-            print(f"[SIMULATE-ERROR-008] {error_msg}")
-            return jsonify({"error": error_msg, "debug_code": "SIMULATE-ERROR-008"}), 400
-        
-        # Get existing loads for numbering
-        print("[SIMULATE-009] Querying existing loads for numbering...")
-        existing_loads = client.get_all_loads()
-        print(f"[SIMULATE-010] ✓ Found {len(existing_loads)} existing loads in database")
-        
-        # Generate simulation plan
-        if use_ai:
-            print(f"[SIMULATE-011] Requesting AI-generated simulation plan for {today_str}...")
-            plan = agent.generate_simulation_plan(available_orders, existing_loads, today_str)
-            print(f"[SIMULATE-012] ✓ AI plan received with {len(plan.get('loads', []))} load configurations")
-        else:
-            print(f"[SIMULATE-011] Generating fallback simulation plan for {today_str}...")
-            plan = generate_fallback_simulation_plan(available_orders, existing_loads, today_str)
-            print(f"[SIMULATE-012] ✓ Fallback plan created with {len(plan.get('loads', []))} load configurations")
-        
-        # Execute the plan
-        loads_created = []
-        orders_used = 0
-        
-        print(f"[SIMULATE-013] Beginning execution of {len(plan['loads'])} loads...")
-        for idx, load_config in enumerate(plan['loads'], 1):
-            print(f"\n[SIMULATE-014-{idx}] Processing load {load_config['load_number']}...")
-        
-            # Get orders for this load
-            order_indices = load_config['order_indices']
-            orders_in_load = [available_orders[i] for i in order_indices if i < len(available_orders)]
-            print(f"[SIMULATE-015-{idx}] Selected {len(orders_in_load)} orders for this load")
-            
-            if len(orders_in_load) < 5:
-                print(f"[SIMULATE-WARN-016-{idx}] Skipping - fewer than 5 orders")
-                continue
-            
-            # Calculate load totals
-            total_weight = sum(o.get('weight_lbs', 0) for o in orders_in_load)
-            total_volume = sum(o.get('volume_cuft', 0) for o in orders_in_load)
-            print(f"[SIMULATE-017-{idx}] Calculated totals - Weight: {total_weight}lbs, Volume: {total_volume}cuft")
-            
-            # Create the load with AI-generated configuration
-            new_load = {
-                'load_number': load_config['load_number'],
-                'truck_type': load_config['truck_type'],
-                'total_weight_lbs': total_weight,
-                'total_volume_cuft': total_volume,
-                'utilization_percent': round(random.uniform(75, 95), 2),
-                'origin': load_config['origin'],
-                'status': load_config['status'],
-                'estimated_delivery_date': load_config['estimated_delivery_date']
-            }
-            
-            print(f"[SIMULATE-018-{idx}] Inserting load {load_config['load_number']} ({load_config['scenario']}) into database...")
-            created_load = client.create_load(new_load)
-            print(f"[SIMULATE-019-{idx}] ✓ Load created with ID: {created_load['id']}")
-            
-            # Update orders with AI-generated configuration
-            print(f"[SIMULATE-020-{idx}] Updating {len(orders_in_load)} orders and linking to load...")
-            orders_config = load_config['orders_config']
-            for order_idx, order in enumerate(orders_in_load, 1):
-                try:
-                    client.update_order(order['id'], {
-                        'status': orders_config['status'],
-                        'customer_expected_delivery_date': orders_config['customer_expected_delivery_date'],
-                        'delivery_window_start': orders_config['delivery_window_start'],
-                        'delivery_window_end': orders_config['delivery_window_end']
-                    })
-                    
-                    # Link to load
-                    result = client.create_load_order({
-                        'load_id': created_load['id'],
-                        'order_id': order['id'],
-                        'sequence_number': order_idx
-                    })
-                    print(f"[SIMULATE-020-{idx}-{order_idx}] ✓ Linked order {order['order_number']} - result: {result}")
-                except Exception as link_error:
-                    print(f"[SIMULATE-ERROR-020-{idx}-{order_idx}] ❌ Failed to link order {order.get('order_number')}: {str(link_error)}")
-                    raise
-            print(f"[SIMULATE-021-{idx}] ✓ All orders updated and linked")
-            
-            loads_created.append({
-                'load_number': load_config['load_number'],
-                'type': load_config['scenario'],
-                'status': load_config['status'],
-                'estimated_delivery': load_config['estimated_delivery_date']
-            })
-            orders_used += len(orders_in_load)
-        
-        # Prepare response summary
-        print(f"\n[SIMULATE-022] All loads processed. Creating response summary...")
-        summary = plan.get('summary', {
-            'delivered': sum(1 for l in loads_created if l['type'] == 'delivered'),
-            'on_time': sum(1 for l in loads_created if l['type'] == 'on-time'),
-            'at_risk': sum(1 for l in loads_created if l['type'] == 'at-risk')
-        })
-        
-        print(f"[SIMULATE-023] ✓✓✓ SUCCESS ✓✓✓")
-        print(f"[SIMULATE-024] Created {len(loads_created)} loads, assigned {orders_used} orders")
-        print(f"[SIMULATE-025] Summary: {summary}")
-        print("="*80 + "\n")
-        
-        return jsonify({
-            "message": "Successfully created simulated loads for today using AI agent",
-            "date": today_str,
-            "loads_created": len(loads_created),
-            "orders_assigned": orders_used,
-            "loads": loads_created,
-            "summary": summary,
-            "ai_generated": True,
-            "debug_code": "SIMULATE-SUCCESS-025"
-        }), 201
-        
-    except Exception as e:
-        import traceback
-        error_traceback = traceback.format_exc()
-        error_location = traceback.extract_tb(e.__traceback__)[-1]
-        
-        print(f"\n[SIMULATE-ERROR] ❌❌❌ EXCEPTION OCCURRED ❌❌❌")
-        print(f"[SIMULATE-ERROR] Error Type: {type(e).__name__}")
-        print(f"[SIMULATE-ERROR] Error Message: {str(e)}")
-        print(f"[SIMULATE-ERROR] Location: {error_location.filename}:{error_location.lineno} in {error_location.name}")
-        print(f"[SIMULATE-ERROR] Full Traceback:")
-        print(error_traceback)
-        print("="*80 + "\n")
-        
-        return jsonify({
-            "error": str(e),
-            "error_type": type(e).__name__,
-            "debug_code": "SIMULATE-ERROR-EXCEPTION",
-            "location": {
-                "file": error_location.filename.split('\\')[-1],  # Just filename
-                "line": error_location.lineno,
-                "function": error_location.name
-            },
-            "hint": "Check backend console for full stack trace. Common issues: Database connection, insufficient orders, or AI agent failure."
-        }), 500
+    from utils.operations import simulate_today_loads as run_simulation
+    return run_or_queue('simulate_today', run_simulation, request.get_json(silent=True) or {})
 
 @app.route('/api/loads/<load_id>', methods=['GET'])
 def get_load_by_id(load_id):
     """Get specific load by ID"""
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     try:
-        client = SupabaseClient()
+        client = get_supabase_client()
         load = client.get_load_by_id(load_id)
         if load:
             return jsonify(load), 200
@@ -1181,32 +956,27 @@ def get_load_by_id(load_id):
 @app.route('/api/map/load-routes', methods=['POST'])
 def get_load_routes_map_data():
     """Get map data for load routes visualization using database facilities"""
-    from database.supabase_client import SupabaseClient
+    from utils.facility_index import get_facility_index
     try:
         data = request.json
         load_plan = data.get('load_plan', {})
         
         print(f"[MAP] Received load_plan with {len(load_plan.get('loads', []))} loads")
         
-        # Initialize database client
-        db = SupabaseClient()
-        
-        # Get all facilities with coordinates
-        facilities = db.get_all_facilities()
-        facility_map = {}
+        facility_index = get_facility_index()
+        print(f"[MAP] Using {len(facility_index.facilities())} facilities from index")
         
-        # Create lookup maps by city name
-        for facility in facilities:
-            city = facility['city']
-            facility_map[city] = {
+        def map_coords(location):
+            facility = facility_index.lookup(location)
+            if not facility:
+                return None
+            return {
                 'lat': float(facility['latitude']),
                 'lng': float(facility['longitude']),
                 'name': facility['facility_name'],
                 'type': facility['facility_type']
             }
         
-        print(f"[MAP] Loaded {len(facility_map)} facilities from database")
-        
         # Build routes data for map
         routes = []
         for load in load_plan.get('loads', []):
@@ -1217,17 +987,11 @@ def get_load_routes_map_data():
                 
                 print(f"[MAP] Order {order.get('order_number')}: origin='{origin_str}', dest='{destination_str}'")
                 
-                # Extract city names from strings
-                # Origin format: "Toronto, ON - Toronto DC" -> extract "Toronto"
-                # Destination format: "New York, NY" -> extract "New York"
-                origin_city = origin_str.split(',')[0].strip() if ',' in origin_str else origin_str.split(' -')[0].strip()
-                dest_city = destination_str.split(',')[0].strip() if ',' in destination_str else destination_str.strip()
-                
-                # Lookup coordinates from database
-                origin_coords = facility_map.get(origin_city)
-                dest_coords = facility_map.get(dest_city)
+                # Lookup coordinates - the index understands "Toronto, ON - Toronto DC" and "New York, NY"
+                origin_coords = map_coords(origin_str)
+                dest_coords = map_coords(destination_str)
                 
-                print(f"[MAP] Lookup: origin_city='{origin_city}' -> {origin_coords}, dest_city='{dest_city}' -> {dest_coords}")
+                print(f"[MAP] Lookup: origin='{origin_str}' -> {origin_coords}, dest='{destination_str}' -> {dest_coords}")
                 
                 if origin_coords and dest_coords:
                     routes.append({
@@ -1322,7 +1086,7 @@ def mertsights_query():
     Converts natural language questions to SQL queries and returns visualizations
     """
     from agents.mertsights_ai import MertsightsAI
-    from database.supabase_client import SupabaseClient
+    from database.supabase_client import get_supabase_client
     
     try:
         data = request.json
@@ -1338,7 +1102,7 @@ def mertsights_query():
         print(f"[MERTSIGHTS] Received question: {question}")
         
         # Initialize RAG agent
-        client = SupabaseClient()
+        client = get_supabase_client()
         mertsights = MertsightsAI(client)
         
         # Analyze query and generate response
@@ -11,10 +11,31 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "your-gemini-api-key")
 GEMINI_MODEL = "gemini-2.5-flash"  # Gemini 2.5 Flash (free tier)
 
+# Gemini response cache (keyed on model + prompt hash + temperature)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True") == "True"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 512))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 3600))
+LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH", "")  # Set to persist responses on disk
+
+# Gemini call layer - total deadline per call, transient-error retries and circuit breaker
+LLM_MAX_RETRIES = 2  # Retries after the first attempt (429 / 5xx / timeouts only)
+LLM_BACKOFF_BASE_SECONDS = 1.0
+LLM_BACKOFF_MAX_SECONDS = 8.0
+LLM_BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures before failing fast
+LLM_BREAKER_RESET_SECONDS = 60  # Seconds before a trial call is allowed again
+MERTSIGHTS_LLM_TIMEOUT_SECONDS = 30  # Interactive analytics questions
+
 # Supabase Configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL", "your-supabase-url")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "your-supabase-key")
 
+# Direct Postgres (optional) - COPY ingest and server-side cursors for bulk paths
+DATABASE_URL = os.getenv("DATABASE_URL", "")  # e.g. postgresql://postgres:<password>@db.<ref>.supabase.co:5432/postgres
+PG_POOL_MIN_CONNECTIONS = 1
+PG_POOL_MAX_CONNECTIONS = int(os.getenv("PG_POOL_MAX_CONNECTIONS", 4))
+PG_CURSOR_ITERSIZE = 5000  # Rows fetched per round trip from a server-side cursor
+PG_RETRY_SECONDS = 60  # Wait before reconnecting after the direct connection failed
+
 # TMS Business Rules - Truck Constraints
 MAX_TRUCK_WEIGHT_LBS = 45000  # Maximum weight per truck
 MAX_TRUCK_VOLUME_CUFT = 4000  # Maximum volume per truck
@@ -25,15 +46,65 @@ BASE_RATE_PER_MILE = 2.50  # Base freight rate per mile
 FUEL_SURCHARGE_PERCENT = 0.15  # 15% fuel surcharge
 DETENTION_RATE_PER_HOUR = 75.00  # Cost per hour for truck detention
 AVERAGE_MPG = 6.5  # Average fuel economy for trucks
+DIESEL_PRICE_PER_GALLON = float(os.getenv("DIESEL_PRICE_PER_GALLON", 3.75))  # Used for fuel burn estimates
+DETENTION_FREE_HOURS = 2.0  # Waiting at a stop beyond this is billed as detention
 
 # TMS Business Rules - Route Parameters
 MAX_DRIVING_HOURS_PER_DAY = 11  # Hours of Service (HOS) limit
 AVERAGE_SPEED_MPH = 55  # Average highway speed
+HOS_DUTY_WINDOW_HOURS = 14  # Driving must stop this many hours after coming on duty
+HOS_BREAK_AFTER_DRIVING_HOURS = 8  # 30-minute break required after this much driving
+HOS_BREAK_HOURS = 0.5
+HOS_RESET_HOURS = 10  # Off-duty period that restarts the driving and duty limits
+STOP_SERVICE_HOURS = 1.0  # Unloading time at each delivery stop
+ROAD_DISTANCE_FACTOR = 1.2  # Road miles per great-circle mile (circuity)
+ROUTE_PLANNER_USE_AI = os.getenv("ROUTE_PLANNER_USE_AI", "False") == "True"
+ROUTE_PLANNER_AI_MIN_STOPS = 4  # Batch routing sends only loads with this many stops to Gemini
+ROUTE_PLANNER_AI_WORKERS = int(os.getenv("ROUTE_PLANNER_AI_WORKERS", 4))  # Concurrent Gemini calls per batch
+FACILITY_INDEX_TTL_SECONDS = int(os.getenv("FACILITY_INDEX_TTL_SECONDS", 600))  # Facility geocode cache lifetime
 
 # TMS Business Rules - Optimization Targets
 TARGET_TRUCK_UTILIZATION = 0.85  # Target 85% capacity utilization
 MIN_TRUCK_UTILIZATION = 0.60  # Minimum acceptable utilization
 
+# Load Optimizer - deterministic packing is the default; Gemini is an optional refinement pass
+LOAD_PACKING_STRATEGY = os.getenv("LOAD_PACKING_STRATEGY", "best_fit")  # best_fit | first_fit
+LOAD_OPTIMIZER_AI_POSTPASS = os.getenv("LOAD_OPTIMIZER_AI_POSTPASS", "False") == "True"
+LOAD_OPTIMIZER_AI_MAX_ORDERS = 500  # Larger plans skip the AI post-pass (prompt size)
+MAX_STOPS_PER_LOAD = 8  # Delivery stops allowed on one multi-stop load
+LOAD_SECTOR_DEGREES = 30  # Bearing sector width used to keep loads geographically compact
+LOAD_OPTIMIZER_WORKERS = int(os.getenv("LOAD_OPTIMIZER_WORKERS", 1))  # >1 packs origins in a process pool
+LOAD_OPTIMIZER_PARALLEL_MIN_ORDERS = 2000  # Smaller plans are packed in-process
+LOAD_NUMBER_RETRIES = 3  # Renumber and re-save when a concurrent run took the same LOAD_### numbers
+
+# Network Engineering - facility location k sweep
+FACILITY_SWEEP_MAX_CANDIDATES = 20  # Largest k_max - k_min + 1 accepted in one request
+FACILITY_SWEEP_WORKERS = int(os.getenv("FACILITY_SWEEP_WORKERS", 4))  # Threads fitting candidate k values
+
+# Load listings
+LOAD_ORDER_FETCH_WORKERS = int(os.getenv("LOAD_ORDER_FETCH_WORKERS", 4))  # Concurrent load_orders chunk requests per page
+
+# Bulk order ingest (monthly generation, imports)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 4))  # Insert requests in flight at once
+INGEST_CHUNK_BYTES = int(os.getenv("INGEST_CHUNK_BYTES", 512 * 1024))  # Target JSON payload per insert request
+INGEST_MAX_CHUNK_ROWS = 5000  # Upper bound on rows per insert request
+INGEST_MAX_RETRIES = 3  # Retries per failed chunk (chunk writes are idempotent on order_number)
+INGEST_RETRY_DELAY_SECONDS = 0.5  # First retry delay, doubled per attempt
+
+# Control Tower simulation (POST /api/loads/simulate-today)
+SIMULATION_DEFAULT_LOADS = 8  # The AI plan is written for this many loads; other counts use the fallback plan
+SIMULATION_ORDERS_PER_LOAD = 5  # Minimum orders on a simulated load
+SIMULATION_MAX_LOADS = int(os.getenv("SIMULATION_MAX_LOADS", 5000))  # Largest load_count accepted
+
+# Background jobs (optimize / simulate / monthly order generation)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))  # Concurrent background jobs per process
+JOB_RETENTION_SECONDS = 3600  # Finished jobs stay pollable for an hour
+JOB_STREAM_HEARTBEAT_SECONDS = 15  # SSE keep-alive comment interval (keeps proxies from closing idle streams)
+EXCLUSIVE_JOB_TYPES = ('optimize_loads', 'simulate_today')  # One at a time per process; a second request gets 409
+
+# Analytics dashboard
+DASHBOARD_CACHE_TTL_SECONDS = int(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", 30))  # KPIs are recomputed at most this often
+
 # Flask Configuration
 DEBUG = os.getenv("DEBUG", "False") == "True"
 PORT = int(os.getenv("PORT", 5000))
@@ -0,0 +1,78 @@
+-- Migration: Bulk Persistence for Optimized Load Plans
+-- Date: 2026-10-16
+-- Description: Adds save_load_plan() so /api/loads/optimize can persist a whole plan
+--              (loads, load_orders links and order assignments) in ONE round trip
+--              and ONE transaction, instead of one HTTP call per load and per order.
+
+-- p_loads is a JSON array of load rows (columns of the loads table) where each
+-- element also carries "orders": [{"order_id": "<uuid>", "sequence_number": 1}, ...]
+
+CREATE OR REPLACE FUNCTION save_load_plan(p_loads jsonb, p_planned_date timestamp)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    result jsonb;
+BEGIN
+    WITH new_loads AS (
+        INSERT INTO loads (
+            load_number, truck_type, total_weight_lbs, total_volume_cuft, utilization_percent,
+            origin, status, load_created_date, must_arrive_by_date, must_pick_up_by_date,
+            assigned_carrier
+        )
+        SELECT
+            l.load_number, l.truck_type, l.total_weight_lbs, l.total_volume_cuft, l.utilization_percent,
+            l.origin, COALESCE(l.status, 'Planning'), COALESCE(l.load_created_date, p_planned_date),
+            l.must_arrive_by_date, l.must_pick_up_by_date, COALESCE(l.assigned_carrier, 'NONE')
+        FROM jsonb_populate_recordset(NULL::loads, p_loads) AS l
+        RETURNING *
+    ),
+    links AS (
+        SELECT
+            nl.id AS load_id,
+            nl.load_number,
+            (o->>'order_id')::uuid AS order_id,
+            COALESCE((o->>'sequence_number')::int, 1) AS sequence_number
+        FROM new_loads nl
+        JOIN jsonb_array_elements(p_loads) AS pl ON pl->>'load_number' = nl.load_number
+        CROSS JOIN LATERAL jsonb_array_elements(COALESCE(pl->'orders', '[]'::jsonb)) AS o
+    ),
+    linked AS (
+        INSERT INTO load_orders (load_id, order_id, sequence_number)
+        SELECT load_id, order_id, sequence_number FROM links
+        RETURNING order_id
+    ),
+    updated AS (
+        UPDATE orders
+        SET planned_to_load_date = p_planned_date,
+            assigned_load_number = links.load_number,
+            status = 'Assigned',
+            updated_at = NOW()
+        FROM links
+        WHERE orders.id = links.order_id
+          -- Only orders still unplanned: a concurrent run may have assigned them since they were read
+          AND orders.status = 'Pending'
+          AND orders.planned_to_load_date IS NULL
+        RETURNING orders.id
+    )
+    SELECT jsonb_build_object(
+        'loads', COALESCE((SELECT jsonb_agg(to_jsonb(new_loads)) FROM new_loads), '[]'::jsonb),
+        'load_orders_created', (SELECT COUNT(*) FROM linked),
+        'orders_updated', (SELECT COUNT(*) FROM updated)
+    ) INTO result;
+
+    -- Roll the whole plan back rather than give an order a second load
+    IF (result->>'orders_updated')::int < (result->>'load_orders_created')::int THEN
+        RAISE EXCEPTION 'orders_already_assigned: % of % orders were assigned by another run',
+            (result->>'load_orders_created')::int - (result->>'orders_updated')::int,
+            (result->>'load_orders_created')::int;
+    END IF;
+
+    RETURN result;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION save_load_plan(jsonb, timestamp) TO authenticated;
+GRANT EXECUTE ON FUNCTION save_load_plan(jsonb, timestamp) TO anon;
+
+COMMENT ON FUNCTION save_load_plan(jsonb, timestamp) IS 'Persist an optimized load plan (loads + load_orders + order assignments) in one transaction.';
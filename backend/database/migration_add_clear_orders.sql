@@ -0,0 +1,33 @@
+-- Migration: Set-Based Order Clearing
+-- Date: 2026-10-16
+-- Description: Adds clear_orders() so /api/orders/clear deletes every order (and its
+--              load_orders links) inside the database in one transaction and returns
+--              the counts, instead of downloading every order id and sending them all
+--              back in one delete filter.
+
+CREATE OR REPLACE FUNCTION clear_orders()
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_links BIGINT;
+    v_orders BIGINT;
+BEGIN
+    -- Links would also go through ON DELETE CASCADE; deleting them first gives the count
+    DELETE FROM load_orders WHERE order_id IN (SELECT id FROM orders);
+    GET DIAGNOSTICS v_links = ROW_COUNT;
+
+    DELETE FROM orders WHERE id IS NOT NULL;
+    GET DIAGNOSTICS v_orders = ROW_COUNT;
+
+    RETURN jsonb_build_object(
+        'orders_deleted', v_orders,
+        'load_orders_deleted', v_links
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION clear_orders() TO authenticated;
+GRANT EXECUTE ON FUNCTION clear_orders() TO anon;
+
+COMMENT ON FUNCTION clear_orders() IS 'Delete all orders and their load_orders links in one transaction; returns the deleted counts.';
@@ -0,0 +1,40 @@
+-- Migration: Persisted Cost Analyses
+-- Date: 2026-10-16
+-- Description: One stored cost breakdown per load, keyed by load_id, so /api/costs/analyze
+--              only recomputes loads whose orders or route changed (content_hash) and
+--              dashboards / mertsightsAI read precomputed rows.
+--              schema_optimized.sql drops cost_analysis, so the table is recreated here.
+
+CREATE TABLE IF NOT EXISTS cost_analysis (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    load_id UUID REFERENCES loads(id) ON DELETE CASCADE,
+    base_freight_cost DECIMAL(10, 2),
+    fuel_surcharge DECIMAL(10, 2),
+    detention_fees DECIMAL(10, 2),
+    total_cost DECIMAL(10, 2),
+    cost_per_mile DECIMAL(5, 2),
+    analysis_data JSONB,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Short loads with detention can exceed 999.99/mile
+ALTER TABLE cost_analysis ALTER COLUMN cost_per_mile TYPE DECIMAL(10, 2);
+
+ALTER TABLE cost_analysis ADD COLUMN IF NOT EXISTS total_miles DECIMAL(10, 1);
+ALTER TABLE cost_analysis ADD COLUMN IF NOT EXISTS cost_per_order DECIMAL(10, 2);
+ALTER TABLE cost_analysis ADD COLUMN IF NOT EXISTS baseline_cost DECIMAL(12, 2);
+ALTER TABLE cost_analysis ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+ALTER TABLE cost_analysis ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+
+-- Keep only the newest row per load before enforcing one analysis per load
+DELETE FROM cost_analysis ca
+USING cost_analysis newer
+WHERE ca.load_id = newer.load_id
+  AND (ca.created_at, ca.id) < (newer.created_at, newer.id);
+
+-- Upserts use ON CONFLICT (load_id)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_cost_analysis_load_id ON cost_analysis(load_id);
+
+ALTER TABLE cost_analysis ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Allow all operations on cost_analysis" ON cost_analysis;
+CREATE POLICY "Allow all operations on cost_analysis" ON cost_analysis FOR ALL USING (true);
@@ -0,0 +1,44 @@
+-- Migration: Dashboard KPI Aggregates
+-- Date: 2026-10-16
+-- Description: Adds dashboard_kpis() so /api/analytics/dashboard gets every KPI from one
+--              round trip of SQL aggregates instead of the browser downloading all orders
+--              and loads to count them client-side.
+
+CREATE OR REPLACE FUNCTION dashboard_kpis()
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'orders_by_status', COALESCE((
+            SELECT jsonb_object_agg(status, n)
+            FROM (SELECT COALESCE(status, 'Unknown') AS status, COUNT(*) AS n FROM orders GROUP BY 1) s
+        ), '{}'::jsonb),
+        'unplanned_orders', (
+            SELECT COUNT(*) FROM orders WHERE status = 'Pending' AND planned_to_load_date IS NULL
+        ),
+        'loads_by_status', COALESCE((
+            SELECT jsonb_object_agg(status, n)
+            FROM (SELECT COALESCE(status, 'Unknown') AS status, COUNT(*) AS n FROM loads GROUP BY 1) s
+        ), '{}'::jsonb),
+        'avg_utilization', (
+            SELECT COALESCE(ROUND(AVG(utilization_percent)::numeric, 1), 0)
+            FROM loads WHERE utilization_percent IS NOT NULL
+        ),
+        'cost_savings_ytd', (
+            SELECT COALESCE(ROUND(SUM(ca.baseline_cost - ca.total_cost)::numeric, 2), 0)
+            FROM cost_analysis ca
+            JOIN loads l ON l.id = ca.load_id
+            WHERE COALESCE(l.load_created_date, l.created_at) >= date_trunc('year', NOW())
+        ),
+        'total_cost_ytd', (
+            SELECT COALESCE(ROUND(SUM(ca.total_cost)::numeric, 2), 0)
+            FROM cost_analysis ca
+            JOIN loads l ON l.id = ca.load_id
+            WHERE COALESCE(l.load_created_date, l.created_at) >= date_trunc('year', NOW())
+        )
+    );
+$$;
+
+GRANT EXECUTE ON FUNCTION dashboard_kpis() TO authenticated;
+GRANT EXECUTE ON FUNCTION dashboard_kpis() TO anon;
@@ -0,0 +1,35 @@
+-- Migration: Load Number Reservation
+-- Date: 2026-10-16
+-- Description: Adds reserve_load_numbers() so concurrent optimization runs draw
+--              LOAD_### numbers from one sequence instead of each reading
+--              MAX(load_number) + 1 and colliding on the UNIQUE load_number.
+
+CREATE SEQUENCE IF NOT EXISTS load_number_seq;
+
+-- Returns the first of p_count consecutive numbers reserved for the caller
+CREATE OR REPLACE FUNCTION reserve_load_numbers(p_count integer)
+RETURNS bigint
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_max bigint;
+    v_first bigint;
+BEGIN
+    -- Serialize reservations so each caller gets a contiguous block
+    PERFORM pg_advisory_xact_lock(hashtext('reserve_load_numbers'));
+
+    -- Never hand out a number already used by loads written outside the sequence
+    SELECT COALESCE(MAX(SUBSTRING(load_number FROM 6)::bigint), 0) INTO v_max
+    FROM loads
+    WHERE load_number ~ '^LOAD_[0-9]+$';
+
+    v_first := GREATEST(nextval('load_number_seq'), v_max + 1);
+    PERFORM setval('load_number_seq', v_first + GREATEST(p_count, 1) - 1);
+    RETURN v_first;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION reserve_load_numbers(integer) TO authenticated;
+GRANT EXECUTE ON FUNCTION reserve_load_numbers(integer) TO anon;
+
+COMMENT ON FUNCTION reserve_load_numbers(integer) IS 'Reserve p_count consecutive LOAD_### numbers; returns the first one.';
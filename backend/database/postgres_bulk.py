@@ -0,0 +1,243 @@
+"""
+Direct Postgres Bulk Access
+COPY ingest and server-side cursor reads for bulk paths, alongside the PostgREST client
+
+Optional: used only when DATABASE_URL points at the Supabase (or a local)
+Postgres database. Everything else keeps going through SupabaseClient.
+"""
+import csv
+import io
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    DATABASE_URL,
+    PG_POOL_MIN_CONNECTIONS,
+    PG_POOL_MAX_CONNECTIONS,
+    PG_CURSOR_ITERSIZE,
+    PG_RETRY_SECONDS
+)
+
+COPY_NULL = '\\N'
+COPY_BATCH_ROWS = 50000  # Rows serialized per COPY stream (bounds the CSV buffer)
+
+
+def _copy_value(value):
+    """Text for one CSV field (COPY_NULL for missing values)"""
+    if value is None or value != value:  # NaN / NaT
+        return COPY_NULL
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_buffer(rows, columns):
+    """CSV text for dict rows or a DataFrame, in column order"""
+    buffer = io.StringIO()
+    if hasattr(rows, 'to_csv'):
+        rows.to_csv(buffer, columns=columns, header=False, index=False, na_rep=COPY_NULL)
+    else:
+        writer = csv.writer(buffer, lineterminator='\n')
+        for row in rows:
+            writer.writerow([_copy_value(row.get(column)) for column in columns])
+    buffer.seek(0)
+    return buffer
+
+
+class PostgresBulkClient:
+    """
+    Pooled psycopg2 connections for COPY FROM STDIN and named-cursor reads
+
+    Rows come back as dictionaries with numeric columns as floats (like the
+    PostgREST JSON) and timestamps as datetime objects.
+    """
+
+    def __init__(self, dsn=DATABASE_URL, min_connections=PG_POOL_MIN_CONNECTIONS,
+                 max_connections=PG_POOL_MAX_CONNECTIONS):
+        """
+        Args:
+            dsn: Postgres connection string (e.g. the Supabase pooler URI or postgresql://localhost/tms)
+            min_connections: Connections opened up front
+            max_connections: Most connections held at once
+        """
+        from psycopg2 import extensions, extras, pool, sql
+        if not dsn:
+            raise ValueError("DATABASE_URL is not set")
+        self._extensions = extensions
+        self._extras = extras
+        self._sql = sql
+        self._decimal_as_float = extensions.new_type(
+            extensions.DECIMAL.values, 'DECIMAL_AS_FLOAT',
+            lambda value, cursor: float(value) if value is not None else None
+        )
+        self.pool = pool.ThreadedConnectionPool(min_connections, max_connections, dsn)
+        print(f"[POSTGRES] Connection pool ready ({min_connections}-{max_connections} connections)")
+
+    @contextmanager
+    def connection(self):
+        """Pooled connection for one transaction (committed on success, rolled back on error)"""
+        conn = self.pool.getconn()
+        try:
+            self._extensions.register_type(self._decimal_as_float, conn)
+            yield conn
+            conn.commit()
+        except BaseException:  # Includes GeneratorExit from a partly consumed iter_rows
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def close(self):
+        """Close every pooled connection"""
+        self.pool.closeall()
+
+    # Ingest
+    def copy_rows(self, table, rows, columns=None, conflict_column=None):
+        """
+        Bulk insert rows with COPY FROM STDIN in one transaction
+
+        With conflict_column the rows are copied into a temporary staging
+        table and moved with INSERT ... ON CONFLICT (conflict_column) DO
+        NOTHING, so re-running an import does not duplicate or fail on rows
+        already present.
+
+        Args:
+            table: Target table
+            rows: List of dictionaries or a DataFrame
+            columns: Columns to write (default: every key present in the rows);
+                     columns left out take their database defaults
+            conflict_column: Unique column that makes the load idempotent
+
+        Returns:
+            Dictionary with rows sent, rows written and throughput
+        """
+        sql = self._sql
+        started = time.monotonic()
+        if columns is None:
+            columns = list(rows.columns) if hasattr(rows, 'columns') else list(dict.fromkeys(k for row in rows for k in row))
+        total = len(rows)
+        if not total:
+            return {'rows': 0, 'written': 0, 'already_present': 0, 'failed_rows': 0,
+                    'elapsed_seconds': 0.0, 'rows_per_second': None}
+
+        column_list = sql.SQL(',').join(map(sql.Identifier, columns))
+        stage = sql.Identifier(f"stage_{uuid.uuid4().hex[:12]}")
+        target = stage if conflict_column else sql.Identifier(table)
+        copy_sql = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL {})").format(
+            target, column_list, sql.Literal(COPY_NULL))
+
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                if conflict_column:
+                    cur.execute(sql.SQL("CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP").format(
+                        stage, sql.Identifier(table)))
+                statement = copy_sql.as_string(conn)
+                for start in range(0, total, COPY_BATCH_ROWS):
+                    batch = rows.iloc[start:start + COPY_BATCH_ROWS] if hasattr(rows, 'iloc') else rows[start:start + COPY_BATCH_ROWS]
+                    cur.copy_expert(statement, _csv_buffer(batch, columns))
+                if conflict_column:
+                    cur.execute(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} ON CONFLICT ({}) DO NOTHING").format(
+                        sql.Identifier(table), column_list, column_list, stage, sql.Identifier(conflict_column)))
+                    written = cur.rowcount
+                else:
+                    written = total
+
+        elapsed = time.monotonic() - started
+        stats = {
+            'rows': total,
+            'written': written,
+            'already_present': total - written,
+            'failed_rows': 0,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(total / elapsed, 1) if elapsed else None
+        }
+        print(f"[POSTGRES] COPY {table}: {written}/{total} rows written in {stats['elapsed_seconds']}s "
+              f"({stats['rows_per_second']} rows/s)")
+        return stats
+
+    def copy_orders(self, rows):
+        """COPY orders, skipping order_numbers already present"""
+        from utils.dashboard_kpis import invalidate_dashboard_kpis
+        stats = self.copy_rows('orders', rows, conflict_column='order_number')
+        invalidate_dashboard_kpis()
+        return stats
+
+    def copy_facilities(self, rows):
+        """COPY facilities, skipping facility_codes already present"""
+        from utils.facility_index import invalidate_facility_index
+        stats = self.copy_rows('facilities', rows, conflict_column='facility_code')
+        invalidate_facility_index()
+        return stats
+
+    def copy_products(self, rows):
+        """COPY products, skipping product_ids already present"""
+        return self.copy_rows('products', rows, conflict_column='product_id')
+
+    # Reads
+    def iter_rows(self, table, columns='*', itersize=PG_CURSOR_ITERSIZE):
+        """
+        Stream a whole table through a server-side (named) cursor
+
+        The server holds the result set; the client fetches itersize rows per
+        round trip, so memory stays flat however large the table is.
+
+        Args:
+            table: Table to read
+            columns: '*' or a list / comma separated string of column names
+            itersize: Rows fetched per round trip
+
+        Yields:
+            Row dictionaries
+        """
+        sql = self._sql
+        if columns == '*':
+            projection = sql.SQL('*')
+        else:
+            names = [c.strip() for c in columns.split(',')] if isinstance(columns, str) else list(columns)
+            projection = sql.SQL(',').join(map(sql.Identifier, names))
+        query = sql.SQL("SELECT {} FROM {}").format(projection, sql.Identifier(table))
+        yield from self.iter_query(query, itersize=itersize)
+
+    def iter_query(self, query, params=None, itersize=PG_CURSOR_ITERSIZE):
+        """Stream the rows of any SELECT through a server-side cursor"""
+        with self.connection() as conn:
+            with conn.cursor(name=f"bulk_{uuid.uuid4().hex[:12]}", cursor_factory=self._extras.RealDictCursor) as cur:
+                cur.itersize = itersize
+                cur.execute(query, params)
+                for row in cur:
+                    yield dict(row)
+
+
+_bulk_client = None
+_bulk_client_lock = threading.Lock()
+_bulk_client_retry_at = 0.0  # monotonic time before which a failed connect is not retried
+
+
+def get_bulk_client():
+    """
+    Return the shared PostgresBulkClient, or None when DATABASE_URL is unset
+    or the database cannot be reached (callers fall back to PostgREST)
+
+    A failed connect is retried after PG_RETRY_SECONDS, so an outage at
+    startup does not disable the direct path for the life of the process.
+    """
+    global _bulk_client, _bulk_client_retry_at
+    if _bulk_client is None and DATABASE_URL and time.monotonic() >= _bulk_client_retry_at:
+        with _bulk_client_lock:
+            if _bulk_client is None and time.monotonic() >= _bulk_client_retry_at:
+                try:
+                    _bulk_client = PostgresBulkClient()
+                except Exception as e:
+                    _bulk_client_retry_at = time.monotonic() + PG_RETRY_SECONDS
+                    print(f"[POSTGRES] Direct connection unavailable, bulk paths use PostgREST "
+                          f"(retry in {PG_RETRY_SECONDS}s): {str(e)}")
+    return _bulk_client
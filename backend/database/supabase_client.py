@@ -2,36 +2,87 @@
 Supabase Database Client
 """
 from supabase import create_client, Client
+from postgrest.types import CountMethod, ReturnMethod
 import sys
 import os
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.settings import SUPABASE_URL, SUPABASE_KEY
+from config.settings import SUPABASE_URL, SUPABASE_KEY, LOAD_ORDER_FETCH_WORKERS
+
+def _function_missing(error):
+    """True when an RPC failed only because the database function is not installed"""
+    return getattr(error, 'code', None) in ('PGRST202', '42883') or 'Could not find the function' in str(error)
+
+
+def is_unique_violation(error):
+    """True when a write failed on a UNIQUE constraint (e.g. a load_number taken concurrently)"""
+    return getattr(error, 'code', None) == '23505' or 'duplicate key value' in str(error)
+
+
+class OrdersAlreadyAssignedError(Exception):
+    """Raised when another run assigned some of the orders being planned (nothing is saved)"""
+
 
 class SupabaseClient:
     """
     Wrapper for Supabase database operations
     """
     
-    def __init__(self):
-        # Add retry logic for Render deployment
-        max_retries = 3
-        retry_delay = 2
+    def __init__(self, verify_connection=True):
+        """
+        Args:
+            verify_connection: Run a test query (with retries) before returning.
+                               The shared client skips this and checks health
+                               out of band instead.
+        """
+        self.client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        self.last_health_check = None
+        if verify_connection:
+            result = self.check_connection()
+            if not result['success']:
+                raise ConnectionError(result['error'])
+    
+    def check_connection(self, max_retries=3, retry_delay=2):
+        """
+        Run a minimal query to confirm the database is reachable
         
+        Args:
+            max_retries: Attempts before giving up (Render cold starts can be slow)
+            retry_delay: Seconds to wait between attempts
+            
+        Returns:
+            dict: success flag, timestamp, attempts and error (if any)
+        """
+        error = None
         for attempt in range(max_retries):
             try:
-                self.client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-                # Test connection
                 self.client.table('facilities').select('id').limit(1).execute()
+                error = None
                 break
             except Exception as e:
+                error = str(e)
                 if attempt < max_retries - 1:
                     print(f"[SUPABASE] Connection attempt {attempt + 1} failed, retrying in {retry_delay}s...")
                     time.sleep(retry_delay)
                 else:
                     print(f"[SUPABASE] Failed to connect after {max_retries} attempts")
-                    raise
+        
+        self.last_health_check = {
+            'success': error is None,
+            'timestamp': datetime.now().isoformat(),
+            'attempts': attempt + 1,
+            'error': error
+        }
+        return self.last_health_check
+    
+    def _data_changed(self):
+        """Drop cached dashboard KPIs after a write to orders, loads or costs"""
+        from utils.dashboard_kpis import invalidate_dashboard_kpis
+        invalidate_dashboard_kpis()
     
     # Facilities Operations
     def get_all_facilities(self):
@@ -62,7 +113,9 @@ class SupabaseClient:
     
     def create_facilities_batch(self, facilities_list):
         """Insert multiple facilities at once"""
+        from utils.facility_index import invalidate_facility_index
         response = self.client.table('facilities').insert(facilities_list).execute()
+        invalidate_facility_index()
         return response.data
     
     # Products Operations
@@ -98,14 +151,87 @@ class SupabaseClient:
         return response.data
     
     # Orders Operations
-    def get_all_orders(self):
-        """Get all orders from database (with increased limit for large datasets)"""
-        # Supabase PostgREST has a default limit of 1000 rows
-        # Use range() to get more rows: range(0, 19999) gets rows 0-19999 (20k total)
-        response = self.client.table('orders').select('*').range(0, 19999).execute()
-        print(f"[SUPABASE] Retrieved {len(response.data)} orders from database")
+    ORDER_PAGE_SIZE = 1000  # Matches the PostgREST max-rows default on Supabase
+    ID_FILTER_CHUNK = 200  # ids per in_() filter, keeps the query string bounded
+    
+    def query_orders(self, status=None, unplanned=False, order_ids=None, columns='*',
+                     limit=ORDER_PAGE_SIZE, after_id=None, since=None):
+        """
+        Fetch one page of orders with the filters applied by PostgREST
+        
+        Args:
+            status: Status value or list of values to match
+            unplanned: Only orders without a planned_to_load_date
+            order_ids: Only these order ids (keep the list short - see iter_orders)
+            columns: Comma separated column projection ('*' for all)
+            limit: Page size
+            after_id: Keyset cursor - return orders with id greater than this
+            since: Only orders created or updated at/after this ISO timestamp
+            
+        Returns:
+            List of order dictionaries ordered by id
+        """
+        if columns != '*' and 'id' not in [c.strip() for c in columns.split(',')]:
+            columns = f"id,{columns}"  # Keyset pagination needs the id
+        
+        query = self.client.table('orders').select(columns)
+        if isinstance(status, (list, tuple)):
+            query = query.in_('status', list(status))
+        elif status:
+            query = query.eq('status', status)
+        if unplanned:
+            query = query.is_('planned_to_load_date', 'null')
+        if order_ids:
+            query = query.in_('id', list(order_ids))
+        if since:
+            query = query.or_(f'created_at.gte."{since}",updated_at.gte."{since}"')
+        if after_id:
+            query = query.gt('id', after_id)
+        
+        response = query.order('id').limit(limit).execute()
         return response.data
     
+    def iter_orders(self, page_size=ORDER_PAGE_SIZE, order_ids=None, **filters):
+        """
+        Stream every matching order using keyset pagination on id
+        
+        Unlike a single range() query there is no row ceiling, and each page is
+        an indexed 'id > cursor' lookup rather than an OFFSET scan.
+        
+        Args:
+            page_size: Rows per request
+            order_ids: Optional id list, fetched in bounded chunks
+            **filters: status, unplanned, columns, since (see query_orders)
+            
+        Yields:
+            Order dictionaries
+        """
+        if order_ids is not None:
+            order_ids = list(order_ids)
+            for i in range(0, len(order_ids), self.ID_FILTER_CHUNK):
+                chunk = order_ids[i:i + self.ID_FILTER_CHUNK]
+                yield from self.query_orders(order_ids=chunk, limit=len(chunk), **filters)
+            return
+        
+        after_id = None
+        while True:
+            page = self.query_orders(limit=page_size, after_id=after_id, **filters)
+            yield from page
+            if len(page) < page_size:
+                break
+            after_id = page[-1]['id']
+    
+    def get_orders(self, **filters):
+        """Get all orders matching the filters (see iter_orders)"""
+        orders = list(self.iter_orders(**filters))
+        described = {k: (f"{len(v)} ids" if k == 'order_ids' else v) for k, v in filters.items()}
+        print(f"[SUPABASE] Retrieved {len(orders)} orders matching {described or 'no filters'}")
+        return orders
+    
+    def get_all_orders(self):
+        """Get all orders from database (paged, no row limit)"""
+        return self.get_orders()
+    
     def get_order_by_id(self, order_id):
         """Get specific order by ID"""
         response = self.client.table('orders').select('*').eq('id', order_id).execute()
@@ -114,6 +240,7 @@ class SupabaseClient:
     def create_order(self, order_data):
         """Insert new order"""
         response = self.client.table('orders').insert(order_data).execute()
+        self._data_changed()
         return response.data[0] if response.data else None
     
     def create_orders_batch(self, orders_list):
@@ -121,96 +248,347 @@ class SupabaseClient:
         try:
             print(f"[SUPABASE] Inserting {len(orders_list)} orders...")
             response = self.client.table('orders').insert(orders_list).execute()
+            self._data_changed()
             print(f"[SUPABASE] Successfully inserted {len(response.data)} orders")
             return response.data
         except Exception as e:
             print(f"[SUPABASE ERROR] Failed to insert orders: {str(e)}")
             raise
     
-    def create_orders_batch_chunked(self, orders_list, chunk_size=100):
-        """Insert multiple orders in chunks to avoid size limits"""
-        all_results = []
-        total_chunks = (len(orders_list) + chunk_size - 1) // chunk_size
-        for i in range(0, len(orders_list), chunk_size):
-            chunk = orders_list[i:i + chunk_size]
-            chunk_num = (i // chunk_size) + 1
-            print(f"[SUPABASE] Inserting chunk {chunk_num}/{total_chunks} ({len(chunk)} orders)...")
-            try:
-                response = self.client.table('orders').insert(chunk).execute()
-                all_results.extend(response.data)
-                print(f"[SUPABASE] Chunk {chunk_num} inserted successfully")
-            except Exception as e:
-                print(f"[SUPABASE ERROR] Chunk {chunk_num} failed: {str(e)}")
-                raise
-        print(f"[SUPABASE] Total inserted: {len(all_results)} orders")
-        return all_results
+    def create_orders_batch_chunked(self, orders_list, chunk_size=None, on_chunk=None, workers=None):
+        """
+        Insert many orders with concurrent, byte-sized chunk requests
+        
+        Chunks are written as INSERT ... ON CONFLICT (order_number) DO NOTHING,
+        so a failed chunk can be retried without duplicating orders it may
+        already have written; other chunks carry on meanwhile.
+        
+        Args:
+            orders_list: Order rows to insert
+            chunk_size: Fixed rows per request (default: sized to INGEST_CHUNK_BYTES)
+            on_chunk: Optional callback(inserted_so_far, total) as chunks complete
+            workers: Concurrent requests (default INGEST_WORKERS)
+            
+        Returns:
+            Upload stats (see BulkUploader.upload) - 'written' counts new orders
+        """
+        from utils.bulk_ingest import BulkUploader
+        
+        def send(chunk):
+            response = self.client.table('orders').upsert(
+                chunk, on_conflict='order_number', ignore_duplicates=True,
+                returning=ReturnMethod.minimal, count=CountMethod.exact
+            ).execute()
+            return response.count
+        
+        uploader = BulkUploader(send, **({'workers': workers} if workers else {}))
+        try:
+            return uploader.upload(orders_list, chunk_size=chunk_size, on_progress=on_chunk)
+        finally:
+            self._data_changed()
     
     def update_order_status(self, order_id, status):
         """Update order status"""
         response = self.client.table('orders').update({'status': status}).eq('id', order_id).execute()
+        self._data_changed()
         return response.data[0] if response.data else None
     
     def update_order(self, order_id, update_data):
         """Update order with any fields"""
         response = self.client.table('orders').update(update_data).eq('id', order_id).execute()
+        self._data_changed()
         return response.data[0] if response.data else None
     
+    DELETE_CHUNK = 5000  # Rows per id-range delete when clear_orders() is not installed
+    
     def delete_all_orders(self):
-        """Delete all orders from the table"""
-        # First get all order IDs
-        orders = self.get_all_orders()
-        if not orders:
-            return []
-        
-        # Delete all orders
-        order_ids = [order['id'] for order in orders]
-        response = self.client.table('orders').delete().in_('id', order_ids).execute()
-        return response.data
+        """
+        Delete every order and its load_orders links without reading the orders
+        
+        Uses the clear_orders() database function (one transaction, one
+        request) when it is installed, otherwise deletes load_orders and then
+        orders in id ranges of DELETE_CHUNK rows. Any other RPC error (e.g. a
+        statement timeout) is raised rather than retried as chunked deletes.
+        
+        Returns:
+            Dictionary with 'orders_deleted', 'load_orders_deleted' and round trips used
+        """
+        try:
+            result = self.client.rpc('clear_orders', {}).execute().data or {}
+        except Exception as e:
+            if not _function_missing(e):
+                raise
+            print(f"[SUPABASE] clear_orders RPC not installed, deleting in id ranges: {str(e)}")
+        else:
+            self._data_changed()
+            print(f"[SUPABASE] Cleared {result.get('orders_deleted', 0)} orders via clear_orders RPC")
+            return {
+                'orders_deleted': result.get('orders_deleted', 0),
+                'load_orders_deleted': result.get('load_orders_deleted', 0),
+                'round_trips': 1
+            }
+        
+        try:
+            # Links first - their orders' ON DELETE CASCADE would remove them uncounted
+            links_deleted, link_trips = self._delete_in_id_ranges('load_orders')
+            orders_deleted, order_trips = self._delete_in_id_ranges('orders')
+        finally:
+            self._data_changed()
+        print(f"[SUPABASE] Cleared {orders_deleted} orders and {links_deleted} links "
+              f"in {link_trips + order_trips} round trips")
+        return {
+            'orders_deleted': orders_deleted,
+            'load_orders_deleted': links_deleted,
+            'round_trips': link_trips + order_trips
+        }
+    
+    def _delete_in_id_ranges(self, table):
+        """
+        Delete a whole table in id order, DELETE_CHUNK rows per request
+        
+        Each step reads only the id DELETE_CHUNK rows in and deletes every
+        row up to it, so no id lists travel in either direction.
+        
+        Returns:
+            (rows deleted, round trips)
+        """
+        deleted = 0
+        round_trips = 0
+        while True:
+            boundary = self.client.table(table).select('id').order('id') \
+                .range(self.DELETE_CHUNK - 1, self.DELETE_CHUNK - 1).execute().data
+            query = self.client.table(table).delete(count=CountMethod.exact, returning=ReturnMethod.minimal)
+            if boundary:
+                query = query.lte('id', boundary[0]['id'])
+            else:
+                query = query.not_.is_('id', 'null')  # Fewer than DELETE_CHUNK rows left
+            deleted += query.execute().count or 0
+            round_trips += 2
+            if not boundary:
+                return deleted, round_trips
     
     # Loads Operations
-    def get_all_loads(self):
-        """Get all loads with their orders (optimized)"""
-        # Fetch all loads - use range() to handle more than 1000 loads
-        response = self.client.table('loads').select('*').range(0, 19999).execute()
-        loads = response.data
+    # Column sets for load listings; ids are always included for keyset paging
+    LOAD_COLUMN_SETS = {
+        'summary': 'id,load_number,status,origin,truck_type,utilization_percent,must_pick_up_by_date,'
+                   'must_arrive_by_date,assigned_carrier',
+        'list': 'id,load_number,status,origin,truck_type,total_weight_lbs,total_volume_cuft,utilization_percent,'
+                'load_created_date,must_pick_up_by_date,must_arrive_by_date,estimated_delivery_date,'
+                'assigned_carrier,created_at,updated_at',
+        'full': '*'
+    }
+    LOAD_ORDER_MODES = ('full', 'summary', 'none')
+    
+    def query_loads(self, status=None, columns='*', limit=ORDER_PAGE_SIZE, after_id=None):
+        """
+        Fetch one page of loads (without orders)
+        
+        Args:
+            status: Status value or list of values to match
+            columns: Column set name (see LOAD_COLUMN_SETS) or comma separated projection
+            limit: Page size
+            after_id: Keyset cursor - return loads with id greater than this
+            
+        Returns:
+            List of load dictionaries ordered by id
+        """
+        columns = self.LOAD_COLUMN_SETS.get(columns, columns)
+        if columns != '*' and 'id' not in [c.strip() for c in columns.split(',')]:
+            columns = f"id,{columns}"  # Keyset pagination needs the id
         
-        if not loads:
-            return []
+        query = self.client.table('loads').select(columns)
+        if isinstance(status, (list, tuple)):
+            query = query.in_('status', list(status))
+        elif status:
+            query = query.eq('status', status)
+        if after_id:
+            query = query.gt('id', after_id)
+        return query.order('id').limit(limit).execute().data
+    
+    def attach_load_orders(self, loads, orders='full', order_columns='*', workers=LOAD_ORDER_FETCH_WORKERS):
+        """
+        Attach each load's orders, fetched in bounded load-id chunks in parallel
+        
+        Args:
+            loads: Load dictionaries (modified in place)
+            orders: 'full' sets load['orders'] (sorted by sequence number),
+                    'summary' sets order_count and order_ids, 'none' does nothing
+            order_columns: Order projection for 'full'
+            workers: Concurrent chunk requests
+            
+        Returns:
+            The loads
+        """
+        if orders == 'none' or not loads:
+            return loads
+        if orders == 'summary':
+            columns = 'id,load_id,order_id,sequence_number'
+        else:
+            columns = f"id,load_id,sequence_number,orders({order_columns})"
         
-        # Fetch ALL load_orders in one query
         load_ids = [load['id'] for load in loads]
-        load_orders_response = self.client.table('load_orders').select('*, orders(*)').in_('load_id', load_ids).order('sequence_number').range(0, 19999).execute()
+        chunks = [load_ids[i:i + self.ID_FILTER_CHUNK] for i in range(0, len(load_ids), self.ID_FILTER_CHUNK)]
+        if len(chunks) == 1 or workers <= 1:
+            links = [link for chunk in chunks for link in self._load_order_links(chunk, columns)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(chunks)), thread_name_prefix='load-orders') as pool:
+                links = [link for page in pool.map(lambda chunk: self._load_order_links(chunk, columns), chunks)
+                         for link in page]
+        
+        links.sort(key=lambda link: link.get('sequence_number') or 0)
+        links_by_load = {}
+        for link in links:
+            links_by_load.setdefault(link['load_id'], []).append(link)
         
-        # Group orders by load_id
-        orders_by_load = {}
-        for lo in load_orders_response.data:
-            load_id = lo['load_id']
-            if load_id not in orders_by_load:
-                orders_by_load[load_id] = []
-            if lo.get('orders'):
-                orders_by_load[load_id].append(lo['orders'])
-        
-        # Attach orders to loads
         for load in loads:
-            load['orders'] = orders_by_load.get(load['id'], [])
+            load_links = links_by_load.get(load['id'], [])
+            if orders == 'summary':
+                load['order_count'] = len(load_links)
+                load['order_ids'] = [link['order_id'] for link in load_links]
+            else:
+                load['orders'] = [link['orders'] for link in load_links if link.get('orders')]
+        return loads
+    
+    def _load_order_links(self, load_ids, columns):
+        """Every load_orders row for a chunk of loads, keyset paged"""
+        links = []
+        after_id = None
+        while True:
+            query = self.client.table('load_orders').select(columns).in_('load_id', load_ids)
+            if after_id:
+                query = query.gt('id', after_id)
+            page = query.order('id').limit(self.ORDER_PAGE_SIZE).execute().data
+            links.extend(page)
+            if len(page) < self.ORDER_PAGE_SIZE:
+                return links
+            after_id = page[-1]['id']
+    
+    def iter_loads(self, page_size=ORDER_PAGE_SIZE, orders='full', order_columns='*', **filters):
+        """
+        Stream loads page by page, each page with its orders attached
+        
+        Memory and per-request size stay bounded by page_size however many
+        loads the table holds.
+        
+        Args:
+            page_size: Loads per request
+            orders: 'full', 'summary' or 'none' (see attach_load_orders)
+            order_columns: Order projection for 'full'
+            **filters: status, columns (see query_loads)
+            
+        Yields:
+            Load dictionaries
+        """
+        after_id = None
+        while True:
+            page = self.query_loads(limit=page_size, after_id=after_id, **filters)
+            yield from self.attach_load_orders(page, orders=orders, order_columns=order_columns)
+            if len(page) < page_size:
+                break
+            after_id = page[-1]['id']
+    
+    def get_loads(self, **filters):
+        """Get all loads matching the filters (see iter_loads)"""
+        loads = list(self.iter_loads(**filters))
+        print(f"[SUPABASE] Retrieved {len(loads)} loads matching {filters or 'no filters'}")
+        return loads
+    
+    def get_all_loads(self):
+        """Get all loads with their orders (paged, no row limit)"""
+        return self.get_loads()
+    
+    OPEN_LOAD_ORDER_COLUMNS = ('id,order_number,customer,origin,destination,weight_lbs,volume_cuft,'
+                               'priority,must_arrive_by_date,delivery_window_start,delivery_window_end')
+    
+    def get_open_loads(self, status='Planning'):
+        """
+        Get loads that can still take orders, with their current stops
+        
+        Loads and their stops come back in one embedded query per page.
+        
+        Returns:
+            List of load rows, each with 'orders' sorted by sequence number
+        """
+        columns = f"*,load_orders(sequence_number,orders({self.OPEN_LOAD_ORDER_COLUMNS}))"
+        loads = []
+        after_id = None
+        while True:
+            query = self.client.table('loads').select(columns).eq('status', status)
+            if after_id:
+                query = query.gt('id', after_id)
+            page = query.order('id').limit(self.ORDER_PAGE_SIZE).execute().data
+            loads.extend(page)
+            if len(page) < self.ORDER_PAGE_SIZE:
+                break
+            after_id = page[-1]['id']
         
+        for load in loads:
+            links = sorted(load.pop('load_orders', None) or [], key=lambda lo: lo.get('sequence_number') or 0)
+            load['orders'] = [lo['orders'] for lo in links if lo.get('orders')]
+        print(f"[SUPABASE] Retrieved {len(loads)} open '{status}' loads")
         return loads
     
+    def reserve_load_numbers(self, count):
+        """
+        First of count consecutive LOAD_### numbers reserved for the caller
+        
+        Uses the reserve_load_numbers() database function so concurrent runs
+        get disjoint blocks; without it falls back to MAX + 1, which callers
+        must retry on a unique load_number conflict.
+        """
+        try:
+            response = self.client.rpc('reserve_load_numbers', {'p_count': max(count, 1)}).execute()
+            return int(response.data)
+        except Exception as e:
+            if not _function_missing(e):
+                raise
+            print(f"[SUPABASE] reserve_load_numbers RPC not installed, using MAX + 1: {str(e)}")
+        return self.get_next_load_sequence()
+    
+    def get_next_load_sequence(self, prefix='LOAD_'):
+        """
+        Next free number for generated load numbers (LOAD_001, LOAD_002, ...)
+        
+        Uses one aggregate query through execute_sql when it is installed,
+        otherwise scans the load_number column.
+        """
+        try:
+            response = self.client.rpc('execute_sql', {'query': (
+                f"SELECT COALESCE(MAX(SUBSTRING(load_number FROM {len(prefix) + 1})::int), 0) AS max_seq "
+                f"FROM loads WHERE load_number ~ '^{prefix}[0-9]+$'"
+            )}).execute()
+            return int((response.data or [{}])[0].get('max_seq') or 0) + 1
+        except Exception as e:
+            print(f"[SUPABASE] Aggregate load number lookup unavailable, scanning: {str(e)}")
+        
+        max_seq = 0
+        after_id = None
+        while True:
+            query = self.client.table('loads').select('id,load_number').like('load_number', f'{prefix}%')
+            if after_id:
+                query = query.gt('id', after_id)
+            page = query.order('id').limit(self.ORDER_PAGE_SIZE).execute().data
+            for row in page:
+                suffix = row['load_number'][len(prefix):]
+                if suffix.isdigit():
+                    max_seq = max(max_seq, int(suffix))
+            if len(page) < self.ORDER_PAGE_SIZE:
+                break
+            after_id = page[-1]['id']
+        return max_seq + 1
+    
     def get_load_by_id(self, load_id):
         """Get specific load by ID with orders"""
         response = self.client.table('loads').select('*').eq('id', load_id).execute()
         if not response.data:
             return None
         
-        load = response.data[0]
-        load_orders = self.client.table('load_orders').select('*, orders(*)').eq('load_id', load_id).order('sequence_number').execute()
-        load['orders'] = [lo['orders'] for lo in load_orders.data if lo.get('orders')] if load_orders.data else []
-        
-        return load
+        return self.attach_load_orders(response.data)[0]
     
     def create_load(self, load_data):
         """Insert new load"""
         response = self.client.table('loads').insert(load_data).execute()
+        self._data_changed()
         return response.data[0] if response.data else None
     
     def create_load_order(self, load_order_data):
@@ -223,6 +601,377 @@ class SupabaseClient:
         response = self.client.table('load_orders').insert(load_orders_list).execute()
         return response.data
     
+    def create_loads_batch(self, loads_list):
+        """Insert multiple loads at once (returns rows with generated ids)"""
+        response = self.client.table('loads').insert(loads_list).execute()
+        self._data_changed()
+        return response.data
+    
+    def extend_loads(self, load_rows, links, load_number_by_order, planned_date):
+        """
+        Persist orders added to existing loads
+        
+        Args:
+            load_rows: Complete load rows (with id) carrying the new totals
+            links: Every {'load_id', 'order_id', 'sequence_number'} of the
+                   extended loads - existing stops are re-sequenced in place
+            load_number_by_order: Dict of newly added order id -> load_number
+            planned_date: ISO timestamp stored as planned_to_load_date
+            
+        Returns:
+            Number of orders assigned
+        """
+        if not load_rows:
+            return 0
+        # Claim the added orders first, so a conflict with another run writes nothing
+        updated, _ = self.assign_orders(load_number_by_order, planned_date)
+        try:
+            self.client.table('loads').upsert(load_rows, on_conflict='id', returning=ReturnMethod.minimal).execute()
+            self.client.table('load_orders').upsert(links, on_conflict='load_id,order_id', returning=ReturnMethod.minimal).execute()
+        except Exception:
+            self.release_orders(list(load_number_by_order), planned_date)
+            raise
+        self._data_changed()
+        return updated
+    
+    def save_load_plan(self, loads_list, planned_date, on_progress=None):
+        """
+        Persist a load plan
+        
+        With the save_load_plan() database function installed this is one
+        transaction and one request, whatever the plan size. Without it the
+        fallback costs O(loads) round trips: a filtered update claiming the
+        orders of each load, then one batched insert of loads and one of
+        load_orders. Any other RPC error is raised: the transaction may
+        already have committed, so the plan is never replayed as separate
+        writes.
+        
+        Args:
+            loads_list: Load rows, each with an 'orders' list of
+                        {'order_id', 'sequence_number'} links
+            planned_date: ISO timestamp stored as planned_to_load_date
+            on_progress: Optional callback(stage, current, total) called with
+                         'loads_saved', 'orders_linked' and 'orders_updated'
+            
+        Returns:
+            Dictionary with created 'loads', link/update counts and round trips used
+        """
+        report = on_progress or (lambda stage, current, total: None)
+        total_links = sum(len(load.get('orders', [])) for load in loads_list)
+        
+        try:
+            response = self.client.rpc('save_load_plan', {
+                'p_loads': loads_list,
+                'p_planned_date': planned_date
+            }).execute()
+        except Exception as e:
+            if 'orders_already_assigned' in str(e):
+                raise OrdersAlreadyAssignedError(str(e)) from e
+            if not _function_missing(e):
+                raise
+            print(f"[SUPABASE] save_load_plan RPC not installed, using batched writes: {str(e)}")
+        else:
+            result = response.data or {}
+            self._data_changed()
+            print(f"[SUPABASE] Saved {len(result.get('loads', []))} loads via save_load_plan RPC")
+            report('loads_saved', len(result.get('loads', [])), len(loads_list))
+            report('orders_linked', result.get('load_orders_created', 0), total_links)
+            report('orders_updated', result.get('orders_updated', 0), total_links)
+            return {
+                'loads': result.get('loads', []),
+                'load_orders_created': result.get('load_orders_created', 0),
+                'orders_updated': result.get('orders_updated', 0),
+                'round_trips': 1
+            }
+        
+        if not loads_list:
+            return {'loads': [], 'load_orders_created': 0, 'orders_updated': 0, 'round_trips': 0}
+        
+        # Claim the orders first, so a conflict with another run writes nothing
+        load_number_by_order = {link['order_id']: load['load_number']
+                                for load in loads_list for link in load.get('orders', [])}
+        orders_updated, round_trips = self.assign_orders(
+            load_number_by_order, planned_date,
+            on_progress=lambda updated: report('orders_updated', updated, len(load_number_by_order))
+        )
+        report('orders_updated', orders_updated, len(load_number_by_order))
+        
+        created_loads = []
+        try:
+            load_rows = [{k: v for k, v in load.items() if k != 'orders'} for load in loads_list]
+            created_loads = self.create_loads_batch(load_rows)
+            round_trips += 1
+            load_ids = {load['load_number']: load['id'] for load in created_loads}
+            report('loads_saved', len(created_loads), len(loads_list))
+            
+            links = [{
+                'load_id': load_ids[load['load_number']],
+                'order_id': link['order_id'],
+                'sequence_number': link.get('sequence_number', 1)
+            } for load in loads_list if load['load_number'] in load_ids for link in load.get('orders', [])]
+            if links:
+                self.create_load_orders_batch(links)
+                round_trips += 1
+            report('orders_linked', len(links), total_links)
+        except Exception:
+            # Hand the orders back (and drop loads without links) so a retry starts clean
+            if created_loads:
+                self.client.table('loads').delete(returning=ReturnMethod.minimal) \
+                    .in_('id', [load['id'] for load in created_loads]).execute()
+            self.release_orders(list(load_number_by_order), planned_date)
+            raise
+        
+        print(f"[SUPABASE] Saved {len(created_loads)} loads, {len(links)} links in {round_trips} round trips")
+        return {
+            'loads': created_loads,
+            'load_orders_created': len(links),
+            'orders_updated': orders_updated,
+            'round_trips': round_trips
+        }
+    
+    def assign_orders(self, load_number_by_order, planned_date, on_progress=None):
+        """
+        Mark orders as assigned to their loads, touching only the assignment fields
+        
+        Writes status, assigned_load_number and planned_to_load_date with one
+        filtered update per load (ids in ID_FILTER_CHUNK chunks), so edits made
+        to other columns since the orders were read are kept. Only orders
+        still Pending and unplanned are updated; if another run assigned any
+        of them first, the ones claimed here are released again.
+        
+        Args:
+            load_number_by_order: Dict of order id -> load_number
+            planned_date: ISO timestamp stored as planned_to_load_date
+            on_progress: Optional callback(orders_updated) after each request
+            
+        Returns:
+            (orders updated, round trips)
+            
+        Raises:
+            OrdersAlreadyAssignedError: Some orders were no longer unplanned
+        """
+        orders_by_load = {}
+        for order_id, load_number in load_number_by_order.items():
+            orders_by_load.setdefault(load_number, []).append(order_id)
+        
+        updated = 0
+        round_trips = 0
+        for load_number, order_ids in orders_by_load.items():
+            for start in range(0, len(order_ids), self.ID_FILTER_CHUNK):
+                response = self.client.table('orders').update({
+                    'planned_to_load_date': planned_date,
+                    'assigned_load_number': load_number,
+                    'status': 'Assigned'
+                }, count=CountMethod.exact, returning=ReturnMethod.minimal) \
+                    .in_('id', order_ids[start:start + self.ID_FILTER_CHUNK]) \
+                    .eq('status', 'Pending').is_('planned_to_load_date', 'null').execute()
+                updated += response.count if response.count is not None else len(order_ids[start:start + self.ID_FILTER_CHUNK])
+                round_trips += 1
+                if on_progress:
+                    on_progress(updated)
+        if orders_by_load:
+            self._data_changed()
+        if updated < len(load_number_by_order):
+            self.release_orders(list(load_number_by_order), planned_date)
+            raise OrdersAlreadyAssignedError(
+                f"{len(load_number_by_order) - updated} of {len(load_number_by_order)} orders were assigned by another run")
+        return updated, round_trips
+    
+    def release_orders(self, order_ids, planned_date):
+        """Return orders assigned at planned_date (by this run) to Pending and unplanned"""
+        for start in range(0, len(order_ids), self.ID_FILTER_CHUNK):
+            self.client.table('orders').update({
+                'planned_to_load_date': None,
+                'assigned_load_number': None,
+                'status': 'Pending'
+            }, returning=ReturnMethod.minimal) \
+                .in_('id', order_ids[start:start + self.ID_FILTER_CHUNK]) \
+                .eq('planned_to_load_date', planned_date).execute()
+        self._data_changed()
+    
+    def save_simulated_loads(self, loads_list):
+        """
+        Persist simulated Control Tower loads with set-based writes
+        
+        One insert of loads, one order update per distinct orders_config (in
+        ID_FILTER_CHUNK id chunks) and one insert of load_orders, however many
+        loads are simulated.
+        
+        Args:
+            loads_list: Load rows, each with an 'orders' list of
+                        {'order_id', 'sequence_number'} links and the
+                        'orders_config' fields written to those orders
+            
+        Returns:
+            Dictionary with created 'loads', link/update counts and round trips used
+        """
+        if not loads_list:
+            return {'loads': [], 'load_orders_created': 0, 'orders_updated': 0, 'round_trips': 0}
+        
+        load_rows = [{k: v for k, v in load.items() if k not in ('orders', 'orders_config')} for load in loads_list]
+        created_loads = self.create_loads_batch(load_rows)
+        round_trips = 1
+        load_ids = {load['load_number']: load['id'] for load in created_loads}
+        
+        links = []
+        orders_by_config = {}
+        for load in loads_list:
+            load_id = load_ids.get(load['load_number'])
+            if not load_id:
+                continue
+            config = tuple(sorted(load.get('orders_config', {}).items()))
+            for link in load.get('orders', []):
+                links.append({
+                    'load_id': load_id,
+                    'order_id': link['order_id'],
+                    'sequence_number': link.get('sequence_number', 1)
+                })
+                orders_by_config.setdefault(config, []).append(link['order_id'])
+        
+        orders_updated = 0
+        for config, order_ids in orders_by_config.items():
+            if not config:
+                continue
+            for start in range(0, len(order_ids), self.ID_FILTER_CHUNK):
+                chunk = order_ids[start:start + self.ID_FILTER_CHUNK]
+                self.client.table('orders').update(dict(config), returning=ReturnMethod.minimal).in_('id', chunk).execute()
+                orders_updated += len(chunk)
+                round_trips += 1
+        
+        if links:
+            self.client.table('load_orders').insert(links, returning=ReturnMethod.minimal).execute()
+            round_trips += 1
+        self._data_changed()
+        
+        print(f"[SUPABASE] Saved {len(created_loads)} simulated loads, {len(links)} links, "
+              f"{orders_updated} order updates in {round_trips} round trips")
+        return {
+            'loads': created_loads,
+            'load_orders_created': len(links),
+            'orders_updated': orders_updated,
+            'round_trips': round_trips
+        }
+    
+    # Cost Analysis Operations
+    def get_load_ids_by_number(self, load_numbers):
+        """Map load_number -> load id for the given numbers (unknown numbers are left out)"""
+        load_numbers = list(dict.fromkeys(n for n in load_numbers if n))
+        ids = {}
+        for start in range(0, len(load_numbers), self.ID_FILTER_CHUNK):
+            chunk = load_numbers[start:start + self.ID_FILTER_CHUNK]
+            response = self.client.table('loads').select('id,load_number').in_('load_number', chunk).execute()
+            ids.update({row['load_number']: row['id'] for row in response.data})
+        return ids
+    
+    def get_cost_analyses(self, load_ids=None, limit=ORDER_PAGE_SIZE, after_id=None):
+        """
+        Stored cost analyses with their load number
+        
+        Args:
+            load_ids: Only these loads (fetched in chunks, no paging)
+            limit: Page size when listing
+            after_id: Keyset cursor - rows with id greater than this
+            
+        Returns:
+            List of cost_analysis rows, each with 'load_number'
+        """
+        columns = '*,loads(load_number)'
+        if load_ids is not None:
+            load_ids = list(load_ids)
+            rows = []
+            for start in range(0, len(load_ids), self.ID_FILTER_CHUNK):
+                chunk = load_ids[start:start + self.ID_FILTER_CHUNK]
+                rows.extend(self.client.table('cost_analysis').select(columns).in_('load_id', chunk).execute().data)
+        else:
+            query = self.client.table('cost_analysis').select(columns)
+            if after_id:
+                query = query.gt('id', after_id)
+            rows = query.order('id').limit(limit).execute().data
+        for row in rows:
+            row['load_number'] = (row.pop('loads', None) or {}).get('load_number')
+        return rows
+    
+    def upsert_cost_analyses(self, rows):
+        """Insert or replace cost analyses in one request (one row per load_id)"""
+        if not rows:
+            return 0
+        self.client.table('cost_analysis').upsert(rows, on_conflict='load_id', returning=ReturnMethod.minimal).execute()
+        self._data_changed()
+        print(f"[SUPABASE] Stored {len(rows)} cost analyses")
+        return len(rows)
+    
+    # Analytics Operations
+    def get_dashboard_aggregates(self):
+        """
+        Raw dashboard aggregates (counts by status, utilization, YTD costs)
+        
+        Uses the dashboard_kpis() database function (one round trip of SQL
+        aggregates) when it is installed, otherwise scans only the few
+        columns the KPIs need, page by page. Any other RPC error is raised
+        rather than answered with a full scan.
+        """
+        try:
+            aggregates = self.client.rpc('dashboard_kpis', {}).execute().data
+            if isinstance(aggregates, dict):
+                return aggregates
+        except Exception as e:
+            if not _function_missing(e):
+                raise
+            print(f"[SUPABASE] dashboard_kpis RPC not installed, aggregating narrow columns: {str(e)}")
+        
+        orders_by_status = {}
+        unplanned = 0
+        for order in self.iter_orders(columns='id,status,planned_to_load_date'):
+            status = order.get('status') or 'Unknown'
+            orders_by_status[status] = orders_by_status.get(status, 0) + 1
+            if status == 'Pending' and not order.get('planned_to_load_date'):
+                unplanned += 1
+        
+        loads = self._scan('loads', 'id,status,utilization_percent,load_created_date,created_at')
+        loads_by_status = {}
+        utilizations = []
+        for load in loads:
+            status = load.get('status') or 'Unknown'
+            loads_by_status[status] = loads_by_status.get(status, 0) + 1
+            if load.get('utilization_percent') is not None:
+                utilizations.append(float(load['utilization_percent']))
+        
+        year_start = datetime.utcnow().strftime('%Y-01-01')
+        this_year = {load['id'] for load in loads
+                     if str(load.get('load_created_date') or load.get('created_at') or '') >= year_start}
+        savings_ytd = 0.0
+        cost_ytd = 0.0
+        try:
+            for row in self._scan('cost_analysis', 'id,load_id,total_cost,baseline_cost'):
+                if row.get('load_id') in this_year:
+                    cost_ytd += float(row.get('total_cost') or 0)
+                    savings_ytd += float(row.get('baseline_cost') or 0) - float(row.get('total_cost') or 0)
+        except Exception as e:
+            print(f"[SUPABASE] cost_analysis unavailable for dashboard: {str(e)}")
+        
+        return {
+            'orders_by_status': orders_by_status,
+            'unplanned_orders': unplanned,
+            'loads_by_status': loads_by_status,
+            'avg_utilization': round(sum(utilizations) / len(utilizations), 1) if utilizations else 0,
+            'cost_savings_ytd': round(savings_ytd, 2),
+            'total_cost_ytd': round(cost_ytd, 2)
+        }
+    
+    def _scan(self, table, columns, page_size=ORDER_PAGE_SIZE):
+        """Keyset scan of selected columns (must include id) over a whole table"""
+        rows = []
+        after_id = None
+        while True:
+            query = self.client.table(table).select(columns)
+            if after_id:
+                query = query.gt('id', after_id)
+            page = query.order('id').limit(page_size).execute().data
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            after_id = page[-1]['id']
+    
     # Carriers Operations
     def get_all_carriers(self):
         """Get all carriers"""
@@ -297,3 +1046,29 @@ class SupabaseClient:
         response = query.execute()
         return response.data
 
+
+# Process-wide client shared by all requests (one HTTP/2 connection pool)
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_supabase_client():
+    """
+    Return the process-wide SupabaseClient, creating it on first use
+    
+    The PostgREST session underneath is an HTTP/2 httpx client, so sharing one
+    instance keeps connections (and their TLS sessions) alive across requests
+    instead of reconnecting for every API call. The first creation starts a
+    background health check rather than blocking the request on a test query.
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                client = SupabaseClient(verify_connection=False)
+                # Build the PostgREST session now so concurrent requests don't race to create it
+                client.client.postgrest
+                threading.Thread(target=client.check_connection, name="supabase-health-check", daemon=True).start()
+                _shared_client = client
+                print("[SUPABASE] Shared client initialized")
+    return _shared_client
@@ -0,0 +1,7 @@
+"""
+Shared pytest setup: make the backend packages (agents, config, database, utils) importable
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,95 @@
+"""
+BulkUploader: chunking, retries, payload splitting and idempotent counts
+"""
+import threading
+
+from utils.bulk_ingest import BulkUploader
+
+
+class FakeTable:
+    """Idempotent insert keyed on 'key' that can fail on chosen calls"""
+
+    def __init__(self, failures=(), too_large_above=None):
+        self.rows = {}
+        self.calls = 0
+        self.failures = set(failures)
+        self.too_large_above = too_large_above
+        self._lock = threading.Lock()
+
+    def send(self, chunk):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if self.too_large_above and len(chunk) > self.too_large_above:
+            raise RuntimeError("413 Payload Too Large")
+        if call in self.failures:
+            raise ConnectionError("connection reset")
+        with self._lock:
+            new = [row for row in chunk if row['key'] not in self.rows]
+            self.rows.update((row['key'], row) for row in new)
+        return len(new)
+
+
+def _rows(count, start=0):
+    return [{'key': i, 'payload': 'x' * 50} for i in range(start, start + count)]
+
+
+def test_upload_writes_every_row_once():
+    table = FakeTable()
+    progress = []
+
+    stats = BulkUploader(table.send, workers=4, retry_delay=0).upload(
+        _rows(1000), chunk_size=100, on_progress=lambda done, total: progress.append((done, total)))
+
+    assert len(table.rows) == 1000
+    assert (stats['written'], stats['already_present'], stats['failed_rows']) == (1000, 0, 0)
+    assert stats['chunks'] == 10
+    assert progress[-1] == (1000, 1000)
+
+
+def test_rerun_reports_rows_already_present():
+    table = FakeTable()
+    uploader = BulkUploader(table.send, workers=2, retry_delay=0)
+    uploader.upload(_rows(300), chunk_size=100)
+
+    stats = uploader.upload(_rows(300, start=200), chunk_size=100)
+
+    assert (stats['written'], stats['already_present']) == (200, 100)
+    assert len(table.rows) == 500
+
+
+def test_transient_failure_is_retried():
+    table = FakeTable(failures={1})
+
+    stats = BulkUploader(table.send, workers=1, retry_delay=0).upload(_rows(300), chunk_size=100)
+
+    assert stats['retries'] == 1
+    assert (stats['written'], stats['failed_rows']) == (300, 0)
+
+
+def test_chunk_failing_every_retry_is_reported():
+    table = FakeTable(failures={1, 2, 3})
+
+    stats = BulkUploader(table.send, workers=1, max_retries=2, retry_delay=0).upload(_rows(300), chunk_size=100)
+
+    assert (stats['written'], stats['failed_rows']) == (200, 100)
+    assert stats['errors'] == ['connection reset']
+
+
+def test_oversized_chunk_is_split():
+    table = FakeTable(too_large_above=30)
+
+    stats = BulkUploader(table.send, workers=2, retry_delay=0).upload(_rows(200), chunk_size=100)
+
+    assert (stats['written'], stats['failed_rows'], stats['retries']) == (200, 0, 0)
+    assert len(table.rows) == 200
+
+
+def test_chunk_size_follows_payload_bytes():
+    uploader = BulkUploader(lambda chunk: None, chunk_bytes=10_000, max_chunk_rows=1000)
+    rows = _rows(500)
+
+    per_chunk = uploader.chunk_rows(rows)
+
+    assert 100 <= per_chunk <= 200  # Rows are ~70 bytes of JSON each
+    assert BulkUploader(lambda chunk: None, chunk_bytes=10 ** 9, max_chunk_rows=250).chunk_rows(rows) == 250
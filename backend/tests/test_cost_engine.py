@@ -0,0 +1,165 @@
+"""
+Deterministic cost engine: per-load breakdowns, plan totals and cached analyses
+"""
+import copy
+
+import pytest
+
+from config.settings import BASE_RATE_PER_MILE, FUEL_SURCHARGE_PERCENT, DETENTION_RATE_PER_HOUR
+import utils.operations as operations
+from utils.cost_engine import (
+    compute_costs,
+    cost_inputs,
+    cost_load_rows,
+    summarize_costs,
+    analyze_plan_costs,
+    load_cost_hash
+)
+
+
+def _load(load_id, origin, destinations, **fields):
+    orders = [{'id': f"{load_id}-{i}", 'origin': origin, 'destination': destination, 'stop_sequence': i}
+              for i, destination in enumerate(destinations, 1)]
+    return dict({'load_id': load_id, 'origin': origin, 'orders': orders, 'utilization_percent': 80}, **fields)
+
+
+@pytest.fixture
+def load_plan():
+    return {'loads': [
+        _load('LOAD_001', 'Toronto, ON', ['Buffalo, NY', 'Cleveland, OH', 'Detroit, MI']),
+        _load('LOAD_002', 'Mississauga, ON', ['New York, NY', 'Philadelphia, PA'], total_miles=600),
+        _load('LOAD_003', 'Brampton, ON', ['Chicago, IL'], detention_hours=3, utilization_percent=40)
+    ]}
+
+
+def test_same_plan_gives_identical_costs(load_plan):
+    first = analyze_plan_costs(load_plan)
+    second = analyze_plan_costs(copy.deepcopy(load_plan))
+
+    assert first == second
+    assert [row['load_id'] for row in first['loads']] == ['LOAD_001', 'LOAD_002', 'LOAD_003']
+
+
+def test_breakdown_follows_rates(load_plan):
+    rows = {row['load_id']: row for row in cost_load_rows(load_plan)}
+
+    row = rows['LOAD_002']  # Packed miles are used as given
+    assert row['miles'] == 600
+    assert row['base_freight_cost'] == pytest.approx(600 * BASE_RATE_PER_MILE)
+    assert row['fuel_surcharge'] == pytest.approx(600 * BASE_RATE_PER_MILE * FUEL_SURCHARGE_PERCENT)
+    assert row['cost_per_order'] == pytest.approx(row['total_load_cost'] / 2, abs=0.01)
+    for row in rows.values():
+        assert row['total_load_cost'] == pytest.approx(
+            row['base_freight_cost'] + row['fuel_surcharge'] + row['detention_fees'], abs=0.02)
+    assert rows['LOAD_001']['miles'] > 0  # From the sequencer when neither route nor packer gave miles
+
+
+def test_detention_beyond_free_hours_is_charged():
+    inputs = cost_inputs({'loads': [_load('LOAD_001', 'Toronto, ON', ['Buffalo, NY'])]}, route_plan={'route': {
+        'load_id': 'LOAD_001', 'total_miles': 100,
+        'stops': [{'wait_hours': 0.5}, {'wait_hours': 4.0}]
+    }})
+
+    costs = compute_costs(inputs).iloc[0]
+
+    assert costs['miles'] == 100
+    assert costs['detention_fees'] > 0
+    assert costs['detention_fees'] == pytest.approx(costs['detention_hours'] * DETENTION_RATE_PER_HOUR)
+
+
+def test_summary_totals_match_rows(load_plan):
+    rows = cost_load_rows(load_plan)
+
+    summary = summarize_costs(rows)
+
+    totals = summary['totals']
+    assert totals['total_loads'] == 3
+    assert totals['total_orders'] == 6
+    assert totals['grand_total'] == pytest.approx(sum(row['total_load_cost'] for row in rows), abs=0.05)
+    assert summary['low_utilization_loads'] == ['LOAD_003']
+    assert summary['detention_loads'] == ['LOAD_003']
+    # Consolidated trucks beat one direct truck per order
+    assert summary['baseline_comparison']['savings_amount'] > 0
+    # Stored rows (e.g. JSON round-tripped) add up the same way
+    assert summarize_costs([{k: str(v) for k, v in row.items()} for row in rows]) == summary
+
+
+def test_cost_hash_is_stable_and_tracks_inputs(load_plan):
+    load = load_plan['loads'][0]
+    route = {'total_miles': 420, 'stops': [{'wait_hours': 0}, {'wait_hours': 1}]}
+    original = load_cost_hash(load, route)
+
+    assert load_cost_hash(copy.deepcopy(load), copy.deepcopy(route)) == original
+    # Order of the orders list alone does not matter; stop_sequence does
+    assert load_cost_hash(dict(load, orders=load['orders'][::-1]), route) == original
+
+    resequenced = copy.deepcopy(load)
+    resequenced['orders'][0]['stop_sequence'], resequenced['orders'][1]['stop_sequence'] = 2, 1
+    other_order = copy.deepcopy(load)
+    other_order['orders'][-1]['destination'] = 'Columbus, OH'
+    changed = [
+        load_cost_hash(resequenced, route),
+        load_cost_hash(other_order, route),
+        load_cost_hash(dict(load, orders=load['orders'][:2]), route),
+        load_cost_hash(load, dict(route, total_miles=430)),
+        load_cost_hash(load, dict(route, stops=[{'wait_hours': 0}, {'wait_hours': 5}])),
+        load_cost_hash(load)
+    ]
+    assert original not in changed
+    assert len(set(changed)) == len(changed)
+
+
+class FakeCostStore:
+    """The three SupabaseClient calls analyze_costs makes, backed by dicts"""
+
+    def __init__(self, load_numbers):
+        self.ids = {number: f"db-{number}" for number in load_numbers}
+        self.rows = {}
+        self.upserts = []
+
+    def get_load_ids_by_number(self, load_numbers):
+        return {number: self.ids[number] for number in load_numbers if number in self.ids}
+
+    def get_cost_analyses(self, load_ids=None):
+        return [copy.deepcopy(self.rows[load_id]) for load_id in load_ids if load_id in self.rows]
+
+    def upsert_cost_analyses(self, rows):
+        self.upserts.append([row['load_id'] for row in rows])
+        self.rows.update((row['load_id'], copy.deepcopy(row)) for row in rows)
+
+
+class NoFacilities:
+    def facilities(self):
+        return []
+
+
+def test_analyze_costs_reuses_unchanged_loads(load_plan, monkeypatch):
+    import utils.facility_index as facility_index
+    store = FakeCostStore(['LOAD_001', 'LOAD_002', 'LOAD_003'])
+    monkeypatch.setattr(operations, 'get_supabase_client', lambda: store)
+    monkeypatch.setattr(facility_index, 'get_facility_index', lambda: NoFacilities())
+    params = {'load_plan': load_plan, 'use_ai': False}
+
+    first, status = operations.analyze_costs(params)
+    assert status == 200
+    assert first['cost_analysis']['cache'] == {'loads_reused': 0, 'loads_computed': 3, 'loads_not_saved': 0}
+
+    second, _ = operations.analyze_costs(copy.deepcopy(params))
+    assert second['cost_analysis']['cache']['loads_reused'] == 3
+    assert second['cost_analysis']['loads'] == first['cost_analysis']['loads']
+    assert second['cost_analysis']['totals'] == first['cost_analysis']['totals']
+    assert len(store.upserts) == 1
+
+    # Moving a stop onto another load changes both hashes; only those two are recomputed
+    changed = copy.deepcopy(load_plan)
+    changed['loads'][1]['orders'].append(changed['loads'][0]['orders'].pop())
+    third, _ = operations.analyze_costs({'load_plan': changed, 'use_ai': False})
+    assert third['cost_analysis']['cache'] == {'loads_reused': 1, 'loads_computed': 2, 'loads_not_saved': 0}
+    assert store.upserts[-1] == ['db-LOAD_001', 'db-LOAD_002']
+    assert third['cost_analysis']['loads'] == cost_load_rows(changed)
+
+    # A new route for a load forces it to be recomputed as well
+    route_plan = {'route': {'load_id': 'LOAD_003', 'total_miles': 900, 'stops': [{'wait_hours': 0}]}}
+    fourth, _ = operations.analyze_costs({'load_plan': changed, 'route_plan': route_plan, 'use_ai': False})
+    assert fourth['cost_analysis']['cache']['loads_computed'] == 1
+    assert fourth['cost_analysis']['loads'][2]['miles'] == 900
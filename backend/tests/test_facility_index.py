@@ -0,0 +1,41 @@
+"""
+FacilityIndex: normalized lookups, TTL refresh and invalidation
+"""
+from utils.facility_index import FacilityIndex
+
+
+def _facility(code, city, name, lat, lon):
+    return {'facility_code': code, 'city': city, 'facility_name': name, 'latitude': lat, 'longitude': lon}
+
+
+class CountingLoader:
+    def __init__(self, *tables):
+        self.tables = list(tables)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.tables[min(self.calls, len(self.tables)) - 1]
+
+
+def test_lookup_normalizes_location_strings():
+    index = FacilityIndex(CountingLoader([_facility('TOR-DC', 'Toronto', 'Toronto DC', 43.65, -79.38)]))
+
+    assert index.lookup('Toronto, ON - Toronto DC')['facility_code'] == 'TOR-DC'
+    assert index.lookup('toronto dc') is index.lookup('TOR-DC')
+    assert index.coordinates('Toronto') == (43.65, -79.38)
+    assert index.lookup('Nowhere') is None
+
+
+def test_invalidate_refetches_without_emptying_the_index():
+    loader = CountingLoader([_facility('TOR-DC', 'Toronto', 'Toronto DC', 43.65, -79.38)],
+                            [_facility('TOR-DC', 'Toronto', 'Toronto DC', 43.70, -79.40)])
+    index = FacilityIndex(loader, ttl_seconds=3600)
+    assert index.coordinates('Toronto') == (43.65, -79.38)
+
+    index.invalidate()
+    # The old snapshot stays readable until the next load replaces it
+    assert index._snapshot is not None
+    assert index.coordinates('Toronto') == (43.70, -79.40)
+    assert index.lookup('Toronto DC')['latitude'] == 43.70
+    assert loader.calls == 2
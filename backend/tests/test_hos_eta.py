@@ -0,0 +1,62 @@
+"""
+Hours-of-Service simulation: 30-minute breaks, 10-hour resets and stop dwell time
+"""
+import numpy as np
+import pytest
+
+from utils.hos_eta import simulate_hos
+
+
+def test_short_leg_needs_no_rest():
+    result = simulate_hos([[5.0]], dwell_hours=1.0)
+
+    assert result['arrival'][0, 0] == pytest.approx(5.0)
+    assert result['departure'][0, 0] == pytest.approx(6.0)
+    assert (result['breaks'][0], result['resets'][0]) == (0, 0)
+
+
+def test_break_after_eight_hours_of_driving():
+    result = simulate_hos([[10.0]], dwell_hours=0.0)
+
+    # 8h driving, 30-minute break, 2h driving
+    assert result['arrival'][0, 0] == pytest.approx(10.5)
+    assert (result['breaks'][0], result['resets'][0]) == (1, 0)
+
+
+def test_reset_after_eleven_hours_of_driving():
+    result = simulate_hos([[12.0]], dwell_hours=0.0)
+
+    # 8h + break + 3h reaches the 11h driving limit, 10h reset, last 1h
+    assert result['arrival'][0, 0] == pytest.approx(8 + 0.5 + 3 + 10 + 1)
+    assert (result['breaks'][0], result['resets'][0]) == (1, 1)
+
+
+def test_reset_when_fourteen_hour_duty_window_ends():
+    # Waiting for a delivery window keeps the duty clock running
+    result = simulate_hos([[2.0, 6.0]], dwell_hours=1.0, earliest_arrival=[[10.0, np.nan]])
+
+    assert result['wait'][0, 0] == pytest.approx(8.0)
+    assert result['departure'][0, 0] == pytest.approx(11.0)
+    # 3h driving until hour 14, 10h reset, remaining 3h
+    assert result['arrival'][0, 1] == pytest.approx(27.0)
+    assert (result['breaks'][0], result['resets'][0]) == (0, 1)
+
+
+def test_long_stop_counts_as_reset():
+    result = simulate_hos([[6.0, 10.0]], dwell_hours=1.0, earliest_arrival=[[20.0, np.nan]])
+
+    # 14h wait + 1h unloading restarts the duty window; the next leg only needs a break
+    assert result['departure'][0, 0] == pytest.approx(21.0)
+    assert result['arrival'][0, 1] == pytest.approx(21 + 8 + 0.5 + 2)
+    assert (result['breaks'][0], result['resets'][0]) == (1, 0)
+
+
+def test_routes_of_different_lengths_in_one_batch():
+    result = simulate_hos([[5.0, np.nan], [10.0, 3.0]], dwell_hours=0.0)
+
+    assert np.isnan(result['arrival'][0, 1])
+    assert result['arrival'][0, 0] == pytest.approx(5.0)
+    # 10.5h to the first stop, 1h more hits the 11h limit, 10h reset, last 2h
+    assert result['arrival'][1, 1] == pytest.approx(23.5)
+    assert result['resets'].tolist() == [0, 1]
+    assert result['drive_hours'].tolist() == [5.0, 13.0]
@@ -0,0 +1,84 @@
+"""
+JobQueue: background operations, progress events and results
+"""
+import threading
+
+import pytest
+
+from utils.job_queue import JobQueue, JobAlreadyRunningError
+
+
+def _wait(job, timeout=5):
+    seen = 0
+    while not job.finished:
+        events, _ = job.wait_for_events(seen, timeout)
+        assert events or job.finished, "job did not report progress in time"
+        seen += len(events)
+    return job
+
+
+@pytest.fixture
+def queue():
+    return JobQueue(workers=2, retention_seconds=60)
+
+
+def test_job_runs_and_keeps_result(queue):
+    def operation(params, progress):
+        for i in range(3):
+            progress('working', i + 1, 3, f"step {i + 1}")
+        return {'sum': params['a'] + params['b']}, 200
+
+    job = _wait(queue.submit('add', operation, {'a': 2, 'b': 3}))
+
+    assert job.status == 'succeeded'
+    assert (job.result, job.http_status) == ({'sum': 5}, 200)
+    stages = [event['stage'] for event in job.events]
+    assert stages == ['running', 'working', 'working', 'working', 'done']
+    assert [event['seq'] for event in job.events] == list(range(1, 6))
+    assert job.progress['current'] == 3
+    assert queue.get(job.id) is job
+
+
+def test_error_status_marks_job_failed(queue):
+    job = _wait(queue.submit('bad', lambda params, progress: ({'error': 'no orders'}, 400), {}))
+
+    assert (job.status, job.http_status, job.error) == ('failed', 400, 'no orders')
+
+
+def test_exception_marks_job_failed(queue):
+    def operation(params, progress):
+        raise RuntimeError('database down')
+
+    job = _wait(queue.submit('boom', operation, {}))
+
+    assert (job.status, job.http_status, job.error) == ('failed', 500, 'database down')
+    assert job.events[-1]['stage'] == 'failed'
+
+
+def test_finished_jobs_expire(queue, monkeypatch):
+    job = _wait(queue.submit('quick', lambda params, progress: ({}, 200), {}))
+    assert [j.id for j in queue.list()] == [job.id]
+
+    monkeypatch.setattr(queue, 'retention_seconds', -1)
+    assert queue.list() == []
+    assert queue.get(job.id) is None
+
+
+def test_exclusive_job_is_refused_while_one_is_unfinished(queue):
+    release = threading.Event()
+
+    def operation(params, progress):
+        release.wait(5)
+        return {}, 200
+
+    first = queue.submit('optimize_loads', operation, {}, exclusive=True)
+    with pytest.raises(JobAlreadyRunningError) as refused:
+        queue.submit('optimize_loads', operation, {}, exclusive=True)
+    assert refused.value.job is first
+    # Other job types, and non-exclusive submits, still queue
+    other = queue.submit('plan_routes', lambda params, progress: ({}, 200), {})
+
+    release.set()
+    assert first.wait(5) and other.wait(5)
+    again = _wait(queue.submit('optimize_loads', operation, {}, exclusive=True))
+    assert again.status == 'succeeded'
@@ -0,0 +1,65 @@
+"""
+Gemini response cache: TTL expiry, LRU eviction and the SQLite store
+"""
+import pytest
+
+import utils.llm_cache as llm_cache
+from utils.llm_cache import LLMResponseCache
+
+
+class FakeClock:
+    """Stands in for the time module"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(llm_cache, 'time', fake)
+    return fake
+
+
+def test_cache_entries_expire_after_ttl(clock):
+    cache = LLMResponseCache(max_entries=10, ttl_seconds=60, sqlite_path='')
+    cache.set('k', 'v')
+
+    clock.now += 59
+    assert cache.get('k') == 'v'
+    clock.now += 1
+    assert cache.get('k') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = LLMResponseCache(max_entries=2, ttl_seconds=60, sqlite_path='')
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    cache.get('a')  # 'b' is now the least recently used
+    cache.set('c', 'C')
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == ('A', 'C')
+
+
+def test_cache_key_depends_on_model_prompt_and_temperature():
+    key = LLMResponseCache.make_key('gemini', 'prompt', 0.3)
+
+    assert key == LLMResponseCache.make_key('gemini', 'prompt', 0.3)
+    assert key != LLMResponseCache.make_key('gemini', 'prompt', 0.7)
+    assert key != LLMResponseCache.make_key('gemini', 'other prompt', 0.3)
+
+
+def test_sqlite_store_survives_a_new_cache(clock, tmp_path):
+    path = str(tmp_path / 'llm_cache.sqlite')
+    LLMResponseCache(max_entries=1, ttl_seconds=60, sqlite_path=path).set('k', 'v')
+
+    cache = LLMResponseCache(max_entries=1, ttl_seconds=60, sqlite_path=path)
+    assert cache.get('k') == 'v'
+    assert cache.stats()['disk_hits'] == 1
+    clock.now += 60
+    assert LLMResponseCache(max_entries=1, ttl_seconds=60, sqlite_path=path).get('k') is None
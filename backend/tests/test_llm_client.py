@@ -0,0 +1,123 @@
+"""
+Gemini call path: circuit breaker, retries and deadlines
+"""
+import pytest
+
+import utils.llm_client as llm_client
+from utils.llm_client import CircuitBreaker, CircuitOpenError, generate_text
+
+
+class FakeClock:
+    """Stands in for the time module; sleeping advances the clock"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Raises the queued errors in turn, then answers"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return FakeResponse(f"answer to {prompt}")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(llm_client, 'time', fake)
+    monkeypatch.setattr(llm_client, 'backoff_delay', lambda attempt: 1.0)
+    return fake
+
+
+# Circuit breaker
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # Only consecutive failures count
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.stats()['rejected_calls'] == 1
+
+
+def test_breaker_half_opens_for_one_trial_call(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+    assert not breaker.allow()  # Only one trial in flight
+
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow() and breaker.allow()
+
+
+# generate_text
+def test_generate_text_retries_transient_errors(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    model = FakeModel(ConnectionError('reset'), TimeoutError('slow'))
+
+    assert generate_text(model, 'p', timeout=30, max_retries=2, breaker=breaker) == 'answer to p'
+    assert model.calls == 3
+    assert breaker.consecutive_failures == 0
+
+
+def test_generate_text_counts_exhausted_retries_against_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    model = FakeModel(*[ConnectionError('down')] * 3)
+
+    with pytest.raises(ConnectionError):
+        generate_text(model, 'p', timeout=30, max_retries=2, breaker=breaker)
+    assert model.calls == 3
+    with pytest.raises(CircuitOpenError):
+        generate_text(model, 'p', timeout=30, breaker=breaker)
+    assert model.calls == 3
+
+
+def test_generate_text_does_not_retry_past_deadline(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30)
+    model = FakeModel(*[ConnectionError('down')] * 5)
+
+    with pytest.raises(ConnectionError):
+        generate_text(model, 'p', timeout=2.5, max_retries=5, breaker=breaker)
+    # Attempts at 0s, 1s and 2s; a fourth would start after the 2.5s deadline
+    assert model.calls == 3
+    assert breaker.consecutive_failures == 1
+
+
+def test_generate_text_rejected_request_leaves_breaker_alone(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    model = FakeModel(ValueError('response blocked'))
+
+    with pytest.raises(ValueError):
+        generate_text(model, 'p', timeout=30, breaker=breaker)
+    assert model.calls == 1
+    assert breaker.state == 'closed'
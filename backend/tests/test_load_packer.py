@@ -0,0 +1,152 @@
+"""
+Deterministic load packing: every order on exactly one truck, within capacity and the stop cap
+"""
+import uuid
+
+import numpy as np
+import pytest
+
+from config.settings import MAX_TRUCK_WEIGHT_LBS, MAX_TRUCK_VOLUME_CUFT, MAX_STOPS_PER_LOAD
+from utils.erp_data_generator import ERPDataGenerator
+import utils.load_packer as load_packer
+from utils.load_packer import PACKING_STRATEGIES, pack_bins, split_shards, pack_orders, pack_into_open_loads
+from utils.stop_sequencer import StopSequencer
+
+
+def _orders(count, seed=7):
+    orders = ERPDataGenerator(seed=seed).generate_orders(count)
+    for order in orders:
+        order['id'] = str(uuid.uuid4())
+    return orders
+
+
+def _by_origin(orders):
+    grouped = {}
+    for order in orders:
+        grouped.setdefault(order['origin'], []).append(order)
+    return grouped
+
+
+def _assert_load_limits(loads):
+    for load in loads:
+        assert len(load['orders']) <= MAX_STOPS_PER_LOAD
+        assert len({order['origin'] for order in load['orders']}) == 1
+        if len(load['orders']) > 1:
+            assert load['total_weight_lbs'] <= MAX_TRUCK_WEIGHT_LBS
+            assert load['total_volume_cuft'] <= MAX_TRUCK_VOLUME_CUFT
+        assert [order['stop_sequence'] for order in load['orders']] == list(range(1, len(load['orders']) + 1))
+
+
+@pytest.mark.parametrize('strategy', PACKING_STRATEGIES)
+def test_pack_bins_assigns_every_item_within_capacity(strategy):
+    rng = np.random.default_rng(1)
+    weights = rng.integers(500, 30000, 400)
+    volumes = rng.integers(50, 2500, 400)
+
+    assignment, n_bins = pack_bins(weights, volumes, strategy=strategy)
+
+    assert len(assignment) == 400
+    assert assignment.min() >= 0 and assignment.max() == n_bins - 1
+    for b in range(n_bins):
+        members = assignment == b
+        assert weights[members].sum() <= MAX_TRUCK_WEIGHT_LBS
+        assert volumes[members].sum() <= MAX_TRUCK_VOLUME_CUFT
+        assert members.sum() <= MAX_STOPS_PER_LOAD
+
+
+def test_pack_bins_stop_cap_binds_for_small_items():
+    assignment, n_bins = pack_bins([100] * 20, [10] * 20, max_items=8)
+
+    assert n_bins == 3
+    assert sorted(np.bincount(assignment).tolist()) == [4, 8, 8]
+
+
+def test_pack_bins_puts_oversized_item_on_its_own_truck():
+    assignment, n_bins = pack_bins([50000, 1000, 1000], [100, 100, 100])
+
+    assert n_bins == 2
+    assert assignment[1] == assignment[2] != assignment[0]
+
+
+def test_pack_bins_fills_open_bins_before_opening_new_ones():
+    open_bins = [(40000, 1000, 2), (10000, 1000, MAX_STOPS_PER_LOAD)]
+
+    assignment, n_bins = pack_bins([4000, 6000], [100, 100], open_bins=open_bins)
+
+    # The first bin has 5,000 lbs left; the second is at the stop cap
+    assert assignment[0] == 0
+    assert assignment[1] == 2
+    assert n_bins == 3
+
+
+def test_pack_bins_rejects_unknown_strategy():
+    with pytest.raises(ValueError):
+        pack_bins([1], [1], strategy='worst_fit')
+
+
+@pytest.mark.parametrize('strategy', PACKING_STRATEGIES)
+def test_pack_orders_assigns_every_order_exactly_once(strategy):
+    orders = _orders(500)
+
+    loads = pack_orders(_by_origin(orders), strategy=strategy, sequencer=StopSequencer(), workers=1)
+
+    ids = [order['id'] for load in loads for order in load['orders']]
+    assert len(ids) == len(set(ids)) == len(orders)
+    _assert_load_limits(loads)
+
+
+def test_split_shards_keeps_each_order_once_and_origins_apart():
+    orders = _orders(300)
+
+    shards = split_shards(_by_origin(orders), StopSequencer())
+
+    ids = [order['id'] for _, shard_orders in shards for order in shard_orders]
+    assert sorted(ids) == sorted(order['id'] for order in orders)
+    for origin, shard_orders in shards:
+        assert {order['origin'] for order in shard_orders} == {origin}
+
+
+def test_process_pool_packs_the_same_plan_as_in_process(monkeypatch):
+    monkeypatch.setattr(load_packer, 'LOAD_OPTIMIZER_PARALLEL_MIN_ORDERS', 1)
+    by_origin = _by_origin(_orders(400))
+
+    sequential = pack_orders(by_origin, sequencer=StopSequencer(), workers=1)
+    parallel = pack_orders(by_origin, sequencer=StopSequencer(), workers=2)
+
+    assert [[o['id'] for o in load['orders']] for load in parallel] == \
+        [[o['id'] for o in load['orders']] for load in sequential]
+
+
+def test_pack_into_open_loads_respects_existing_stops_and_capacity():
+    sequencer = StopSequencer()
+    existing = pack_orders(_by_origin(_orders(120, seed=3)), sequencer=sequencer, workers=1)
+    open_loads = [dict(load, id=f"db-{i}", load_number=f"LOAD_{i:03d}") for i, load in enumerate(existing)]
+    existing_ids = {load['id']: {order['id'] for order in load['orders']} for load in open_loads}
+    new_orders = _orders(80, seed=4)
+
+    extended, new_loads = pack_into_open_loads(open_loads, _by_origin(new_orders), sequencer=sequencer)
+
+    assert extended and new_loads
+    added = [order_id for load in extended for order_id in load['added_order_ids']]
+    placed = added + [order['id'] for load in new_loads for order in load['orders']]
+    assert sorted(placed) == sorted(order['id'] for order in new_orders)
+    for load in extended:
+        # Existing stops stay on their load; only the new orders are added
+        assert {order['id'] for order in load['orders']} == existing_ids[load['id']] | set(load['added_order_ids'])
+        assert load['load_number'].startswith('LOAD_')
+    _assert_load_limits(extended + new_loads)
+
+
+def test_basic_plan_without_sequencer_skips_stop_ordering():
+    from agents.load_optimizer import LoadOptimizerAgent
+    orders = _orders(60)
+
+    plan = LoadOptimizerAgent()._create_basic_load_plan(orders, sequencer=None, workers=1)
+
+    ids = [order['id'] for load in plan['loads'] for order in load['orders']]
+    assert sorted(ids) == sorted(order['id'] for order in orders)
+    for load in plan['loads']:
+        destinations = [order['destination'] for order in load['orders']]
+        assert destinations == sorted(destinations)
+        assert 'total_miles' not in load
+    _assert_load_limits(plan['loads'])
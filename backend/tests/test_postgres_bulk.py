@@ -0,0 +1,96 @@
+"""
+Direct Postgres bulk access
+
+The COPY / cursor tests need a real database and run only when DATABASE_URL
+is set; they work in a throwaway table that is dropped afterwards.
+"""
+import uuid
+
+import pytest
+
+from config.settings import DATABASE_URL
+import database.postgres_bulk as postgres_bulk
+
+needs_database = pytest.mark.skipif(not DATABASE_URL, reason="DATABASE_URL is not set")
+
+
+@pytest.fixture
+def bulk_table():
+    client = postgres_bulk.PostgresBulkClient(min_connections=1, max_connections=2)
+    table = f"bulk_test_{uuid.uuid4().hex[:12]}"
+    with client.connection() as conn, conn.cursor() as cur:
+        cur.execute(f"CREATE TABLE {table} (id serial PRIMARY KEY, code text UNIQUE NOT NULL, "
+                    f"weight numeric(10, 2), note text DEFAULT 'default note')")
+    try:
+        yield client, table
+    finally:
+        with client.connection() as conn, conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {table}")
+        client.close()
+
+
+@needs_database
+def test_copy_rows_skips_conflicts(bulk_table):
+    client, table = bulk_table
+    first = client.copy_rows(table, [{'code': f"C{i}", 'weight': i * 1.5} for i in range(100)],
+                             conflict_column='code')
+    assert (first['written'], first['already_present']) == (100, 0)
+
+    # Half of these are already present; a missing value becomes NULL, a missing column its default
+    second = client.copy_rows(table, [{'code': f"C{i}", 'weight': None if i % 2 else i} for i in range(50, 150)],
+                              conflict_column='code')
+    assert (second['rows'], second['written'], second['already_present']) == (100, 50, 50)
+
+    rows = {row['code']: row for row in client.iter_rows(table)}
+    assert len(rows) == 150
+    assert rows['C10']['weight'] == 15.0  # First copy kept
+    assert rows['C101']['weight'] is None
+    assert rows['C100']['note'] == 'default note'
+
+
+@needs_database
+def test_iter_rows_streams_every_row(bulk_table):
+    client, table = bulk_table
+    client.copy_rows(table, [{'code': f"C{i}", 'weight': i} for i in range(1200)])
+
+    rows = list(client.iter_rows(table, columns='code, weight', itersize=100))
+    assert len(rows) == 1200
+    assert set(rows[0]) == {'code', 'weight'}
+    assert isinstance(rows[0]['weight'], float)
+    assert sorted(row['weight'] for row in rows) == [float(i) for i in range(1200)]
+
+
+@needs_database
+def test_partly_consumed_iterator_returns_its_connection(bulk_table):
+    client, table = bulk_table
+    client.copy_rows(table, [{'code': f"C{i}"} for i in range(10)])
+
+    for _ in range(5):  # More than the pool holds if connections leaked
+        rows = client.iter_rows(table, itersize=2)
+        next(rows)
+        rows.close()
+    assert len(list(client.iter_rows(table))) == 10
+
+
+def test_failed_connect_is_retried_after_backoff(monkeypatch):
+    attempts = []
+
+    def unreachable():
+        attempts.append(1)
+        raise ConnectionError("could not connect to server")
+
+    clock = [1000.0]
+    monkeypatch.setattr(postgres_bulk, 'DATABASE_URL', 'postgresql://unreachable/tms')
+    monkeypatch.setattr(postgres_bulk, 'PostgresBulkClient', unreachable)
+    monkeypatch.setattr(postgres_bulk, '_bulk_client', None)
+    monkeypatch.setattr(postgres_bulk, '_bulk_client_retry_at', 0.0)
+    monkeypatch.setattr(postgres_bulk.time, 'monotonic', lambda: clock[0])
+
+    assert postgres_bulk.get_bulk_client() is None
+    assert postgres_bulk.get_bulk_client() is None
+    assert len(attempts) == 1  # Inside the backoff window nothing is attempted
+
+    clock[0] += postgres_bulk.PG_RETRY_SECONDS
+    sentinel = object()
+    monkeypatch.setattr(postgres_bulk, 'PostgresBulkClient', lambda: sentinel)
+    assert postgres_bulk.get_bulk_client() is sentinel
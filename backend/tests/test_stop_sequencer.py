@@ -0,0 +1,84 @@
+"""
+Stop sequencing: haversine distances, nearest-neighbour + 2-opt routes
+"""
+import numpy as np
+import pytest
+
+from config.settings import ROAD_DISTANCE_FACTOR
+from utils.erp_data_generator import ERPDataGenerator
+from utils.stop_sequencer import StopSequencer, haversine_matrix, haversine_miles, nearest_neighbour_path, two_opt
+
+
+def _path_length(path, matrix):
+    return sum(matrix[a][b] for a, b in zip(path, path[1:]))
+
+
+def _random_matrix(rng, n):
+    lats = rng.uniform(25, 49, n)
+    lons = rng.uniform(-124, -67, n)
+    return haversine_matrix(lats, lons).tolist()
+
+
+def test_haversine_matrix_matches_pairwise_distances():
+    rng = np.random.default_rng(5)
+    lats = rng.uniform(25, 49, 12)
+    lons = rng.uniform(-124, -67, 12)
+
+    matrix = haversine_matrix(lats, lons)
+
+    expected = haversine_miles(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+    np.testing.assert_allclose(matrix, expected, atol=1e-9)
+    np.testing.assert_allclose(matrix, matrix.T, atol=1e-9)
+    assert np.all(np.diag(matrix) == 0)
+    # Toronto to New York is about 340 great-circle miles
+    assert haversine_miles(43.6532, -79.3832, 40.7128, -74.0060) == pytest.approx(343, abs=10)
+
+
+def test_nearest_neighbour_path_visits_every_node_once():
+    matrix = _random_matrix(np.random.default_rng(1), 9)
+
+    path = nearest_neighbour_path(matrix)
+
+    assert path[0] == 0
+    assert sorted(path) == list(range(9))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_two_opt_never_lengthens_the_route(seed):
+    matrix = _random_matrix(np.random.default_rng(seed), 9)
+    start = nearest_neighbour_path(matrix)
+
+    improved = two_opt(start, matrix)
+
+    assert improved[0] == 0
+    assert sorted(improved) == sorted(start)
+    assert _path_length(improved, matrix) <= _path_length(start, matrix) + 1e-9
+
+
+def test_two_opt_untangles_a_crossing():
+    # Points on a line: 0 -> 2 -> 1 -> 3 doubles back; 0 -> 1 -> 2 -> 3 does not
+    matrix = haversine_matrix([40.0] * 4, [-80.0, -79.0, -78.0, -77.0]).tolist()
+
+    assert two_opt([0, 2, 1, 3], matrix) == [0, 1, 2, 3]
+
+
+def test_sequence_is_a_permutation_of_the_stops():
+    destinations = [d['name'] for d in ERPDataGenerator.DESTINATIONS[:8]]
+    stops = destinations + destinations[:2] + ['Nowhere, ZZ']
+
+    result = StopSequencer().sequence('Toronto, ON', stops)
+
+    assert sorted(result['stops']) == sorted(set(stops))
+    assert result['unresolved'] == ['Nowhere, ZZ']
+    assert result['stops'][-1] == 'Nowhere, ZZ' and result['legs'][-1] is None
+    assert result['total_miles'] == pytest.approx(sum(leg for leg in result['legs'] if leg is not None), abs=0.5)
+
+
+def test_sequence_uses_road_miles():
+    sequencer = StopSequencer()
+
+    miles = sequencer.direct_miles('Toronto, ON', 'New York, NY')
+
+    straight = float(haversine_miles(43.6532, -79.3832, 40.7128, -74.0060))
+    assert miles == pytest.approx(straight * ROAD_DISTANCE_FACTOR, abs=0.1)
+    assert sequencer.leg_miles('Toronto, ON', ['New York, NY']) == [miles]
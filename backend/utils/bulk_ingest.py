@@ -0,0 +1,143 @@
+"""
+Bulk Ingest
+Concurrent, byte-sized chunk uploads with per-chunk retries and throughput stats
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    INGEST_WORKERS,
+    INGEST_CHUNK_BYTES,
+    INGEST_MAX_CHUNK_ROWS,
+    INGEST_MAX_RETRIES,
+    INGEST_RETRY_DELAY_SECONDS
+)
+
+
+def _row_bytes(rows, sample_size=100):
+    """Average JSON size of a row, from an evenly spaced sample"""
+    step = max(1, len(rows) // sample_size)
+    sample = rows[::step][:sample_size]
+    return max(1, len(json.dumps(sample, default=str).encode('utf-8')) // len(sample))
+
+
+def _payload_too_large(error):
+    text = str(error).lower()
+    return '413' in text or 'too large' in text
+
+
+class BulkUploader:
+    """
+    Sends rows in chunks from a small thread pool
+
+    send(chunk) must be idempotent (e.g. an upsert that ignores rows already
+    present) because a chunk whose response was lost is sent again. It
+    returns the number of rows written, or None when unknown.
+    """
+
+    def __init__(self, send, workers=INGEST_WORKERS, chunk_bytes=INGEST_CHUNK_BYTES,
+                 max_chunk_rows=INGEST_MAX_CHUNK_ROWS, max_retries=INGEST_MAX_RETRIES,
+                 retry_delay=INGEST_RETRY_DELAY_SECONDS):
+        """
+        Args:
+            send: Callable(chunk) writing one chunk of rows
+            workers: Chunks in flight at once
+            chunk_bytes: Target JSON payload per request
+            max_chunk_rows: Upper bound on rows per request
+            max_retries: Retries per chunk before it is reported as failed
+            retry_delay: First retry delay in seconds (doubles per attempt)
+        """
+        self.send = send
+        self.workers = max(1, workers)
+        self.chunk_bytes = chunk_bytes
+        self.max_chunk_rows = max_chunk_rows
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._retries = 0
+
+    def chunk_rows(self, rows):
+        """Rows per request so a chunk's payload is about chunk_bytes"""
+        if not rows:
+            return 1
+        return max(1, min(self.max_chunk_rows, self.chunk_bytes // _row_bytes(rows)))
+
+    def upload(self, rows, chunk_size=None, on_progress=None):
+        """
+        Upload every row
+
+        Args:
+            rows: Row dictionaries
+            chunk_size: Fixed rows per request (default: sized from payload bytes)
+            on_progress: Optional callback(rows_done, total) as chunks complete
+
+        Returns:
+            Dictionary with row/chunk counts, retries, failures and throughput
+        """
+        started = time.monotonic()
+        chunk_size = chunk_size or self.chunk_rows(rows)
+        chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+        self._retries = 0
+        written = 0
+        done = 0
+        failed_rows = 0
+        errors = []
+
+        print(f"[INGEST] Uploading {len(rows)} rows in {len(chunks)} chunks of {chunk_size} "
+              f"with {min(self.workers, max(len(chunks), 1))} workers")
+        with ThreadPoolExecutor(max_workers=min(self.workers, max(len(chunks), 1)),
+                                thread_name_prefix='ingest') as pool:
+            futures = {pool.submit(self._send_with_retry, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk_written, chunk_failed, chunk_errors = future.result()
+                written += chunk_written
+                failed_rows += chunk_failed
+                errors.extend(chunk_errors)
+                done += len(futures[future])
+                if on_progress:
+                    on_progress(done - failed_rows, len(rows))
+
+        elapsed = time.monotonic() - started
+        payload_mb = len(rows) * _row_bytes(rows) / 2 ** 20 if rows else 0.0
+        stats = {
+            'rows': len(rows),
+            'written': written,
+            'already_present': len(rows) - written - failed_rows,
+            'failed_rows': failed_rows,
+            'chunks': len(chunks),
+            'chunk_size': chunk_size,
+            'retries': self._retries,
+            'errors': errors[:10],
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(len(rows) / elapsed, 1) if elapsed else None,
+            'mb_per_second': round(payload_mb / elapsed, 2) if elapsed else None
+        }
+        print(f"[INGEST] {written} written, {stats['already_present']} already present, {failed_rows} failed "
+              f"in {stats['elapsed_seconds']}s ({stats['rows_per_second']} rows/s, {stats['retries']} retries)")
+        return stats
+
+    def _send_with_retry(self, chunk):
+        """Send one chunk; returns (rows written, rows failed, error messages)"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                count = self.send(chunk)
+                return (len(chunk) if count is None else count), 0, []
+            except Exception as e:
+                if _payload_too_large(e) and len(chunk) > 1:
+                    # Halve and send both parts (each with its own retries)
+                    print(f"[INGEST] Chunk of {len(chunk)} rows too large, splitting")
+                    mid = len(chunk) // 2
+                    first, second = self._send_with_retry(chunk[:mid]), self._send_with_retry(chunk[mid:])
+                    return first[0] + second[0], first[1] + second[1], first[2] + second[2]
+                if attempt == self.max_retries:
+                    print(f"[INGEST ERROR] Chunk of {len(chunk)} rows failed after {attempt} retries: {str(e)}")
+                    return 0, len(chunk), [str(e)]
+                with self._lock:
+                    self._retries += 1
+                print(f"[INGEST] Chunk of {len(chunk)} rows failed ({str(e)}), retry {attempt + 1}/{self.max_retries}")
+                time.sleep(self.retry_delay * 2 ** attempt)
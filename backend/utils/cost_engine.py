@@ -0,0 +1,268 @@
+"""
+Cost Engine
+Deterministic, vectorized freight cost breakdowns for whole load plans
+"""
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    BASE_RATE_PER_MILE,
+    FUEL_SURCHARGE_PERCENT,
+    DETENTION_RATE_PER_HOUR,
+    DETENTION_FREE_HOURS,
+    AVERAGE_MPG,
+    DIESEL_PRICE_PER_GALLON,
+    ROAD_DISTANCE_FACTOR,
+    MIN_TRUCK_UTILIZATION
+)
+from utils.stop_sequencer import StopSequencer, haversine_miles
+
+
+def routes_by_load(route_plan, loads):
+    """Map load id -> route dict from a single route plan or a batch route result"""
+    if not route_plan:
+        return {}
+    if isinstance(route_plan.get('routes'), list):
+        return {r.get('load_id'): r['route'] for r in route_plan['routes'] if isinstance(r.get('route'), dict)}
+    route = route_plan.get('route')
+    if not isinstance(route, dict):
+        return {}
+    load_id = route.get('load_id')
+    if not load_id and len(loads) == 1:
+        load_id = loads[0].get('load_id')
+    return {load_id: route}
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def cost_inputs(load_plan, route_plan=None, sequencer=None):
+    """
+    Per-load inputs for costing: miles, orders, detention and unconsolidated miles
+
+    Miles come from the load's route when one is supplied, then the packer's
+    total_miles, then the sequencer's distances for the load's stop order.
+    Detention is waiting beyond DETENTION_FREE_HOURS at each stop of a
+    scheduled route (or the load's own detention_hours).
+
+    The unconsolidated baseline ships every order on its own truck straight
+    from origin to destination; orders whose endpoints cannot be geocoded
+    are charged the miles of the load they ride on.
+
+    Returns:
+        DataFrame with one row per load
+    """
+    loads = (load_plan or {}).get('loads') or []
+    sequencer = sequencer or StopSequencer()
+    routes = routes_by_load(route_plan, loads)
+
+    rows = []
+    pair_rows = []  # (load row, origin, destination) per order for the baseline
+    for i, load in enumerate(loads):
+        load_id = load.get('load_id') or load.get('load_number')
+        orders = load.get('orders') or []
+        route = routes.get(load_id)
+
+        miles = _number(route.get('total_miles')) if route else np.nan
+        if np.isnan(miles):
+            miles = _number(load.get('total_miles'))
+        if np.isnan(miles):
+            stops = list(dict.fromkeys(o.get('destination') for o in
+                                       sorted(orders, key=lambda o: o.get('stop_sequence') or 0)))
+            miles = sum(leg for leg in sequencer.leg_miles(load.get('origin'), stops) if leg is not None)
+
+        if route and route.get('stops'):
+            waits = np.array([_number(stop.get('wait_hours')) for stop in route['stops']], dtype=np.float64)
+            detention = float(np.nansum(np.maximum(waits - DETENTION_FREE_HOURS, 0)))
+        else:
+            detention = _number(load.get('detention_hours'))
+
+        rows.append({
+            'load_id': load_id,
+            'origin': load.get('origin') or (orders[0].get('origin') if orders else None),
+            'miles': miles,
+            'orders_in_load': len(orders),
+            'total_weight_lbs': _number(load.get('total_weight_lbs') or load.get('total_weight')),
+            'utilization_percent': _number(load.get('utilization_percent') or load.get('utilization')),
+            'detention_hours': 0.0 if np.isnan(detention) else detention
+        })
+        for order in orders:
+            pair_rows.append((i, order.get('origin') or load.get('origin'), order.get('destination')))
+
+    frame = pd.DataFrame(rows, columns=['load_id', 'origin', 'miles', 'orders_in_load', 'total_weight_lbs',
+                                        'utilization_percent', 'detention_hours'])
+    frame['miles'] = frame['miles'].fillna(0.0)
+    frame['baseline_miles'] = _baseline_miles(pair_rows, frame['miles'].to_numpy(), sequencer)
+    return frame
+
+
+def _baseline_miles(pair_rows, load_miles, sequencer):
+    """Direct origin -> destination road miles summed per load, one vectorized haversine"""
+    baseline = np.zeros(len(load_miles))
+    if not pair_rows:
+        return baseline
+    load_idx = np.array([row[0] for row in pair_rows], dtype=np.int64)
+    coords = {}
+    for _, origin, destination in pair_rows:
+        for location in (origin, destination):
+            if location not in coords:
+                coords[location] = sequencer.resolve(location) if location else None
+    ends = np.array([coords[origin] + coords[destination] if coords[origin] and coords[destination]
+                     else (np.nan,) * 4 for _, origin, destination in pair_rows], dtype=np.float64)
+    direct = haversine_miles(ends[:, 0], ends[:, 1], ends[:, 2], ends[:, 3]) * ROAD_DISTANCE_FACTOR
+    direct = np.where(np.isnan(direct), load_miles[load_idx], direct)
+    np.add.at(baseline, load_idx, direct)
+    return baseline
+
+
+def compute_costs(inputs):
+    """
+    Cost breakdown columns for every load at once
+
+    total_load_cost is base freight + fuel surcharge + detention. Fuel burn
+    (gallons at AVERAGE_MPG and their cost at DIESEL_PRICE_PER_GALLON) is
+    reported for carrier economics; the surcharge is what the shipper pays
+    for it.
+
+    Args:
+        inputs: DataFrame from cost_inputs
+
+    Returns:
+        Copy of inputs with the cost columns added
+    """
+    costs = inputs.copy()
+    miles = costs['miles'].to_numpy(dtype=np.float64)
+    orders = costs['orders_in_load'].to_numpy(dtype=np.float64)
+
+    costs['base_freight_cost'] = miles * BASE_RATE_PER_MILE
+    costs['fuel_surcharge'] = costs['base_freight_cost'] * FUEL_SURCHARGE_PERCENT
+    costs['detention_fees'] = costs['detention_hours'] * DETENTION_RATE_PER_HOUR
+    costs['total_load_cost'] = costs['base_freight_cost'] + costs['fuel_surcharge'] + costs['detention_fees']
+    costs['cost_per_mile'] = np.divide(costs['total_load_cost'], miles, out=np.zeros(len(costs)), where=miles > 0)
+    costs['cost_per_order'] = np.divide(costs['total_load_cost'], orders, out=np.zeros(len(costs)), where=orders > 0)
+    costs['fuel_gallons'] = miles / AVERAGE_MPG
+    costs['fuel_cost_estimate'] = costs['fuel_gallons'] * DIESEL_PRICE_PER_GALLON
+    costs['baseline_cost'] = costs['baseline_miles'] * BASE_RATE_PER_MILE * (1 + FUEL_SURCHARGE_PERCENT)
+    return costs
+
+
+LOAD_OUTPUT_COLUMNS = ['load_id', 'base_freight_cost', 'fuel_surcharge', 'detention_fees', 'total_load_cost',
+                       'cost_per_mile', 'orders_in_load', 'cost_per_order', 'miles', 'fuel_gallons',
+                       'fuel_cost_estimate', 'baseline_miles', 'baseline_cost', 'utilization_percent']
+
+# Anything that changes a load's figures besides its own data
+COST_PARAMETERS = (BASE_RATE_PER_MILE, FUEL_SURCHARGE_PERCENT, DETENTION_RATE_PER_HOUR, DETENTION_FREE_HOURS,
+                   AVERAGE_MPG, DIESEL_PRICE_PER_GALLON, ROAD_DISTANCE_FACTOR)
+
+
+def load_cost_hash(load, route=None):
+    """
+    Content hash of everything a load's cost depends on
+
+    Covers the origin, the stops (order, origin, destination, sequence),
+    packed miles and utilization, the route's miles and stop waits, and the
+    cost parameters - so a stored analysis is reused only while all of them
+    are unchanged.
+    """
+    orders = sorted(load.get('orders') or [], key=lambda o: (o.get('stop_sequence') or 0, str(o.get('id'))))
+    content = {
+        'origin': load.get('origin'),
+        'orders': [[o.get('id') or o.get('order_number'), o.get('origin'), o.get('destination'),
+                    o.get('stop_sequence')] for o in orders],
+        'miles': load.get('total_miles'),
+        'utilization': load.get('utilization_percent') or load.get('utilization'),
+        'detention_hours': load.get('detention_hours'),
+        'route': [route.get('total_miles'), [stop.get('wait_hours') for stop in route.get('stops') or []]]
+                 if route else None,
+        'parameters': COST_PARAMETERS
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def cost_load_rows(load_plan, route_plan=None, sequencer=None):
+    """Rounded per-load cost breakdowns (input order) for a load plan"""
+    costs = compute_costs(cost_inputs(load_plan, route_plan, sequencer))
+    costs['utilization_percent'] = costs['utilization_percent'].fillna(0.0)
+    return costs[LOAD_OUTPUT_COLUMNS].round(2).to_dict('records')
+
+
+def summarize_costs(load_rows):
+    """
+    Plan totals, baseline comparison and savings from per-load rows
+
+    Works on rows from cost_load_rows whether freshly computed or read back
+    from storage, so cached and recomputed loads add up the same way.
+
+    Returns:
+        Dictionary with 'totals', 'baseline_comparison', 'savings_breakdown',
+        'low_utilization_loads' and 'detention_loads'
+    """
+    costs = pd.DataFrame(load_rows, columns=LOAD_OUTPUT_COLUMNS)
+    numeric = [c for c in LOAD_OUTPUT_COLUMNS if c != 'load_id']
+    costs[numeric] = costs[numeric].apply(pd.to_numeric, errors='coerce').fillna(0.0)
+
+    total_orders = int(costs['orders_in_load'].sum())
+    total_miles = float(costs['miles'].sum())
+    grand_total = float(costs['total_load_cost'].sum())
+    baseline = float(costs['baseline_cost'].sum())
+    savings = baseline - grand_total
+
+    savings_breakdown = []
+    if savings > 0:
+        savings_breakdown.append({
+            'category': 'Load Consolidation',
+            'amount': round(savings, 2),
+            'description': f"{total_orders} orders on {len(costs)} trucks instead of {total_orders} direct shipments "
+                           f"({round(float(costs['baseline_miles'].sum()) - total_miles)} fewer miles)"
+        })
+
+    return {
+        'totals': {
+            'total_loads': len(costs),
+            'total_orders': total_orders,
+            'total_miles': round(total_miles, 1),
+            'total_freight_cost': round(float(costs['base_freight_cost'].sum()), 2),
+            'total_fuel_surcharge': round(float(costs['fuel_surcharge'].sum()), 2),
+            'total_detention': round(float(costs['detention_fees'].sum()), 2),
+            'grand_total': round(grand_total, 2),
+            'avg_cost_per_order': round(grand_total / total_orders, 2) if total_orders else 0,
+            'avg_cost_per_mile': round(grand_total / total_miles, 3) if total_miles else 0,
+            'total_fuel_gallons': round(float(costs['fuel_gallons'].sum()), 1),
+            'total_fuel_cost_estimate': round(float(costs['fuel_cost_estimate'].sum()), 2)
+        },
+        'baseline_comparison': {
+            'unoptimized_cost_estimate': round(baseline, 2),
+            'optimized_cost': round(grand_total, 2),
+            'savings_amount': round(savings, 2),
+            'savings_percent': round(100 * savings / baseline, 1) if baseline else 0
+        },
+        'savings_breakdown': savings_breakdown,
+        'low_utilization_loads': costs.loc[costs['utilization_percent'] < MIN_TRUCK_UTILIZATION * 100, 'load_id'].tolist(),
+        'detention_loads': costs.loc[costs['detention_fees'] > 0, 'load_id'].tolist()
+    }
+
+
+def analyze_plan_costs(load_plan, route_plan=None, sequencer=None):
+    """
+    Deterministic cost analysis of a load plan
+
+    Args:
+        load_plan: Load plan with 'loads'
+        route_plan: Optional single route plan or batch route result
+        sequencer: StopSequencer used for missing miles and the baseline
+
+    Returns:
+        Dictionary in the cost_analysis format: 'loads', 'totals',
+        'baseline_comparison' and 'savings_breakdown'
+    """
+    load_rows = cost_load_rows(load_plan, route_plan, sequencer)
+    return dict(summarize_costs(load_rows), loads=load_rows)
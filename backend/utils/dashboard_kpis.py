@@ -0,0 +1,114 @@
+"""
+Dashboard KPIs
+Server-side dashboard aggregates with a short-lived in-process cache
+"""
+import threading
+import time
+from datetime import datetime
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import DASHBOARD_CACHE_TTL_SECONDS
+
+# Load statuses that are not moving freight (everything else counts as an active shipment)
+INACTIVE_LOAD_STATUSES = ('Planning', 'Delivered', 'Cancelled')
+
+
+def build_kpis(aggregates):
+    """
+    Dashboard payload from raw aggregates
+
+    Args:
+        aggregates: Dictionary with orders_by_status, loads_by_status,
+                    unplanned_orders, avg_utilization, cost_savings_ytd
+                    and total_cost_ytd
+
+    Returns:
+        Dictionary of KPIs
+    """
+    orders_by_status = {status: int(n) for status, n in (aggregates.get('orders_by_status') or {}).items()}
+    loads_by_status = {status: int(n) for status, n in (aggregates.get('loads_by_status') or {}).items()}
+    return {
+        'active_shipments': sum(n for status, n in loads_by_status.items() if status not in INACTIVE_LOAD_STATUSES),
+        'total_orders': sum(orders_by_status.values()),
+        'avg_utilization': float(aggregates.get('avg_utilization') or 0),
+        'cost_savings_ytd': float(aggregates.get('cost_savings_ytd') or 0),
+        'total_cost_ytd': float(aggregates.get('total_cost_ytd') or 0),
+        'unplanned_orders': int(aggregates.get('unplanned_orders') or 0),
+        'total_loads': sum(loads_by_status.values()),
+        'orders_by_status': orders_by_status,
+        'loads_by_status': loads_by_status
+    }
+
+
+class DashboardKPICache:
+    """
+    Holds the latest KPIs for ttl_seconds
+
+    Writes through SupabaseClient call invalidate(), so the next dashboard
+    request recomputes; the TTL bounds staleness from writes made elsewhere
+    (other processes, the SQL editor).
+    """
+
+    def __init__(self, loader, ttl_seconds=DASHBOARD_CACHE_TTL_SECONDS):
+        """
+        Args:
+            loader: Callable returning the raw aggregates dictionary
+            ttl_seconds: Seconds a computed result is served
+        """
+        self._loader = loader
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._kpis = None
+        self._loaded_at = 0.0
+        self._generation = 0
+
+    def get(self, refresh=False):
+        """
+        Return (kpis, cached flag), recomputing when stale or refresh is set
+        """
+        with self._lock:
+            if not refresh and self._kpis is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                return self._kpis, True
+            generation = self._generation
+
+        kpis = build_kpis(self._loader())
+        kpis['generated_at'] = datetime.utcnow().isoformat()
+        with self._lock:
+            # A write during the computation may not be reflected - don't cache it
+            if generation == self._generation:
+                self._kpis = kpis
+                self._loaded_at = time.monotonic()
+        return kpis, False
+
+    def invalidate(self):
+        """Drop the cached KPIs so the next request recomputes them"""
+        with self._lock:
+            self._kpis = None
+            self._generation += 1
+
+
+_kpi_cache = None
+_kpi_cache_lock = threading.Lock()
+
+
+def _load_aggregates():
+    from database.supabase_client import get_supabase_client
+    return get_supabase_client().get_dashboard_aggregates()
+
+
+def get_dashboard_kpi_cache():
+    """Return the process-wide DashboardKPICache"""
+    global _kpi_cache
+    if _kpi_cache is None:
+        with _kpi_cache_lock:
+            if _kpi_cache is None:
+                _kpi_cache = DashboardKPICache(_load_aggregates)
+    return _kpi_cache
+
+
+def invalidate_dashboard_kpis():
+    """Invalidate cached KPIs after orders, loads or costs change"""
+    if _kpi_cache is not None:
+        _kpi_cache.invalidate()
@@ -2,11 +2,11 @@
 Synthetic Data Generator for ERP Orders
 Canada (GTA) -> USA Supply Chain Network
 """
-import random
 from datetime import datetime, timedelta
-import uuid
 import json
 import time
+import numpy as np
+import pandas as pd
 
 class ERPDataGenerator:
     """
@@ -92,6 +92,16 @@ class ERPDataGenerator:
         "Inside delivery"
     ]
     
+    DATE_COLUMNS = ['delivery_window_start', 'delivery_window_end', 'created_at',
+                    'order_received_date', 'must_arrive_by_date']
+    
+    def __init__(self, seed=None):
+        """
+        Args:
+            seed: Optional seed - the same seed reproduces the same orders
+        """
+        self.rng = np.random.default_rng(seed)
+    
     def generate_orders(self, count=10):
         """
         Generate synthetic orders from Toronto facilities to US customers
@@ -102,111 +112,132 @@ class ERPDataGenerator:
         Returns:
             List of order dictionaries
         """
-        orders = []
-        
-        for i in range(count):
-            order = self._generate_single_order(i + 1)
-            orders.append(order)
-        
-        return orders
+        received = np.full(count, np.datetime64(datetime.now() - timedelta(days=30), 's'))
+        lead_days = self.rng.integers(2, 11, count)  # 2-10 days lead time
+        return self.to_orders(self._order_frame(received, lead_days))
     
-    def generate_monthly_orders(self):
+    def generate_monthly_orders(self, total_orders=4000, weeks=4):
         """
         Generate one month worth of orders (~4,000 orders = 1,000/week * 4 weeks)
         Distribution reflects consistent weekly demand patterns
         
+        Args:
+            total_orders: Orders across all weeks
+            weeks: Weeks the orders are spread over
+        
         Returns:
             List of ~4,000 order dictionaries
         """
-        total_orders = 4000
-        orders = []
+        # Orders created during week, with delivery windows in that week and next
+        week = np.arange(total_orders) * weeks // total_orders  # Even split, remainder included
+        days_offset = week * 7 + self.rng.integers(0, 7, len(week))  # Spread across the week
+        # Received over the past `weeks` weeks, the last week ending today
+        received = np.datetime64(datetime.now(), 's') - (weeks * 7 - days_offset).astype('timedelta64[D]')
+        lead_days = days_offset + self.rng.integers(2, 6, len(week))
+        return self.to_orders(self._order_frame(received, lead_days))
+    
+    def generate_order_frame(self, count, start_date=None, end_date=None, lead_days=(2, 10)):
+        """
+        Generate orders as a DataFrame, one vectorized draw per column
+        
+        Builds a million orders in seconds, for benchmarking the optimizer and
+        facility-location paths; to_orders converts to the dict format.
         
-        # Generate orders spread over 4 weeks
-        for week in range(4):
-            week_orders = total_orders // 4  # 1,000 orders per week
+        Args:
+            count: Number of orders
+            start_date: Earliest order received date (default: 30 days ago)
+            end_date: Latest order received date (default: now)
+            lead_days: (min, max) days from receipt to the delivery window start
             
-            for i in range(week_orders):
-                order_num = week * week_orders + i + 1
-                # Orders created during week, with delivery windows in that week and next
-                days_offset = week * 7 + random.randint(0, 6)  # Spread across the week
-                order = self._generate_single_order(order_num, days_offset)
-                orders.append(order)
-        
-        return orders
+        Returns:
+            DataFrame with one row per order (dates as datetime64, text columns
+            as categoricals)
+        """
+        end = pd.Timestamp(end_date or datetime.now())
+        start = pd.Timestamp(start_date or end - timedelta(days=30))
+        span_seconds = max(int((end - start).total_seconds()), 0)
+        received = start.to_datetime64().astype('datetime64[s]') + \
+            self.rng.integers(0, span_seconds + 1, count).astype('timedelta64[s]')
+        lead = self.rng.integers(lead_days[0], lead_days[1] + 1, count)
+        return self._order_frame(received, lead)
     
-    def _generate_single_order(self, order_num, days_from_now=None):
+    def _order_frame(self, received, lead_days):
         """
-        Generate a single realistic order from GTA to US customer
+        Orders from GTA to US customers, one row per received timestamp
         
         Args:
-            order_num: Sequential order number
-            days_from_now: Days from now for order creation (for historical data)
+            received: datetime64 array of order received dates
+            lead_days: Integer array of days to the delivery window start
         """
+        n = len(received)
+        rng = self.rng
+        
+        # Random origin (one of three GTA facilities); destinations weighted so
+        # high-volume markets get more orders
+        origin_idx = rng.integers(0, len(self.ORIGINS), n)
+        dest_weights = np.array([d["weight"] for d in self.DESTINATIONS], dtype=np.float64)
+        dest_idx = rng.choice(len(self.DESTINATIONS), size=n, p=dest_weights / dest_weights.sum())
+        
+        # Uniform product profile: 1-26 pallets (LTL to FTL) at 500-1,200 lbs,
+        # uniform density of ~12 lbs per cubic foot
+        weight = rng.integers(1, 27, n) * rng.integers(500, 1201, n)
+        volume = np.round(weight / 12.0, 2)
+        
+        # Delivery window, and must_arrive_by_date slightly before its end
+        delivery_start = received + lead_days.astype('timedelta64[D]')
+        delivery_end = delivery_start + rng.integers(4, 13, n).astype('timedelta64[h]')
+        must_arrive_by = delivery_end - rng.integers(2, 7, n).astype('timedelta64[h]')
         
-        # Select random origin (one of three GTA facilities)
-        origin = random.choice(self.ORIGINS)
-        
-        # Select destination based on weighted distribution (high-volume markets get more orders)
-        destination = random.choices(
-            self.DESTINATIONS,
-            weights=[d["weight"] for d in self.DESTINATIONS],
-            k=1
-        )[0]
-        
-        # Uniform product profile: consistent weight/volume for palletized goods
-        # Typical FTL: 20-40 pallets, 500-1,000 lbs per pallet
-        num_pallets = random.randint(1, 26)  # 1-26 pallets (allowing LTL to FTL)
-        weight_per_pallet = random.randint(500, 1200)  # lbs
-        base_weight = num_pallets * weight_per_pallet
-        
-        # Uniform density: ~12 lbs per cubic foot (standard for packaged goods)
-        density = 12.0
-        volume = round(base_weight / density, 2)
-        
-        # Generate delivery window
-        if days_from_now is None:
-            days_ahead = random.randint(2, 10)  # 2-10 days lead time
-        else:
-            days_ahead = days_from_now + random.randint(2, 5)
-        
-        order_date = datetime.now() - timedelta(days=(30 - (days_from_now or 0)))
-        delivery_start = order_date + timedelta(days=days_ahead)
-        delivery_end = delivery_start + timedelta(hours=random.randint(4, 12))
-        
-        # Calculate must_arrive_by_date (hard deadline - slightly before delivery_window_end)
-        must_arrive_by = delivery_end - timedelta(hours=random.randint(2, 6))
-        
-        # Create unique order number using UUID to avoid collisions
-        unique_id = str(uuid.uuid4())[:8].upper()
-        order_number = f"ORD-{unique_id}"
-        
-        order = {
-            "order_number": order_number,
-            "customer": random.choice(self.CUSTOMERS),
-            "origin": f"{origin['name']} - {origin['facility']}",
-            "destination": destination["name"],
-            "weight_lbs": base_weight,
+        def categorical(codes, values):
+            return pd.Categorical.from_codes(codes, categories=values)
+        
+        special = rng.integers(0, len(self.SPECIAL_REQUIREMENTS), n) - 1  # Code -1 is None
+        return pd.DataFrame({
+            "order_number": self._order_numbers(n),
+            "customer": categorical(rng.integers(0, len(self.CUSTOMERS), n), self.CUSTOMERS),
+            "origin": categorical(origin_idx, [f"{o['name']} - {o['facility']}" for o in self.ORIGINS]),
+            "destination": categorical(dest_idx, [d["name"] for d in self.DESTINATIONS]),
+            "weight_lbs": weight,
             "volume_cuft": volume,
-            "priority": random.choices(
-                self.PRIORITIES,
-                weights=[0.1, 0.8, 0.1],  # 10% high, 80% normal, 10% low
-                k=1
-            )[0],
+            "priority": categorical(rng.choice(len(self.PRIORITIES), size=n, p=[0.1, 0.8, 0.1]),
+                                    self.PRIORITIES),  # 10% high, 80% normal, 10% low
             "status": "Pending",
-            "delivery_window_start": delivery_start.isoformat(),
-            "delivery_window_end": delivery_end.isoformat(),
-            "special_requirements": random.choice(self.SPECIAL_REQUIREMENTS),
-            "created_at": order_date.isoformat(),
-            # New date fields for order lifecycle management
-            "order_received_date": order_date.isoformat(),
-            "must_arrive_by_date": must_arrive_by.isoformat(),
+            "delivery_window_start": delivery_start,
+            "delivery_window_end": delivery_end,
+            "special_requirements": categorical(special, self.SPECIAL_REQUIREMENTS[1:]),
+            "created_at": received,
+            "order_received_date": received,
+            "must_arrive_by_date": must_arrive_by,
             "planned_to_load_date": None,  # Will be set when assigned to a load
             "assigned_load_number": None,   # Will be set when assigned to a load
             # Facility code for ID lookup (will be converted to origin_facility_id)
-            "origin_facility_code": origin.get('facility_code')
-        }
+            "origin_facility_code": categorical(origin_idx, [o['facility_code'] for o in self.ORIGINS])
+        })
+    
+    def _order_numbers(self, n):
+        """Unique ORD-XXXXXXXX numbers (8 random hex digits, duplicates redrawn)"""
+        ids = self.rng.integers(0, 2 ** 32, n, dtype=np.uint64)
+        while True:
+            duplicate = np.ones(n, dtype=bool)
+            duplicate[np.unique(ids, return_index=True)[1]] = False
+            if not duplicate.any():
+                break
+            ids[duplicate] = self.rng.integers(0, 2 ** 32, int(duplicate.sum()), dtype=np.uint64)
         
-        return order
+        digits = (ids[:, None] >> np.arange(28, -1, -4, dtype=np.uint64)) & np.uint64(0xF)
+        hex_chars = np.array(list("0123456789ABCDEF"))[digits.astype(np.intp)]
+        return np.char.add("ORD-", np.ascontiguousarray(hex_chars).view("<U8").ravel())
+    
+    @classmethod
+    def to_orders(cls, frame):
+        """
+        Order dictionaries (ISO date strings, None for missing values) from an order frame
+        """
+        out = frame.copy()
+        for column in cls.DATE_COLUMNS:
+            out[column] = np.datetime_as_string(out[column].to_numpy(dtype='datetime64[s]'), unit='s')
+        out = out.astype(object)
+        return out.where(out.notna(), None).to_dict('records')
     
     @classmethod
     def get_origin_coordinates(cls, origin_string):
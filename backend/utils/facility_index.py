@@ -0,0 +1,129 @@
+"""
+Facility Index
+Shared in-process geocode lookup over the facilities table with TTL refresh
+"""
+import threading
+import time
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import FACILITY_INDEX_TTL_SECONDS
+from utils.stop_sequencer import location_key
+
+
+class FacilityIndex:
+    """
+    Facilities keyed by code, full location string, city and facility name
+
+    All keys go through the same normalization as StopSequencer, so
+    "Toronto, ON - Toronto DC", "Toronto" and "toronto dc" resolve to the same
+    row. The table is fetched once and re-fetched after the TTL expires or
+    after invalidate() is called.
+    """
+
+    def __init__(self, loader, ttl_seconds=FACILITY_INDEX_TTL_SECONDS):
+        """
+        Args:
+            loader: Callable returning the list of facility rows
+            ttl_seconds: Seconds before the index is re-fetched
+        """
+        self._loader = loader
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # (facilities, by_key) replaced as one tuple so readers never mix two loads
+        self._snapshot = None
+        self._loaded_at = 0.0
+
+    def _build(self, facilities):
+        """Build the key -> facility dictionary (first match wins)"""
+        by_key = {}
+        for facility in facilities:
+            if facility.get('latitude') is None or facility.get('longitude') is None:
+                continue
+            code = facility.get('facility_code')
+            if code:
+                by_key.setdefault(code.strip().lower(), facility)
+            for name in (facility.get('city'), facility.get('facility_name')):
+                if name:
+                    by_key.setdefault(name.strip().lower(), facility)
+                    by_key.setdefault(location_key(name), facility)
+        return by_key
+
+    def _ensure_loaded(self):
+        """
+        Fetch the facilities table if the index is empty or stale
+
+        Returns:
+            The current (facilities, by_key) snapshot
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+            return snapshot
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                return self._snapshot
+            facilities = self._loader() or []
+            by_key = self._build(facilities)
+            self._snapshot = (facilities, by_key)
+            self._loaded_at = time.monotonic()
+            print(f"[FACILITY INDEX] Loaded {len(facilities)} facilities ({len(by_key)} lookup keys)")
+            return self._snapshot
+
+    def invalidate(self):
+        """Mark the index stale so the next lookup re-fetches it (readers keep the old snapshot)"""
+        with self._lock:
+            self._loaded_at = 0.0
+
+    def facilities(self):
+        """All facility rows"""
+        facilities, _ = self._ensure_loaded()
+        return facilities
+
+    def lookup(self, location):
+        """
+        Find the facility for a location string
+
+        Args:
+            location: Facility code, city, facility name or an order location
+                      such as "Houston, TX - Houston DC"
+
+        Returns:
+            Facility row dictionary, or None if unknown
+        """
+        if not location:
+            return None
+        _, by_key = self._ensure_loaded()
+        return by_key.get(location.strip().lower()) or by_key.get(location_key(location))
+
+    def coordinates(self, location):
+        """Return (lat, lon) floats for a location string, or None if unknown"""
+        facility = self.lookup(location)
+        if facility is None:
+            return None
+        return float(facility['latitude']), float(facility['longitude'])
+
+
+_facility_index = None
+_facility_index_lock = threading.Lock()
+
+
+def _load_facilities():
+    from database.supabase_client import get_supabase_client
+    return get_supabase_client().get_all_facilities()
+
+
+def get_facility_index():
+    """Return the process-wide FacilityIndex backed by the facilities table"""
+    global _facility_index
+    if _facility_index is None:
+        with _facility_index_lock:
+            if _facility_index is None:
+                _facility_index = FacilityIndex(_load_facilities)
+    return _facility_index
+
+
+def invalidate_facility_index():
+    """Invalidate the shared index after the facilities table changes"""
+    if _facility_index is not None:
+        _facility_index.invalidate()
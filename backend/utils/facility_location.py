@@ -0,0 +1,214 @@
+"""
+Facility Location Analysis
+Columnar demand aggregation and weighted K-means metrics for network design
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import FACILITY_SWEEP_WORKERS
+from utils.stop_sequencer import haversine_miles
+
+# Only these order columns are needed for the analysis
+DEMAND_COLUMNS = ['destination', 'weight_lbs', 'customer']
+
+
+def aggregate_demand(orders, facility_index):
+    """
+    Aggregate order weight by customer location
+
+    Destinations are geocoded once per unique string through the facility index,
+    then orders are grouped by coordinates rounded to 4 decimals.
+
+    Args:
+        orders: List of order dictionaries (destination, weight_lbs, customer)
+        facility_index: FacilityIndex used to resolve destinations
+
+    Returns:
+        DataFrame with one row per location: lat, lon, total_weight,
+        order_count, customer_name, city, state (first-seen order)
+    """
+    df = pd.DataFrame(orders, columns=DEMAND_COLUMNS)
+    df['weight_lbs'] = pd.to_numeric(df['weight_lbs'], errors='coerce')
+    # Skip orders without a destination or a usable (non-zero) weight
+    df = df[df['destination'].fillna('').astype(bool) & df['weight_lbs'].fillna(0).astype(bool)]
+    if df.empty:
+        return _empty_demand()
+
+    geo = {}
+    for destination in df['destination'].unique():
+        facility = facility_index.lookup(destination)
+        if facility:
+            geo[destination] = (
+                float(facility['latitude']),
+                float(facility['longitude']),
+                facility.get('city') or None,
+                facility.get('state_province') or None
+            )
+    df = df[df['destination'].isin(geo.keys())]
+    if df.empty:
+        return _empty_demand()
+
+    coords = pd.DataFrame.from_dict(geo, orient='index', columns=['lat', 'lon', 'city', 'state'])
+    df = df.join(coords, on='destination')
+    df['lat_key'] = df['lat'].round(4)
+    df['lon_key'] = df['lon'].round(4)
+
+    demand = df.groupby(['lat_key', 'lon_key'], sort=False).agg(
+        lat=('lat', 'first'),
+        lon=('lon', 'first'),
+        total_weight=('weight_lbs', 'sum'),
+        order_count=('weight_lbs', 'size'),
+        customer_name=('customer', 'first'),
+        city=('city', 'first'),
+        state=('state', 'first')
+    ).reset_index(drop=True)
+    demand['customer_name'] = demand['customer_name'].fillna('Unknown')
+    demand[['city', 'state']] = demand[['city', 'state']].fillna('')
+    return demand
+
+
+def _empty_demand():
+    return pd.DataFrame(columns=['lat', 'lon', 'total_weight', 'order_count', 'customer_name', 'city', 'state'])
+
+
+def facility_metrics(demand, labels, centers):
+    """
+    Per-facility metrics computed with vectorized distances and bincount
+
+    Args:
+        demand: DataFrame from aggregate_demand
+        labels: Cluster label per demand row
+        centers: Array of (lat, lon) cluster centers
+
+    Returns:
+        Tuple of (list of facility dictionaries, distance of each demand row
+        to its assigned center in miles)
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    centers = np.asarray(centers, dtype=np.float64)
+    k = len(centers)
+    lats = demand['lat'].to_numpy(dtype=np.float64)
+    lons = demand['lon'].to_numpy(dtype=np.float64)
+    weights = demand['total_weight'].to_numpy(dtype=np.float64)
+
+    distances = haversine_miles(lats, lons, centers[labels, 0], centers[labels, 1])
+
+    num_customers = np.bincount(labels, minlength=k)
+    distance_sum = np.bincount(labels, weights=distances, minlength=k)
+    total_volume = np.bincount(labels, weights=weights, minlength=k)
+    total_orders = np.bincount(labels, weights=demand['order_count'].to_numpy(dtype=np.float64), minlength=k)
+    avg_distance = np.divide(distance_sum, num_customers, out=np.zeros(k), where=num_customers > 0)
+
+    # Closest demand point per cluster: sort by (label, distance) and take each label's first row
+    by_cluster = np.lexsort((distances, labels))
+    first_rows = by_cluster[np.r_[0, np.flatnonzero(np.diff(labels[by_cluster])) + 1]] if len(labels) else []
+    closest = {int(labels[row]): int(row) for row in first_rows}
+
+    cities = demand['city'].to_numpy()
+    states = demand['state'].to_numpy()
+    facilities = []
+    for i in range(k):
+        row = closest.get(i)
+        facilities.append({
+            'facility_id': i + 1,
+            'latitude': float(centers[i, 0]),
+            'longitude': float(centers[i, 1]),
+            'nearest_city': (cities[row] if row is not None else '') or 'Unknown',
+            'nearest_state': (states[row] if row is not None else '') or 'Unknown',
+            'avg_customer_distance': round(float(avg_distance[i]), 1),
+            'total_volume': round(float(total_volume[i]), 0),
+            'num_customers': int(num_customers[i]),
+            'total_orders': int(total_orders[i]),
+            'cluster_label': i
+        })
+    return facilities, distances
+
+
+def demand_points(demand, labels):
+    """Demand rows as map points with their assigned facility (1-based)"""
+    points = pd.DataFrame({
+        'latitude': demand['lat'].astype(float),
+        'longitude': demand['lon'].astype(float),
+        'weight': demand['total_weight'].astype(float),
+        'customer': demand['customer_name'],
+        'city': demand['city'],
+        'state': demand['state'],
+        'order_count': demand['order_count'].astype(int),
+        'assigned_facility': np.asarray(labels, dtype=np.int64) + 1
+    })
+    return points.to_dict('records')
+
+
+def fit_facilities(coords, weights, k):
+    """
+    Weighted K-means for one candidate facility count
+
+    Returns:
+        Tuple of (labels, centers, inertia)
+    """
+    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+    labels = kmeans.fit_predict(coords, sample_weight=weights)
+    return labels, kmeans.cluster_centers_, float(kmeans.inertia_)
+
+
+def recommend_elbow(k_values, costs):
+    """
+    Pick the elbow of a decreasing cost curve
+
+    Both axes are scaled to [0, 1] and the k farthest below the straight line
+    from the first to the last candidate wins (the "kneedle" heuristic).
+    Fewer than three candidates cannot have an elbow, so the smallest k wins.
+    """
+    k_values = np.asarray(k_values, dtype=np.float64)
+    costs = np.asarray(costs, dtype=np.float64)
+    if len(k_values) < 3 or costs[0] == costs[-1]:
+        return int(k_values[0])
+    x = (k_values - k_values[0]) / (k_values[-1] - k_values[0])
+    y = (costs - costs[-1]) / (costs[0] - costs[-1])
+    return int(k_values[int(np.argmax((1 - x) - y))])
+
+
+def sweep_facility_counts(demand, k_values, workers=FACILITY_SWEEP_WORKERS):
+    """
+    Fit every candidate k in parallel against one aggregated demand matrix
+
+    Args:
+        demand: DataFrame from aggregate_demand
+        k_values: Candidate facility counts (ascending)
+        workers: Threads fitting candidates concurrently
+
+    Returns:
+        Dictionary with 'sweep' (per-k weighted average customer distance and
+        demand-miles), 'recommended_k' and 'fits' (k -> (labels, centers))
+    """
+    coords = demand[['lat', 'lon']].to_numpy(dtype=np.float64)
+    weights = demand['total_weight'].to_numpy(dtype=np.float64)
+    lats, lons = coords[:, 0], coords[:, 1]
+
+    # KMeans runs its Lloyd iterations without the GIL, so threads fit candidates
+    # concurrently without process start-up or pickling the demand matrix
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(k_values)))) as executor:
+        results = list(executor.map(lambda k: fit_facilities(coords, weights, k), k_values))
+
+    sweep = []
+    fits = {}
+    for k, (labels, centers, inertia) in zip(k_values, results):
+        distances = haversine_miles(lats, lons, centers[labels, 0], centers[labels, 1])
+        demand_miles = float(np.dot(weights, distances))
+        sweep.append({
+            'k': int(k),
+            'weighted_avg_distance': round(demand_miles / weights.sum(), 1),
+            'demand_miles': round(demand_miles, 0),
+            'max_customer_distance': round(float(distances.max()), 1),
+            'inertia': inertia
+        })
+        fits[int(k)] = (labels, centers)
+
+    recommended_k = recommend_elbow([row['k'] for row in sweep], [row['demand_miles'] for row in sweep])
+    return {'sweep': sweep, 'recommended_k': recommended_k, 'fits': fits}
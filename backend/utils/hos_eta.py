@@ -0,0 +1,272 @@
+"""
+Hours-of-Service ETA Engine
+Deterministic arrival/departure times for sequenced routes with HOS breaks and resets
+"""
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    AVERAGE_SPEED_MPH,
+    MAX_DRIVING_HOURS_PER_DAY,
+    HOS_DUTY_WINDOW_HOURS,
+    HOS_BREAK_AFTER_DRIVING_HOURS,
+    HOS_BREAK_HOURS,
+    HOS_RESET_HOURS,
+    STOP_SERVICE_HOURS
+)
+
+_EPS = 1e-9
+
+
+def simulate_hos(leg_hours, dwell_hours=STOP_SERVICE_HOURS, earliest_arrival=None):
+    """
+    Walk many routes at once, inserting HOS breaks and resets
+
+    The driver departs at hour 0 fresh. Driving stops for a 30-minute break
+    after HOS_BREAK_AFTER_DRIVING_HOURS of driving, and for a 10-hour reset
+    once MAX_DRIVING_HOURS_PER_DAY of driving or HOS_DUTY_WINDOW_HOURS on
+    duty is used up. Time spent at a stop (waiting plus unloading) counts as
+    a break when it lasts at least 30 minutes and as a reset when it lasts
+    at least 10 hours.
+
+    Routes are rows; the loop runs over leg positions (at most a load's stop
+    count) and over rest periods within a leg, each step vectorized across
+    all routes.
+
+    Args:
+        leg_hours: (routes x legs) driving hours, NaN where a route has no such leg
+        dwell_hours: Unloading hours per stop (scalar or routes x legs)
+        earliest_arrival: Optional (routes x legs) hours from departure before
+                          which a stop cannot be served (NaN = no window)
+
+    Returns:
+        Dictionary of arrays: 'arrival', 'departure', 'wait' (routes x legs,
+        hours from departure, NaN where no leg) and 'drive_hours', 'breaks',
+        'resets' per route
+    """
+    leg_hours = np.atleast_2d(np.asarray(leg_hours, dtype=np.float64))
+    n_routes, n_legs = leg_hours.shape
+    dwell = np.broadcast_to(np.asarray(dwell_hours, dtype=np.float64), leg_hours.shape)
+    if earliest_arrival is None:
+        earliest_arrival = np.full(leg_hours.shape, np.nan)
+    earliest_arrival = np.asarray(earliest_arrival, dtype=np.float64)
+
+    clock = np.zeros(n_routes)
+    driven_since_break = np.zeros(n_routes)
+    driven_since_reset = np.zeros(n_routes)
+    duty_started = np.zeros(n_routes)
+    breaks = np.zeros(n_routes, dtype=np.int64)
+    resets = np.zeros(n_routes, dtype=np.int64)
+    arrival = np.full(leg_hours.shape, np.nan)
+    departure = np.full(leg_hours.shape, np.nan)
+    wait = np.full(leg_hours.shape, np.nan)
+
+    for j in range(n_legs):
+        valid = ~np.isnan(leg_hours[:, j])
+        remaining = np.where(valid, leg_hours[:, j], 0.0)
+
+        while True:
+            driving = remaining > _EPS
+            if not driving.any():
+                break
+            need_reset = driving & ((driven_since_reset >= MAX_DRIVING_HOURS_PER_DAY - _EPS) |
+                                    (clock - duty_started >= HOS_DUTY_WINDOW_HOURS - _EPS))
+            clock[need_reset] += HOS_RESET_HOURS
+            duty_started[need_reset] = clock[need_reset]
+            driven_since_reset[need_reset] = 0
+            driven_since_break[need_reset] = 0
+            resets += need_reset
+
+            need_break = driving & ~need_reset & (driven_since_break >= HOS_BREAK_AFTER_DRIVING_HOURS - _EPS)
+            clock[need_break] += HOS_BREAK_HOURS
+            driven_since_break[need_break] = 0
+            breaks += need_break
+
+            chunk = np.minimum.reduce([
+                remaining,
+                MAX_DRIVING_HOURS_PER_DAY - driven_since_reset,
+                HOS_BREAK_AFTER_DRIVING_HOURS - driven_since_break,
+                HOS_DUTY_WINDOW_HOURS - (clock - duty_started)
+            ])
+            chunk = np.where(driving & ~need_reset & ~need_break, np.maximum(chunk, 0), 0)
+            clock += chunk
+            driven_since_reset += chunk
+            driven_since_break += chunk
+            remaining -= chunk
+
+        waited = np.where(valid, np.fmax(earliest_arrival[:, j] - clock, 0), 0)
+        waited = np.nan_to_num(waited)
+        arrival[valid, j] = clock[valid]
+        wait[valid, j] = waited[valid]
+        stopped = np.where(valid, waited + dwell[:, j], 0)
+        clock += stopped
+        departure[valid, j] = clock[valid]
+
+        rested = valid & (stopped >= HOS_RESET_HOURS - _EPS)
+        duty_started[rested] = clock[rested]
+        driven_since_reset[rested] = 0
+        driven_since_break[valid & (stopped >= HOS_BREAK_HOURS - _EPS)] = 0
+
+    return {
+        'arrival': arrival,
+        'departure': departure,
+        'wait': wait,
+        'drive_hours': np.nansum(leg_hours, axis=1),
+        'breaks': breaks,
+        'resets': resets
+    }
+
+
+def to_timestamps(values):
+    """Parse ISO strings / datetimes to naive UTC pandas timestamps (NaT when missing)"""
+    parsed = pd.to_datetime(pd.Series(list(values), dtype=object), errors='coerce', utc=True, format='ISO8601')
+    return parsed.dt.tz_convert(None)
+
+
+def _hours_matrix(routes, field, origin_times, n_legs):
+    """(routes x legs) hours between each stop's timestamp field and its route's origin time"""
+    flat = [stop.get(field) for route in routes for stop in route['stops']]
+    hours = np.full((len(routes), n_legs), np.nan)
+    if not flat:
+        return hours
+    stamps = to_timestamps(flat)
+    origins = np.repeat(pd.Series(origin_times).to_numpy(), [len(r['stops']) for r in routes])
+    offsets = (stamps.to_numpy() - origins) / np.timedelta64(1, 'h')
+    pos = 0
+    for i, route in enumerate(routes):
+        n = len(route['stops'])
+        hours[i, :n] = offsets[pos:pos + n]
+        pos += n
+    return hours
+
+
+def _leg_matrix(routes, speed_mph):
+    n_legs = max((len(route['stops']) for route in routes), default=0)
+    legs = np.full((len(routes), n_legs), np.nan)
+    for i, route in enumerate(routes):
+        miles = [stop.get('miles') for stop in route['stops']]
+        legs[i, :len(miles)] = [m or 0.0 for m in miles]  # Unknown distances count as zero driving
+    return legs / speed_mph, n_legs
+
+
+def schedule_routes(routes, departure=None, speed_mph=AVERAGE_SPEED_MPH, dwell_hours=STOP_SERVICE_HOURS):
+    """
+    Arrival and departure times for every stop of many routes
+
+    Args:
+        routes: List of {'stops': [{'miles', 'delivery_window_start',
+                'delivery_window_end', 'must_arrive_by_date'}, ...]} in visiting
+                order; 'departure_time' per route overrides the shared departure
+        departure: Shared departure datetime (defaults to now, UTC)
+        speed_mph: Average driving speed
+        dwell_hours: Unloading hours per stop
+
+    Returns:
+        List (one per route) of {'stops': [...], 'summary': {...}}; each stop has
+        arrival/departure times, hours from departure, wait and on_time
+    """
+    if not routes:
+        return []
+    departure = departure or datetime.utcnow().replace(second=0, microsecond=0)
+    starts = to_timestamps([route.get('departure_time') or departure for route in routes])
+    starts = starts.fillna(pd.Timestamp(departure))
+
+    leg_hours, n_legs = _leg_matrix(routes, speed_mph)
+    opens = _hours_matrix(routes, 'delivery_window_start', starts, n_legs)
+    window_ends = _hours_matrix(routes, 'delivery_window_end', starts, n_legs)
+    must_arrive = _hours_matrix(routes, 'must_arrive_by_date', starts, n_legs)
+    deadlines = np.fmin(window_ends, must_arrive)
+
+    sim = simulate_hos(leg_hours, dwell_hours=dwell_hours, earliest_arrival=opens)
+    late_hours = np.where(np.isnan(deadlines), 0.0, np.fmax(sim['arrival'] - deadlines, 0))
+
+    schedules = []
+    for i, route in enumerate(routes):
+        start = starts.iloc[i].to_pydatetime()
+        stops = []
+        for j, stop in enumerate(route['stops']):
+            late = float(late_hours[i, j])
+            stops.append({
+                'arrival_time': (start + timedelta(hours=float(sim['arrival'][i, j]))).isoformat(timespec='minutes'),
+                'departure_time': (start + timedelta(hours=float(sim['departure'][i, j]))).isoformat(timespec='minutes'),
+                'hours_from_departure': round(float(sim['arrival'][i, j]), 2),
+                'wait_hours': round(float(sim['wait'][i, j]), 2),
+                'on_time': late <= _EPS if not np.isnan(deadlines[i, j]) else None,
+                'late_hours': round(late, 2)
+            })
+        n = len(stops)
+        transit = float(sim['departure'][i, n - 1]) if n else 0.0
+        schedules.append({
+            'stops': stops,
+            'summary': {
+                'departure_time': start.isoformat(timespec='minutes'),
+                'completion_time': (start + timedelta(hours=transit)).isoformat(timespec='minutes'),
+                'total_drive_time_hours': round(float(sim['drive_hours'][i]), 2),
+                'total_transit_hours': round(transit, 2),
+                'total_days': int(np.ceil(transit / 24)) if transit else 0,
+                'rest_breaks': int(sim['breaks'][i]),
+                'overnight_resets': int(sim['resets'][i]),
+                'late_stops': sum(1 for stop in stops if stop['on_time'] is False)
+            }
+        })
+    return schedules
+
+
+def latest_departures(routes, speed_mph=AVERAGE_SPEED_MPH, dwell_hours=STOP_SERVICE_HOURS):
+    """
+    Latest departure that still meets every stop's deadline
+
+    HOS transit time does not depend on the departure time, so each route is
+    simulated once from hour 0 and the binding stop is the one with the least
+    slack between its deadline and its arrival offset.
+
+    Args:
+        routes: Same format as schedule_routes
+
+    Returns:
+        List of naive UTC datetimes (None for routes without deadlines)
+    """
+    if not routes:
+        return []
+    epoch = pd.Timestamp('2000-01-01')
+    leg_hours, n_legs = _leg_matrix(routes, speed_mph)
+    epochs = pd.Series([epoch] * len(routes))
+    deadlines = np.fmin(_hours_matrix(routes, 'delivery_window_end', epochs, n_legs),
+                        _hours_matrix(routes, 'must_arrive_by_date', epochs, n_legs))
+
+    arrival = simulate_hos(leg_hours, dwell_hours=dwell_hours)['arrival']
+    slack = deadlines - arrival
+    has_deadline = ~np.isnan(slack).all(axis=1)
+    latest = np.full(len(routes), np.nan)
+    latest[has_deadline] = np.nanmin(slack[has_deadline], axis=1)
+    return [(epoch + pd.Timedelta(hours=float(h))).round('s').to_pydatetime() if not np.isnan(h) else None
+            for h in latest]
+
+
+def load_route(load, sequencer):
+    """
+    Route stops for a planned load: orders grouped by destination in stop order
+
+    Each stop takes the earliest window start and deadline of its orders.
+    """
+    stops = []
+    by_location = {}
+    for order in sorted(load.get('orders', []), key=lambda o: o.get('stop_sequence') or 0):
+        location = order.get('destination')
+        if location not in by_location:
+            by_location[location] = {'location': location, 'delivery_window_start': None,
+                                     'delivery_window_end': None, 'must_arrive_by_date': None}
+            stops.append(by_location[location])
+        stop = by_location[location]
+        for field in ('delivery_window_start', 'delivery_window_end', 'must_arrive_by_date'):
+            value = order.get(field)
+            if value and (stop[field] is None or str(value) < str(stop[field])):
+                stop[field] = value
+
+    for stop, miles in zip(stops, sequencer.leg_miles(load.get('origin'), [s['location'] for s in stops])):
+        stop['miles'] = miles
+    return {'stops': stops}
@@ -0,0 +1,198 @@
+"""
+Job Queue
+In-process background jobs for long-running endpoints, with progress reporting
+"""
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import JOB_WORKERS, JOB_RETENTION_SECONDS
+
+
+class JobAlreadyRunningError(Exception):
+    """Raised when an exclusive job is submitted while one of the same type is unfinished"""
+
+    def __init__(self, job):
+        super().__init__(f"{job.job_type} job {job.id} is already {job.status}")
+        self.job = job
+
+
+class Job:
+    """State of one submitted job"""
+
+    def __init__(self, job_type, params):
+        self.id = uuid.uuid4().hex
+        self.job_type = job_type
+        self.params = params
+        self.status = 'queued'  # queued | running | succeeded | failed
+        self.progress = {'stage': 'queued', 'current': None, 'total': None, 'message': None}
+        self.result = None
+        self.http_status = None
+        self.error = None
+        self.created_at = datetime.utcnow().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.finished_monotonic = None
+        self.events = []  # Progress history, replayed to stream subscribers
+        self._changed = threading.Condition()
+
+    def record_progress(self, stage, current=None, total=None, message=None, finish=False):
+        """Update progress and append a numbered event for subscribers"""
+        with self._changed:
+            if finish:
+                # Set together with the final event so subscribers never see one without the other
+                self.finished_at = datetime.utcnow().isoformat()
+            self.progress = {'stage': stage, 'current': current, 'total': total, 'message': message}
+            self.events.append(dict(self.progress, seq=len(self.events) + 1, timestamp=datetime.utcnow().isoformat()))
+            self._changed.notify_all()
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns the finished flag"""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.finished, timeout=timeout)
+
+    def wait_for_events(self, after_seq, timeout):
+        """
+        Block until there are events newer than after_seq or the job finishes
+
+        Returns:
+            Tuple of (new events, finished flag)
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > after_seq or self.finished, timeout=timeout)
+            return self.events[after_seq:], self.finished
+
+    def to_dict(self, include_result=True):
+        data = {
+            'job_id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'progress': dict(self.progress),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error
+        }
+        if include_result:
+            data['result'] = self.result
+            data['http_status'] = self.http_status
+        return data
+
+
+class JobQueue:
+    """
+    Runs operations on a small worker pool and tracks their progress
+
+    An operation is any callable taking its parameters plus a progress
+    callback ``progress(stage, current=None, total=None, message=None)`` and
+    returning ``(payload, http_status)``. Finished jobs are kept for
+    retention_seconds so clients can poll for the result.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, retention_seconds=JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tms-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job_type, operation, params, exclusive=False):
+        """
+        Queue an operation
+
+        Args:
+            job_type: Short name shown to clients (e.g. 'optimize_loads')
+            operation: Callable(params, progress) -> (payload, http_status)
+            params: Request parameters passed to the operation
+            exclusive: Refuse the job while another of the same type is unfinished
+
+        Returns:
+            The queued Job
+
+        Raises:
+            JobAlreadyRunningError: exclusive and a job of this type is queued or running
+        """
+        job = Job(job_type, params)
+        with self._lock:
+            self._purge_expired()
+            if exclusive:
+                active = self._active(job_type)
+                if active is not None:
+                    print(f"[JOBS] Refused {job_type} job: {active.id} is still {active.status}")
+                    raise JobAlreadyRunningError(active)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, operation)
+        print(f"[JOBS] Queued {job_type} job {job.id}")
+        return job
+
+    def get(self, job_id):
+        """Return the Job, or None if unknown or expired"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        """All retained jobs, newest first"""
+        with self._lock:
+            self._purge_expired()
+            return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def _run(self, job, operation):
+        job.status = 'running'
+        job.started_at = datetime.utcnow().isoformat()
+
+        job.record_progress('running')
+        try:
+            payload, http_status = operation(job.params, job.record_progress)
+            job.result = payload
+            job.http_status = http_status
+            job.status = 'succeeded' if http_status < 400 else 'failed'
+            if http_status >= 400:
+                job.error = (payload or {}).get('error')
+        except Exception as e:
+            traceback.print_exc()
+            job.status = 'failed'
+            job.error = str(e)
+            job.http_status = 500
+        finally:
+            # Keep the last counts so clients see where the job ended
+            last = job.progress
+            job.finished_monotonic = time.monotonic()
+            job.record_progress('done' if job.status == 'succeeded' else 'failed', last.get('current'),
+                                last.get('total'), job.error or last.get('message'), finish=True)
+            print(f"[JOBS] {job.job_type} job {job.id} {job.status}")
+
+    def _active(self, job_type):
+        for job in self._jobs.values():
+            if job.job_type == job_type and not job.finished:
+                return job
+        return None
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_monotonic is not None and now - job.finished_monotonic > self.retention_seconds]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide JobQueue"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    return _job_queue
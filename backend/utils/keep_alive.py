@@ -19,7 +19,7 @@ Strategy:
 
 import time
 from datetime import datetime
-from database.supabase_client import SupabaseClient
+from database.supabase_client import get_supabase_client
 
 class SupabaseKeepAlive:
     """
@@ -46,8 +46,8 @@ class SupabaseKeepAlive:
         try:
             start_time = time.time()
             
-            # Create client connection
-            client = SupabaseClient()
+            # Reuse the shared client connection
+            client = get_supabase_client()
             
             # Execute minimal query (just to register activity)
             response = client.client.table('facilities').select('id').limit(1).execute()
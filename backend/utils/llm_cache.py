@@ -0,0 +1,132 @@
+"""
+LLM Response Cache
+Content-addressed cache for Gemini responses: in-memory LRU with an optional SQLite store
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS, LLM_CACHE_SQLITE_PATH
+
+
+class LLMResponseCache:
+    """
+    Caches response text keyed on (model, prompt hash, temperature)
+
+    Entries expire after ttl_seconds. The in-memory store evicts the least
+    recently used entry once max_entries is reached; the optional SQLite store
+    survives restarts and is shared by every worker on the host.
+    """
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                 sqlite_path=LLM_CACHE_SQLITE_PATH):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_path = sqlite_path or None
+        self._entries = OrderedDict()  # key -> (stored_at, text)
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.sqlite_path:
+            self._db = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, stored_at REAL, response TEXT)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model, prompt, temperature):
+        """Content address for one request"""
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return hashlib.sha256(f"{model}|{float(temperature)}|{prompt_hash}".encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached response text, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT stored_at, response FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[0] < self.ttl_seconds:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[1]
+
+            self.misses += 1
+            return None
+
+    def set(self, key, response):
+        """Store response text (None is never cached)"""
+        if response is None:
+            return
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, stored_at, response) VALUES (?, ?, ?)",
+                    (key, stored_at, response)
+                )
+                self._db.commit()
+
+    def _remember(self, key, stored_at, response):
+        self._entries[key] = (stored_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry (memory and disk) and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self):
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'sqlite_path': self.sqlite_path
+            }
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Return the process-wide LLMResponseCache"""
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache()
+    return _llm_cache
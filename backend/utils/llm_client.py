@@ -0,0 +1,171 @@
+"""
+LLM Client
+Single Gemini invocation path with enforced deadlines, jittered retries and a circuit breaker
+"""
+import random
+import threading
+import time
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+    LLM_BREAKER_FAILURE_THRESHOLD,
+    LLM_BREAKER_RESET_SECONDS
+)
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    RETRYABLE_ERRORS = (
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.TooManyRequests,
+        google_exceptions.InternalServerError,
+        google_exceptions.GatewayTimeout,
+        TimeoutError,
+        ConnectionError
+    )
+except ImportError:
+    RETRYABLE_ERRORS = (TimeoutError, ConnectionError)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the model while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated provider failures
+
+    After failure_threshold consecutive failed calls the breaker opens and
+    every call is rejected for reset_seconds. The first call after that is a
+    trial: success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=LLM_BREAKER_FAILURE_THRESHOLD, reset_seconds=LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.rejected_calls = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """Return True if a call may go to the provider"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            self.rejected_calls += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.trial_in_flight or self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def release_trial(self):
+        """End a call that says nothing about provider health (e.g. a rejected request)"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'rejected_calls': self.rejected_calls,
+            'failure_threshold': self.failure_threshold,
+            'reset_seconds': self.reset_seconds
+        }
+
+
+_breaker = CircuitBreaker()
+
+
+def get_circuit_breaker():
+    """Return the process-wide Gemini circuit breaker"""
+    return _breaker
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for retry number attempt (0-based)"""
+    return random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def generate_text(model, prompt, timeout, generation_config=None, max_retries=LLM_MAX_RETRIES, breaker=None):
+    """
+    Call model.generate_content within a total deadline
+
+    The timeout is the budget for the whole call including retries: each
+    attempt is given the remaining time as its request deadline, and no retry
+    starts unless its backoff fits in what is left. Only transient errors
+    (timeouts, 429, 5xx) are retried, and only they count against the
+    circuit breaker.
+
+    Args:
+        model: google.generativeai GenerativeModel
+        prompt: Prompt text
+        timeout: Total seconds allowed for the call
+        generation_config: Optional GenerationConfig
+        max_retries: Retries after the first attempt
+        breaker: CircuitBreaker (defaults to the shared one)
+
+    Returns:
+        Response text
+
+    Raises:
+        CircuitOpenError: The breaker is open - use the deterministic fallback
+        Exception: The last provider error once retries or time run out
+    """
+    breaker = breaker or _breaker
+    if not breaker.allow():
+        raise CircuitOpenError("Gemini circuit breaker is open")
+
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining <= 0:
+                raise TimeoutError(f"Gemini call exceeded {timeout}s deadline")
+            kwargs = {'request_options': {'timeout': remaining}}
+            if generation_config is not None:
+                kwargs['generation_config'] = generation_config
+            text = model.generate_content(prompt, **kwargs).text
+            breaker.record_success()
+            return text
+        except Exception as e:
+            if not isinstance(e, RETRYABLE_ERRORS):
+                # Bad request, blocked response (.text raises ValueError), ...: the provider is up
+                breaker.release_trial()
+                raise
+            delay = backoff_delay(attempt)
+            if attempt >= max_retries or time.monotonic() + delay >= deadline:
+                breaker.record_failure()
+                raise
+            print(f"[LLM] Transient Gemini error ({type(e).__name__}), retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
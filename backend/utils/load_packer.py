@@ -0,0 +1,340 @@
+"""
+Deterministic Load Packer
+Consolidates orders into truck loads with 2-D (weight + volume) bin packing
+"""
+import multiprocessing
+import numpy as np
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    MAX_TRUCK_WEIGHT_LBS,
+    MAX_TRUCK_VOLUME_CUFT,
+    LOAD_PACKING_STRATEGY,
+    MAX_STOPS_PER_LOAD,
+    LOAD_SECTOR_DEGREES,
+    LOAD_OPTIMIZER_WORKERS,
+    LOAD_OPTIMIZER_PARALLEL_MIN_ORDERS
+)
+from utils.stop_sequencer import StopSequencer
+
+PACKING_STRATEGIES = ("best_fit", "first_fit")
+
+
+def pack_bins(weights, volumes, max_weight=MAX_TRUCK_WEIGHT_LBS,
+              max_volume=MAX_TRUCK_VOLUME_CUFT, strategy=LOAD_PACKING_STRATEGY,
+              max_items=MAX_STOPS_PER_LOAD, open_bins=None):
+    """
+    Assign items to trucks using first-fit-decreasing or best-fit-decreasing
+
+    Items are sorted by their dominant capacity dimension (largest first), then
+    each item goes into an already-open truck that can hold it. Residual capacity
+    of all open trucks is kept in NumPy arrays so each placement is one
+    vectorized scan instead of a Python loop over trucks.
+
+    Args:
+        weights: Sequence of item weights (lbs)
+        volumes: Sequence of item volumes (cu.ft)
+        max_weight: Truck weight capacity
+        max_volume: Truck volume capacity
+        strategy: 'best_fit' (tightest remaining space) or 'first_fit' (first truck that fits)
+        max_items: Maximum items (stops) per truck
+        open_bins: Optional (weight, volume, items) already loaded on existing
+                   trucks; these are bins 0..len(open_bins)-1 and are filled
+                   before any new truck is opened
+
+    Returns:
+        Tuple of (bin index per item in input order, number of bins)
+    """
+    if strategy not in PACKING_STRATEGIES:
+        raise ValueError(f"Unknown packing strategy '{strategy}'. Use one of: {', '.join(PACKING_STRATEGIES)}")
+
+    weights = np.asarray(weights, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+    open_bins = list(open_bins or [])
+    n = len(weights)
+    assignment = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return assignment, len(open_bins)
+
+    # Decreasing order of the binding dimension; stable sort keeps input order on ties
+    size = np.maximum(weights / max_weight, volumes / max_volume)
+    sort_order = np.argsort(-size, kind="stable")
+
+    # At most one new truck per item, so preallocate and track the open prefix
+    residual_weight = np.empty(n + len(open_bins), dtype=np.float64)
+    residual_volume = np.empty(n + len(open_bins), dtype=np.float64)
+    residual_items = np.empty(n + len(open_bins), dtype=np.int64)
+    for i, (used_weight, used_volume, used_items) in enumerate(open_bins):
+        residual_weight[i] = max_weight - used_weight
+        residual_volume[i] = max_volume - used_volume
+        residual_items[i] = max_items - used_items
+    n_bins = len(open_bins)
+
+    for idx in sort_order:
+        weight = weights[idx]
+        volume = volumes[idx]
+        target = -1
+
+        if n_bins:
+            open_weight = residual_weight[:n_bins]
+            open_volume = residual_volume[:n_bins]
+            fits = (open_weight >= weight) & (open_volume >= volume) & (residual_items[:n_bins] > 0)
+
+            if strategy == "best_fit":
+                # Normalized slack left after placement - smaller means a tighter fit
+                slack = np.where(fits, (open_weight - weight) / max_weight + (open_volume - volume) / max_volume, np.inf)
+                best = int(slack.argmin())
+                if fits[best]:
+                    target = best
+            else:
+                candidates = np.flatnonzero(fits)
+                if candidates.size:
+                    target = int(candidates[0])
+
+        if target < 0:
+            # Open a new truck (oversized items end up alone with negative residual)
+            target = n_bins
+            residual_weight[target] = max_weight
+            residual_volume[target] = max_volume
+            residual_items[target] = max_items
+            n_bins += 1
+
+        residual_weight[target] -= weight
+        residual_volume[target] -= volume
+        residual_items[target] -= 1
+        assignment[idx] = target
+
+    return assignment, n_bins
+
+
+def split_shards(orders_by_origin, sequencer=None):
+    """
+    Split orders into independent packing shards
+
+    Loads never mix origins, and with a sequencer they never mix bearing
+    sectors either, so each (origin, sector) group can be packed on its own.
+
+    Args:
+        orders_by_origin: Dictionary of origin -> list of orders
+        sequencer: Optional StopSequencer used for sector partitioning
+
+    Returns:
+        List of (origin, orders) tuples in deterministic order
+    """
+    shards = []
+    for origin, origin_orders in orders_by_origin.items():
+        if sequencer:
+            destinations = [order.get('destination') for order in origin_orders]
+            # Sweep partitioning: only orders heading the same direction share a truck
+            sectors = sequencer.sectors(origin, destinations, LOAD_SECTOR_DEGREES)
+        else:
+            sectors = np.zeros(len(origin_orders), dtype=np.int64)
+
+        for sector in np.unique(sectors):
+            shards.append((origin, [origin_orders[i] for i in np.flatnonzero(sectors == sector)]))
+    return shards
+
+
+def pack_shard(origin, orders, strategy=LOAD_PACKING_STRATEGY, sequencer=None):
+    """
+    Pack one shard of same-origin orders into multi-stop loads
+
+    Args:
+        origin: Origin (pickup) location shared by all orders
+        orders: List of order dictionaries from that origin
+        strategy: Packing strategy passed to pack_bins
+        sequencer: Optional StopSequencer used to order stops geographically
+
+    Returns:
+        List of load dictionaries (without load_id) in deterministic order
+    """
+    weights = [order.get('weight_lbs') or 0 for order in orders]
+    volumes = [order.get('volume_cuft') or 0 for order in orders]
+    assignment, n_bins = pack_bins(weights, volumes, strategy=strategy)
+
+    members = [[] for _ in range(n_bins)]
+    for order_idx, bin_idx in enumerate(assignment):
+        members[bin_idx].append(orders[order_idx])
+
+    if sequencer:
+        # One distance matrix for every stop this shard serves
+        sequencer.prepare(origin, [order.get('destination') for order in orders])
+
+    return [build_load(origin, bin_orders, sequencer) for bin_orders in members]
+
+
+def build_load(origin, bin_orders, sequencer=None):
+    """
+    Build one load dictionary (without load_id) from the orders on a truck
+
+    Args:
+        origin: Origin (pickup) location
+        bin_orders: Orders assigned to the truck
+        sequencer: Optional StopSequencer used to order stops geographically
+
+    Returns:
+        Load dictionary with stop-sequenced orders and totals
+    """
+    bin_orders = list(bin_orders)
+    route = None
+    if sequencer:
+        route = sequencer.sequence(origin, [o.get('destination') for o in bin_orders])
+        rank = {location: i for i, location in enumerate(route['stops'])}
+        bin_orders.sort(key=lambda o: rank[o.get('destination')])
+    else:
+        bin_orders.sort(key=lambda o: o.get('destination') or '')
+    load_orders = []
+    for stop_sequence, order in enumerate(bin_orders, 1):
+        load_orders.append({
+            'id': order.get('id'),
+            'order_number': order.get('order_number'),
+            'customer': order.get('customer'),
+            'origin': order.get('origin'),
+            'destination': order.get('destination'),
+            'weight_lbs': order.get('weight_lbs') or 0,
+            'volume_cuft': order.get('volume_cuft') or 0,
+            'priority': order.get('priority', 'Normal'),
+            'must_arrive_by_date': order.get('must_arrive_by_date'),
+            'delivery_window_start': order.get('delivery_window_start'),
+            'delivery_window_end': order.get('delivery_window_end'),
+            'stop_sequence': stop_sequence
+        })
+    load = {
+        "truck_type": "DRY_VAN",
+        "origin": origin,
+        "orders": load_orders,
+        "total_weight_lbs": sum(o['weight_lbs'] for o in load_orders),
+        "total_volume_cuft": sum(o['volume_cuft'] for o in load_orders)
+    }
+    if route:
+        load['total_miles'] = route['total_miles']
+    return load
+
+
+def pack_into_open_loads(open_loads, orders_by_origin, strategy=LOAD_PACKING_STRATEGY, sequencer=None):
+    """
+    Fill residual capacity of open loads with new orders, then open new loads
+
+    Open loads only take orders from their own origin and bearing sector (the
+    sector of their first stop), so incremental plans stay as compact as full
+    re-plans.
+
+    Args:
+        open_loads: Existing loads, each with 'id', 'origin' and its current 'orders'
+        orders_by_origin: Dictionary of origin -> list of new orders
+        strategy: Packing strategy passed to pack_bins
+        sequencer: Optional StopSequencer used for sectors and stop order
+
+    Returns:
+        Tuple of (extended loads, new loads). Extended loads are rebuilt with
+        all their stops re-sequenced and carry the existing 'id',
+        'load_number' and 'added_order_ids'; new loads have no load_id yet.
+    """
+    open_by_shard = {}
+    for load in open_loads:
+        first_stop = [load['orders'][0].get('destination')] if load['orders'] else []
+        sector = int(sequencer.sectors(load['origin'], first_stop, LOAD_SECTOR_DEGREES)[0]) if sequencer and first_stop else 0
+        open_by_shard.setdefault((load['origin'], sector), []).append(load)
+
+    extended = []
+    new_loads = []
+    for origin, shard_orders in split_shards(orders_by_origin, sequencer):
+        if sequencer:
+            sector = int(sequencer.sectors(origin, [shard_orders[0].get('destination')], LOAD_SECTOR_DEGREES)[0])
+            sequencer.prepare(origin, [order.get('destination') for order in shard_orders])
+        else:
+            sector = 0
+        candidates = open_by_shard.get((origin, sector), [])
+        open_bins = [(sum(o.get('weight_lbs') or 0 for o in load['orders']),
+                      sum(o.get('volume_cuft') or 0 for o in load['orders']),
+                      len(load['orders'])) for load in candidates]
+
+        weights = [order.get('weight_lbs') or 0 for order in shard_orders]
+        volumes = [order.get('volume_cuft') or 0 for order in shard_orders]
+        assignment, n_bins = pack_bins(weights, volumes, strategy=strategy, open_bins=open_bins)
+
+        members = [[] for _ in range(n_bins)]
+        for order_idx, bin_idx in enumerate(assignment):
+            members[bin_idx].append(shard_orders[order_idx])
+
+        for load, added in zip(candidates, members[:len(candidates)]):
+            if not added:
+                continue
+            rebuilt = build_load(origin, load['orders'] + added, sequencer)
+            rebuilt.update({
+                'id': load['id'],
+                'load_id': load['load_number'],
+                'load_number': load['load_number'],
+                'added_order_ids': [order.get('id') for order in added]
+            })
+            extended.append(rebuilt)
+            # Later shards never share this origin+sector, but keep residuals honest
+            load['orders'] = rebuilt['orders']
+        new_loads.extend(build_load(origin, bin_orders, sequencer) for bin_orders in members[len(candidates):])
+
+    return extended, new_loads
+
+
+def _pack_shard_worker(args):
+    """Process pool entry point - rebuilds the sequencer from plain coordinates"""
+    origin, orders, strategy, coordinates = args
+    sequencer = StopSequencer.from_coordinates(coordinates) if coordinates is not None else None
+    return pack_shard(origin, orders, strategy=strategy, sequencer=sequencer)
+
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers):
+    """
+    Lazily create (or resize) the process pool shared by all requests
+
+    Workers are spawned, not forked: forking a multithreaded server process
+    can copy locks held by other threads and deadlock the child.
+    """
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _executor_workers = workers
+        return _executor
+
+
+def pack_orders(orders_by_origin, strategy=LOAD_PACKING_STRATEGY, sequencer=None,
+                workers=LOAD_OPTIMIZER_WORKERS):
+    """
+    Pack orders for every origin, optionally fanning shards out to a process pool
+
+    Results are merged in shard order, so load numbering is identical whether
+    the shards ran sequentially or in parallel.
+
+    Args:
+        orders_by_origin: Dictionary of origin -> list of orders
+        strategy: Packing strategy passed to pack_bins
+        sequencer: Optional StopSequencer used for sectors and stop order
+        workers: Worker processes; 1 (or a small plan) runs in-process
+
+    Returns:
+        List of load dictionaries (without load_id)
+    """
+    shards = split_shards(orders_by_origin, sequencer)
+    total_orders = sum(len(shard_orders) for _, shard_orders in shards)
+
+    if workers > 1 and len(shards) > 1 and total_orders >= LOAD_OPTIMIZER_PARALLEL_MIN_ORDERS:
+        print(f"[LOAD PACKER] Packing {total_orders} orders in {len(shards)} shards across {workers} processes")
+        coordinates = sequencer.coordinates if sequencer else None
+        tasks = [(origin, shard_orders, strategy, coordinates) for origin, shard_orders in shards]
+        results = _get_executor(workers).map(_pack_shard_worker, tasks)
+    else:
+        results = (pack_shard(origin, shard_orders, strategy=strategy, sequencer=sequencer)
+                   for origin, shard_orders in shards)
+
+    return [load for shard_loads in results for load in shard_loads]
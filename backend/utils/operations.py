@@ -0,0 +1,636 @@
+"""
+TMS Operations
+Long-running endpoint bodies as plain functions so they can run inline or as background jobs
+
+Every operation takes the request parameters and an optional progress
+callback ``progress(stage, current=None, total=None, message=None)`` and
+returns ``(payload, http_status)``.
+"""
+import random
+from datetime import datetime, timedelta
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import SIMULATION_DEFAULT_LOADS, SIMULATION_ORDERS_PER_LOAD, SIMULATION_MAX_LOADS, LOAD_NUMBER_RETRIES
+from database.supabase_client import get_supabase_client, is_unique_violation, OrdersAlreadyAssignedError
+
+
+def _no_progress(stage, current=None, total=None, message=None):
+    pass
+
+
+def generate_orders(params, progress=None):
+    """Generate synthetic orders (count, or a full month with monthly=True; optional seed) and insert them"""
+    from utils.erp_data_generator import ERPDataGenerator
+    from database.postgres_bulk import get_bulk_client
+    progress = progress or _no_progress
+
+    count = params.get('count', 10)
+    monthly = params.get('monthly', False)
+
+    gen = ERPDataGenerator(seed=params.get('seed'))
+    client = get_supabase_client()
+
+    # Get facilities for ID lookup
+    facilities = client.get_all_facilities()
+    facility_map = {f['facility_code']: f['id'] for f in facilities}
+
+    progress('generating', message='Generating orders')
+    if monthly:
+        # Generate a full month of orders (~4,000)
+        orders = gen.generate_monthly_orders()
+    else:
+        orders = gen.generate_orders(count)
+
+    # Add facility IDs to orders based on facility_code
+    for order in orders:
+        # Match origin facility code to facility ID
+        origin_code = order.get('origin_facility_code')
+        if origin_code and origin_code in facility_map:
+            order['origin_facility_id'] = facility_map[origin_code]
+
+        # Destination facility ID will be null for now (customer sites)
+        order['destination_facility_id'] = None
+
+        # Remove the temporary facility_code field
+        order.pop('origin_facility_code', None)
+
+    # Debug: Print first order structure
+    print(f"[ORDER GEN] Attempting to insert {len(orders)} orders")
+    if orders:
+        print(f"[ORDER GEN] Sample order keys: {list(orders[0].keys())}")
+
+    # Insert orders
+    progress('inserting', 0, len(orders), 'Inserting orders')
+    if monthly:
+        bulk = get_bulk_client()
+        if bulk:
+            # One COPY through the direct Postgres connection
+            stats = bulk.copy_orders(orders)
+            progress('inserting', len(orders), len(orders), f"Copied {len(orders)} orders")
+        else:
+            stats = client.create_orders_batch_chunked(
+                orders,
+                on_chunk=lambda inserted, total: progress('inserting', inserted, total, f"Inserted {inserted}/{total} orders")
+            )
+        # Rows whose order_number already existed (e.g. a re-run with the same seed) are skipped
+        written, skipped = stats['written'], stats['already_present']
+        print(f"[ORDER GEN] Inserted {written} orders, skipped {skipped} already present (monthly batch)")
+        if stats['failed_rows']:
+            return {"error": f"{stats['failed_rows']} of {len(orders)} orders failed to insert",
+                    "count": written, "skipped": skipped, "ingest": stats}, 500
+        if not written and skipped:
+            return {"error": f"All {skipped} orders already exist - nothing was generated",
+                    "count": 0, "skipped": skipped, "ingest": stats}, 409
+        message = f"Generated {written} orders" + (f" ({skipped} already present, skipped)" if skipped else "")
+        return {"message": message, "count": written, "skipped": skipped, "ingest": stats}, 201
+
+    result = client.create_orders_batch(orders)
+    print(f"[ORDER GEN] Inserted {len(result)} orders")
+    if not result:
+        return {"error": "Failed to insert orders - result is empty", "count": 0}, 500
+    return {"message": f"Generated {len(result)} orders", "count": len(result), "orders": result}, 201
+
+
+def _pickup_deadlines(loads, facilities):
+    """Latest pickup per load from HOS transit times to its deadlines (one vectorized pass)"""
+    from utils.hos_eta import latest_departures, load_route
+    from utils.stop_sequencer import StopSequencer
+    sequencer = StopSequencer(facilities)
+    return [pickup.isoformat() if pickup else None
+            for pickup in latest_departures([load_route(load, sequencer) for load in loads])]
+
+
+def _number_loads(loads, first_number):
+    """Number new loads LOAD_### consecutively from first_number"""
+    for number, load in enumerate(loads, first_number):
+        load['load_id'] = f"LOAD_{str(number).zfill(3)}"
+
+
+def _load_row(load, current_time, must_pick_up_date=None):
+    """Database row for a packed load (without id or the links)"""
+    # Handle both AI format (total_weight, total_volume) and fallback format (total_weight_lbs, total_volume_cuft)
+    total_weight = load.get('total_weight_lbs') or load.get('total_weight', 0)
+    total_volume = load.get('total_volume_cuft') or load.get('total_volume', 0)
+    utilization = load.get('utilization_percent') or load.get('utilization', 0)
+
+    # Calculate must_arrive_by_date (earliest deadline from all orders in load)
+    must_arrive_dates = [o.get('must_arrive_by_date') or o.get('delivery_window_end')
+                         for o in load['orders'] if o.get('must_arrive_by_date') or o.get('delivery_window_end')]
+    earliest_deadline = min(must_arrive_dates) if must_arrive_dates else None
+
+    return {
+        'load_number': load['load_id'],
+        'truck_type': 'Dry Van 53ft',
+        'total_weight_lbs': float(total_weight),
+        'total_volume_cuft': float(total_volume),
+        'utilization_percent': float(utilization),
+        'origin': load['orders'][0]['origin'] if load['orders'] else 'Unknown',
+        'status': 'Planning',
+        'load_created_date': current_time,
+        'must_arrive_by_date': earliest_deadline,
+        'must_pick_up_by_date': must_pick_up_date,
+        'assigned_carrier': 'NONE'
+    }
+
+
+def optimize_loads(params, progress=None):
+    """
+    Optimize orders into truck loads and save the plan to the database
+
+    With incremental=true the pending, unplanned orders fill open 'Planning'
+    loads first and only the remainder opens new loads. Existing stops are
+    never moved between loads. Orders are selected by status, so one left
+    unplanned by an earlier run is picked up again; 'since' optionally
+    narrows the run to orders created or updated after that timestamp.
+    """
+    from agents.load_optimizer import LoadOptimizerAgent
+    from utils.facility_index import get_facility_index
+    progress = progress or _no_progress
+
+    order_ids = params.get('order_ids', [])
+    use_ai = params.get('use_ai')  # Optional Gemini post-pass over the packed plan
+    incremental = bool(params.get('incremental'))
+    since = params.get('since')
+
+    # 1. Fetch orders from Supabase (filters applied in the database)
+    progress('fetching_orders', message='Fetching unplanned orders')
+    client = get_supabase_client()
+    if order_ids:
+        orders = client.get_orders(order_ids=order_ids)
+    elif incremental and since:
+        orders = client.get_orders(status='Pending', unplanned=True, since=since)
+    else:
+        # Pending status AND no planned_to_load_date (not yet assigned to a load)
+        orders = client.get_orders(status='Pending', unplanned=True)
+
+    if not orders:
+        return {
+            "loads": [],
+            "summary": {
+                "total_orders": 0,
+                "total_loads": 0,
+                "avg_utilization": 0,
+                "cost_savings_percent": 0,
+                "message": "No unplanned orders available for optimization"
+            }
+        }, 200
+
+    print(f"[LOAD OPTIMIZER] Found {len(orders)} eligible orders (no planned_to_load_date)")
+    progress('orders_fetched', len(orders), len(orders), f"Fetched {len(orders)} orders")
+
+    # 2. Use LoadOptimizerAgent to create load plan
+    optimizer = LoadOptimizerAgent()
+    facilities = get_facility_index().facilities()
+    if incremental:
+        open_loads = client.get_open_loads()
+        load_plan = optimizer.extend_load_plan(orders, open_loads, facilities=facilities)
+        progress('loads_packed', len(load_plan['loads']), len(load_plan['loads']),
+                 f"Added {load_plan['summary']['orders_added_to_open_loads']} orders to "
+                 f"{len(load_plan['extended_loads'])} open loads, opened {len(load_plan['loads'])} new loads")
+    else:
+        open_loads = []
+        load_plan = optimizer.optimize_loads(orders, use_ai=use_ai, facilities=facilities)
+        progress('loads_packed', len(load_plan.get('loads', [])), len(load_plan.get('loads', [])),
+                 f"Packed {len(orders)} orders into {len(load_plan.get('loads', []))} loads")
+
+    print(f"[LOAD OPTIMIZER] Optimizer returned {len(load_plan.get('loads', []))} loads, saving")
+
+    # 3. Build load rows with date tracking, numbered from a block reserved for this run
+    current_time = datetime.utcnow().isoformat()
+    _number_loads(load_plan.get('loads', []), client.reserve_load_numbers(len(load_plan.get('loads', []))))
+    load_rows = []
+    saved_loads = []
+    extended = load_plan.get('extended_loads', [])
+    # must_pick_up_by_date: latest departure that still makes every deadline under HOS rules
+    pickups = _pickup_deadlines(load_plan.get('loads', []) + extended, facilities)
+    pickup_by_load = {id(load): pickup for load, pickup in zip(load_plan.get('loads', []) + extended, pickups)}
+
+    for load in load_plan.get('loads', []):
+        try:
+            load_rows.append(dict(
+                _load_row(load, current_time, pickup_by_load[id(load)]),
+                # 4. load_orders links (also drive the order planned_to_load_date update)
+                orders=[{
+                    'order_id': order['id'],
+                    'sequence_number': order.get('stop_sequence', 1)
+                } for order in load['orders']]
+            ))
+            saved_loads.append(load)
+        except Exception as load_error:
+            print(f"[ERROR] Preparing load {load.get('load_id')}: {str(load_error)}")
+            import traceback
+            traceback.print_exc()
+
+    # 5. Persist loads, links and order assignments (one round trip with the save_load_plan RPC)
+    progress('saving', 0, len(load_rows), f"Saving {len(load_rows)} loads")
+    save_messages = {'loads_saved': 'loads saved', 'orders_linked': 'orders linked', 'orders_updated': 'orders updated'}
+    for attempt in range(LOAD_NUMBER_RETRIES + 1):
+        try:
+            save_result = client.save_load_plan(
+                load_rows, current_time,
+                on_progress=lambda stage, current, total: progress(stage, current, total, f"{current}/{total} {save_messages[stage]}")
+            )
+            break
+        except OrdersAlreadyAssignedError as e:
+            print(f"[LOAD OPTIMIZER] Plan not saved: {str(e)}")
+            return {"error": f"{str(e)} - nothing was saved, run the optimization again"}, 409
+        except Exception as e:
+            # Another run took these load numbers (nothing was written): renumber and save again
+            if attempt == LOAD_NUMBER_RETRIES or not is_unique_violation(e):
+                raise
+            print(f"[LOAD OPTIMIZER] Load numbers already taken, renumbering (retry {attempt + 1}/{LOAD_NUMBER_RETRIES})")
+            _number_loads(saved_loads, client.reserve_load_numbers(len(saved_loads)))
+            for row, load in zip(load_rows, saved_loads):
+                row['load_number'] = load['load_id']
+
+    # 6. Write back open loads that received orders (complete rows, since they are upserted)
+    if extended:
+        open_rows = {load['id']: load for load in open_loads}
+        extended_rows = []
+        links = []
+        added_orders = {}
+        for load in extended:
+            row = {k: v for k, v in open_rows[load['id']].items() if k != 'orders'}
+            planned = _load_row(load, current_time, pickup_by_load[id(load)])
+            for field in ('total_weight_lbs', 'total_volume_cuft', 'utilization_percent',
+                          'must_arrive_by_date', 'must_pick_up_by_date'):
+                row[field] = planned[field]
+            row['updated_at'] = current_time
+            extended_rows.append(row)
+            links.extend({'load_id': load['id'], 'order_id': order['id'], 'sequence_number': order['stop_sequence']}
+                         for order in load['orders'])
+            added_orders.update((order_id, load['load_number']) for order_id in load['added_order_ids'])
+        try:
+            added = client.extend_loads(extended_rows, links, added_orders, current_time)
+        except OrdersAlreadyAssignedError as e:
+            print(f"[LOAD OPTIMIZER] Open loads not extended: {str(e)}")
+            return {"error": f"{str(e)} - {len(save_result['loads'])} new loads were saved, "
+                             f"open loads were not extended"}, 409
+        progress('loads_extended', len(extended_rows), len(extended_rows),
+                 f"{added} orders added to {len(extended_rows)} open loads")
+
+    print(f"[COMPLETE] Save process complete. Saved {len(save_result['loads'])} of {len(load_plan.get('loads', []))} loads "
+          f"({save_result['orders_updated']} orders updated, {save_result['round_trips']} round trips)")
+    return load_plan, 200
+
+
+def plan_routes(params, progress=None):
+    """
+    Route every load of a plan in one call
+
+    Accepts {"loads": [...]} or {"load_plan": {"loads": [...]}} with loads in
+    load plan or route request format.
+    """
+    from agents.route_planner import RoutePlannerAgent
+    from utils.facility_index import get_facility_index
+    progress = progress or _no_progress
+
+    loads = params.get('loads') or (params.get('load_plan') or {}).get('loads') or []
+    if not isinstance(loads, list) or not loads:
+        return {"error": "loads must be a non-empty list"}, 400
+
+    try:
+        facilities = get_facility_index().facilities()
+    except Exception as e:
+        print(f"[ROUTE PLANNER] Facility index unavailable, using built-in network: {e}")
+        facilities = None
+
+    planner = RoutePlannerAgent(facilities=facilities)
+    kwargs = {'use_ai': params.get('use_ai')}
+    if params.get('workers'):
+        kwargs['workers'] = max(1, int(params['workers']))
+    result = planner.plan_routes(
+        loads,
+        on_progress=lambda routed, total: progress('routing', routed, total, f"{routed}/{total} loads routed"),
+        **kwargs
+    )
+    summary = result['summary']
+    print(f"[ROUTE PLANNER] Routed {summary['routed']}/{summary['total_loads']} loads "
+          f"({summary['routed_with_ai']} via AI) in {summary['elapsed_seconds']}s")
+    return result, 200
+
+
+def analyze_costs(params, progress=None):
+    """
+    Cost a load plan, reusing stored analyses for loads that have not changed
+
+    Each load's cost inputs are hashed (utils.cost_engine.load_cost_hash);
+    saved loads whose stored content_hash matches are served from the
+    cost_analysis table, the rest are recomputed and written back in one
+    upsert. Loads not saved in the database are costed but not stored.
+    """
+    from agents.cost_analyzer import CostAnalyzerAgent
+    from utils.cost_engine import cost_load_rows, load_cost_hash, routes_by_load
+    from utils.facility_index import get_facility_index
+    from utils.stop_sequencer import StopSequencer
+    progress = progress or _no_progress
+
+    load_plan = params.get('load_plan') or {}
+    route_plan = params.get('route_plan') or {}
+    loads = load_plan.get('loads') or []
+    routes = routes_by_load(route_plan, loads)
+    load_keys = [load.get('load_id') or load.get('load_number') for load in loads]
+    hashes = [load_cost_hash(load, routes.get(key)) for load, key in zip(loads, load_keys)]
+
+    client = get_supabase_client()
+    progress('loading_stored', message='Reading stored cost analyses')
+    db_ids = client.get_load_ids_by_number(load_keys) if loads else {}
+    stored = {row['load_id']: row for row in client.get_cost_analyses(load_ids=db_ids.values())} if db_ids else {}
+
+    load_rows = [None] * len(loads)
+    stale = []
+    for i, (key, content_hash) in enumerate(zip(load_keys, hashes)):
+        row = stored.get(db_ids.get(key))
+        if row and row.get('content_hash') == content_hash and row.get('analysis_data'):
+            load_rows[i] = dict(row['analysis_data'], load_id=key)
+        else:
+            stale.append(i)
+    progress('loading_stored', len(loads) - len(stale), len(loads), f"{len(loads) - len(stale)} loads unchanged")
+
+    if stale:
+        try:
+            facilities = get_facility_index().facilities()
+        except Exception as e:
+            print(f"[COST ANALYZER] Facility index unavailable, using built-in network: {e}")
+            facilities = None
+        fresh = cost_load_rows({'loads': [loads[i] for i in stale]}, route_plan, sequencer=StopSequencer(facilities))
+        now = datetime.utcnow().isoformat()
+        to_store = []
+        for i, row in zip(stale, fresh):
+            load_rows[i] = row
+            if load_keys[i] in db_ids:
+                to_store.append({
+                    'load_id': db_ids[load_keys[i]],
+                    'base_freight_cost': row['base_freight_cost'],
+                    'fuel_surcharge': row['fuel_surcharge'],
+                    'detention_fees': row['detention_fees'],
+                    'total_cost': row['total_load_cost'],
+                    'cost_per_mile': row['cost_per_mile'],
+                    'cost_per_order': row['cost_per_order'],
+                    'total_miles': row['miles'],
+                    'baseline_cost': row['baseline_cost'],
+                    'analysis_data': row,
+                    'content_hash': hashes[i],
+                    'updated_at': now
+                })
+        # Rows with the same load_id cannot share one upsert statement
+        to_store = list({row['load_id']: row for row in to_store}.values())
+        client.upsert_cost_analyses(to_store)
+        progress('costed', len(stale), len(stale), f"Computed {len(stale)} loads, stored {len(to_store)}")
+
+    analysis = CostAnalyzerAgent().analyze_cost_rows(load_rows, use_ai=params.get('use_ai', True))
+    analysis['cost_analysis']['cache'] = {
+        'loads_reused': len(loads) - len(stale),
+        'loads_computed': len(stale),
+        'loads_not_saved': sum(1 for key in load_keys if key not in db_ids)
+    }
+    print(f"[COST ANALYZER] {len(loads)} loads: {len(loads) - len(stale)} reused, {len(stale)} computed")
+    return analysis, 200
+
+
+def generate_fallback_simulation_plan(available_orders, existing_loads, today_str,
+                                      load_count=SIMULATION_DEFAULT_LOADS, orders_per_load=None):
+    """
+    Fallback simulation plan generator when AI is not available
+    Creates a simple but realistic simulation plan without AI
+
+    Scenarios repeat in the 2 delivered / 3 on-time / 3 at-risk mix for any
+    load_count. Without orders_per_load the available orders are split
+    evenly across the loads (the last load takes the remainder).
+    """
+    today = datetime.strptime(today_str, '%Y-%m-%d').date()
+    tomorrow = today + timedelta(days=1)
+
+    # Get next CT load number
+    ct_loads = [l for l in existing_loads if l.get('load_number', '').startswith('CT-')]
+    next_ct_num = len(ct_loads) + 1
+
+    loads = []
+    per_load = orders_per_load or len(available_orders) // load_count
+
+    scenarios = [
+        ('delivered', 'Delivered', today_str, today_str),
+        ('delivered', 'Delivered', today_str, today_str),
+        ('on-time', 'In Transit', today_str, today_str),
+        ('on-time', 'In Transit', today_str, today_str),
+        ('on-time', 'In Transit', today_str, today_str),
+        ('at-risk', 'In Transit', today_str, str(tomorrow)),
+        ('at-risk', 'In Transit', today_str, str(tomorrow)),
+        ('at-risk', 'In Transit', today_str, str(tomorrow)),
+    ]
+
+    for i in range(load_count):
+        scenario, status, ced, edd = scenarios[i % len(scenarios)]
+        start_idx = i * per_load
+        last = i == load_count - 1 and not orders_per_load
+        end_idx = len(available_orders) if last else start_idx + per_load
+
+        loads.append({
+            'load_number': f'CT-{next_ct_num + i:05d}',
+            'truck_type': random.choice(['DRY_VAN', 'REEFER']),
+            'origin': 'Dallas, TX',
+            'status': status,
+            'estimated_delivery_date': edd,
+            'scenario': scenario,
+            'order_indices': list(range(start_idx, end_idx)),
+            'orders_config': {
+                'status': status,
+                'customer_expected_delivery_date': ced,
+                'delivery_window_start': '08:00:00',
+                'delivery_window_end': '17:00:00'
+            }
+        })
+
+    return {
+        'loads': loads,
+        'summary': {
+            'delivered': sum(1 for l in loads if l['scenario'] == 'delivered'),
+            'on_time': sum(1 for l in loads if l['scenario'] == 'on-time'),
+            'at_risk': sum(1 for l in loads if l['scenario'] == 'at-risk')
+        }
+    }
+
+
+def simulate_today_loads(params, progress=None):
+    """
+    Generate simulated loads for today's delivery using AI agent (for Control Tower testing)
+
+    Optional params: load_count (default SIMULATION_DEFAULT_LOADS, up to
+    SIMULATION_MAX_LOADS) and orders_per_load. Only the default-sized plan
+    is requested from the AI agent; larger scenarios use the fallback plan.
+    The plan is written with set-based inserts/updates, so the number of
+    round trips does not grow with the number of loads.
+    """
+    print("\n" + "="*80)
+    print("[SIMULATE-001] ✓ Route handler called - simulate_today_loads()")
+    print("="*80)
+
+    progress = progress or _no_progress
+
+    try:
+        load_count = int(params.get('load_count') or SIMULATION_DEFAULT_LOADS)
+        orders_per_load = int(params['orders_per_load']) if params.get('orders_per_load') else None
+    except (TypeError, ValueError):
+        return {"error": "load_count and orders_per_load must be integers", "debug_code": "SIMULATE-ERROR-PARAMS"}, 400
+    if not 1 <= load_count <= SIMULATION_MAX_LOADS:
+        return {"error": f"load_count must be between 1 and {SIMULATION_MAX_LOADS}", "debug_code": "SIMULATE-ERROR-PARAMS"}, 400
+    if orders_per_load is not None and orders_per_load < SIMULATION_ORDERS_PER_LOAD:
+        return {"error": f"orders_per_load must be at least {SIMULATION_ORDERS_PER_LOAD}", "debug_code": "SIMULATE-ERROR-PARAMS"}, 400
+
+    try:
+        print("[SIMULATE-002] ✓ Initializing database client...")
+        client = get_supabase_client()
+        print("[SIMULATE-003] ✓ Database client initialized successfully")
+
+        # Try to import AI agent, but fallback to manual logic if unavailable
+        agent = None
+        use_ai = False
+        if load_count != SIMULATION_DEFAULT_LOADS or orders_per_load is not None:
+            print(f"[SIMULATE-003c] ℹ {load_count} loads requested - using fallback simulation logic")
+        else:
+            try:
+                from agents.control_tower_simulator import ControlTowerSimulatorAgent
+                agent = ControlTowerSimulatorAgent()
+                use_ai = True
+                print("[SIMULATE-003a] ✓ AI agent initialized successfully")
+            except Exception as ai_error:
+                print(f"[SIMULATE-003b] ⚠ AI agent unavailable: {str(ai_error)}")
+                print("[SIMULATE-003c] ℹ Will use fallback simulation logic")
+
+        # Get today's date
+        today = datetime.now().date()
+        today_str = str(today)
+        print(f"[SIMULATE-004] ✓ Today's date: {today_str}")
+
+        # Get orders to assign to loads
+        print("[SIMULATE-005] Querying database for available orders...")
+        available_orders = client.get_orders(status=['Pending', 'Assigned'])
+        print("[SIMULATE-006] ✓ Status filter applied in the database")
+        print(f"[SIMULATE-007] ✓ Found {len(available_orders)} available orders (Pending/Assigned)")
+        progress('orders_fetched', len(available_orders), len(available_orders), f"Fetched {len(available_orders)} available orders")
+
+        required = load_count * (orders_per_load or SIMULATION_ORDERS_PER_LOAD)
+        if len(available_orders) < required:
+            error_msg = f"Not enough available orders. Need at least {required}, found {len(available_orders)}"
+            print(f"[SIMULATE-ERROR-008] {error_msg}")
+            return {"error": error_msg, "debug_code": "SIMULATE-ERROR-008"}, 400
+
+        # Get existing loads for numbering
+        print("[SIMULATE-009] Querying existing loads for numbering...")
+        existing_loads = client.get_loads(columns='id,load_number', orders='none')
+        print(f"[SIMULATE-010] ✓ Found {len(existing_loads)} existing loads in database")
+
+        # Generate simulation plan
+        if use_ai:
+            print(f"[SIMULATE-011] Requesting AI-generated simulation plan for {today_str}...")
+            plan = agent.generate_simulation_plan(available_orders, existing_loads, today_str)
+            print(f"[SIMULATE-012] ✓ AI plan received with {len(plan.get('loads', []))} load configurations")
+        else:
+            print(f"[SIMULATE-011] Generating fallback simulation plan for {today_str}...")
+            plan = generate_fallback_simulation_plan(available_orders, existing_loads, today_str,
+                                                     load_count=load_count, orders_per_load=orders_per_load)
+            print(f"[SIMULATE-012] ✓ Fallback plan created with {len(plan.get('loads', []))} load configurations")
+
+        # Execute the plan
+        loads_to_save = []
+        loads_created = []
+        orders_used = 0
+
+        print(f"[SIMULATE-013] Building {len(plan['loads'])} loads...")
+        for idx, load_config in enumerate(plan['loads'], 1):
+            # Get orders for this load
+            order_indices = load_config['order_indices']
+            orders_in_load = [available_orders[i] for i in order_indices if i < len(available_orders)]
+
+            if len(orders_in_load) < SIMULATION_ORDERS_PER_LOAD:
+                print(f"[SIMULATE-WARN-016-{idx}] Skipping {load_config['load_number']} - fewer than {SIMULATION_ORDERS_PER_LOAD} orders")
+                continue
+
+            # Load totals and the AI-generated configuration
+            orders_config = load_config['orders_config']
+            loads_to_save.append({
+                'load_number': load_config['load_number'],
+                'truck_type': load_config['truck_type'],
+                'total_weight_lbs': sum(o.get('weight_lbs', 0) for o in orders_in_load),
+                'total_volume_cuft': sum(o.get('volume_cuft', 0) for o in orders_in_load),
+                'utilization_percent': round(random.uniform(75, 95), 2),
+                'origin': load_config['origin'],
+                'status': load_config['status'],
+                'estimated_delivery_date': load_config['estimated_delivery_date'],
+                'orders': [{'order_id': order['id'], 'sequence_number': order_idx}
+                           for order_idx, order in enumerate(orders_in_load, 1)],
+                'orders_config': {
+                    'status': orders_config['status'],
+                    'customer_expected_delivery_date': orders_config['customer_expected_delivery_date'],
+                    'delivery_window_start': orders_config['delivery_window_start'],
+                    'delivery_window_end': orders_config['delivery_window_end']
+                }
+            })
+            loads_created.append({
+                'load_number': load_config['load_number'],
+                'type': load_config['scenario'],
+                'status': load_config['status'],
+                'estimated_delivery': load_config['estimated_delivery_date']
+            })
+            orders_used += len(orders_in_load)
+
+        # Bulk insert loads, grouped order updates, bulk insert links
+        print(f"[SIMULATE-018] Saving {len(loads_to_save)} loads with {orders_used} orders...")
+        progress('saving', 0, len(loads_to_save), f"Creating {len(loads_to_save)} loads")
+        saved = client.save_simulated_loads(loads_to_save)
+        print(f"[SIMULATE-021] ✓ {len(saved['loads'])} loads created, {saved['load_orders_created']} orders linked "
+              f"in {saved['round_trips']} round trips")
+        progress('loads_saved', len(saved['loads']), len(loads_to_save),
+                 f"{len(saved['loads'])} loads saved, {saved['load_orders_created']} orders linked")
+
+        # Prepare response summary
+        print("\n[SIMULATE-022] All loads processed. Creating response summary...")
+        summary = plan.get('summary', {
+            'delivered': sum(1 for l in loads_created if l['type'] == 'delivered'),
+            'on_time': sum(1 for l in loads_created if l['type'] == 'on-time'),
+            'at_risk': sum(1 for l in loads_created if l['type'] == 'at-risk')
+        })
+
+        print("[SIMULATE-023] ✓✓✓ SUCCESS ✓✓✓")
+        print(f"[SIMULATE-024] Created {len(loads_created)} loads, assigned {orders_used} orders")
+        print(f"[SIMULATE-025] Summary: {summary}")
+        print("="*80 + "\n")
+
+        return {
+            "message": f"Successfully created simulated loads for today using {'AI agent' if use_ai else 'fallback plan'}",
+            "date": today_str,
+            "loads_created": len(loads_created),
+            "orders_assigned": orders_used,
+            "loads": loads_created,
+            "summary": summary,
+            "ai_generated": use_ai,
+            "round_trips": saved['round_trips'],
+            "debug_code": "SIMULATE-SUCCESS-025"
+        }, 201
+
+    except Exception as e:
+        import traceback
+        error_traceback = traceback.format_exc()
+        error_location = traceback.extract_tb(e.__traceback__)[-1]
+
+        print("\n[SIMULATE-ERROR] ❌❌❌ EXCEPTION OCCURRED ❌❌❌")
+        print(f"[SIMULATE-ERROR] Error Type: {type(e).__name__}")
+        print(f"[SIMULATE-ERROR] Error Message: {str(e)}")
+        print(f"[SIMULATE-ERROR] Location: {error_location.filename}:{error_location.lineno} in {error_location.name}")
+        print("[SIMULATE-ERROR] Full Traceback:")
+        print(error_traceback)
+        print("="*80 + "\n")
+
+        return {
+            "error": str(e),
+            "error_type": type(e).__name__,
+            "debug_code": "SIMULATE-ERROR-EXCEPTION",
+            "location": {
+                "file": error_location.filename.split('\\')[-1],  # Just filename
+                "line": error_location.lineno,
+                "function": error_location.name
+            },
+            "hint": "Check backend console for full stack trace. Common issues: Database connection, insufficient orders, or AI agent failure."
+        }, 500
@@ -0,0 +1,275 @@
+"""
+Stop Sequencer
+Orders multi-stop deliveries geographically using a haversine distance matrix,
+nearest-neighbour construction and 2-opt improvement
+"""
+import numpy as np
+from functools import lru_cache
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import ROAD_DISTANCE_FACTOR
+from utils.erp_data_generator import ERPDataGenerator
+
+EARTH_RADIUS_MILES = 3959
+
+
+def haversine_matrix(lats, lons):
+    """
+    Pairwise great-circle distances in miles
+
+    Args:
+        lats: Sequence of latitudes (degrees)
+        lons: Sequence of longitudes (degrees)
+
+    Returns:
+        Square NumPy array of distances
+    """
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """
+    Element-wise great-circle distances in miles (inputs broadcast like NumPy arrays)
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bearing_degrees(origin_lat, origin_lon, lats, lons):
+    """Initial compass bearing (0-360) from an origin to each point"""
+    lat1 = np.radians(origin_lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlon = np.radians(np.asarray(lons, dtype=np.float64) - origin_lon)
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return (np.degrees(np.arctan2(x, y)) + 360.0) % 360.0
+
+
+@lru_cache(maxsize=4096)
+def location_key(location):
+    """
+    Normalize a location string to a lookup key
+
+    "Toronto, ON - Toronto DC" -> "toronto", "Chicago, IL" -> "chicago"
+    """
+    if not location:
+        return ''
+    return location.split(' - ')[0].split(',')[0].strip().lower()
+
+
+def nearest_neighbour_path(matrix):
+    """Greedy open path starting at node 0 (the origin)"""
+    n = len(matrix)
+    path = [0]
+    unvisited = set(range(1, n))
+    while unvisited:
+        last = path[-1]
+        nxt = min(unvisited, key=lambda j: (matrix[last][j], j))
+        path.append(nxt)
+        unvisited.remove(nxt)
+    return path
+
+
+def two_opt(path, matrix, max_passes=50):
+    """
+    Improve an open path with a fixed start by reversing segments
+
+    The final stop is free (trucks do not return to the origin), so reversing a
+    tail segment only changes one edge.
+    """
+    path = list(path)
+    n = len(path)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                a, b = path[i - 1], path[i]
+                c = path[j]
+                before = matrix[a][b]
+                after = matrix[a][c]
+                if j + 1 < n:
+                    d = path[j + 1]
+                    before += matrix[c][d]
+                    after += matrix[b][d]
+                if after < before - 1e-9:
+                    path[i:j + 1] = reversed(path[i:j + 1])
+                    improved = True
+        if not improved:
+            break
+    return path
+
+
+class StopSequencer:
+    """
+    Resolves stops to coordinates and sequences them from an origin
+
+    Coordinates come from the facilities table when provided, falling back to
+    the ERPDataGenerator network. Distance matrices are built once per origin
+    and reused for every load leaving that origin.
+    """
+
+    def __init__(self, facilities=None):
+        self.coordinates = {}
+        for origin in ERPDataGenerator.ORIGINS:
+            self.coordinates[location_key(origin['name'])] = (origin['lat'], origin['lng'])
+        for dest in ERPDataGenerator.DESTINATIONS:
+            self.coordinates[location_key(dest['name'])] = (dest['lat'], dest['lng'])
+
+        for facility in facilities or []:
+            lat = facility.get('latitude')
+            lon = facility.get('longitude')
+            if lat is None or lon is None:
+                continue
+            for name in (facility.get('city'), facility.get('facility_name')):
+                if name:
+                    self.coordinates[location_key(name)] = (float(lat), float(lon))
+
+        # origin key -> (location key -> matrix index, distance matrix)
+        self._matrices = {}
+
+    @classmethod
+    def from_coordinates(cls, coordinates):
+        """Build a sequencer from an already-resolved key -> (lat, lon) mapping"""
+        sequencer = cls()
+        sequencer.coordinates = dict(coordinates)
+        return sequencer
+
+    def resolve(self, location):
+        """Return (lat, lon) for a location string, or None if unknown"""
+        return self.coordinates.get(location_key(location))
+
+    def sectors(self, origin, locations, sector_degrees):
+        """
+        Bearing sector index of each location as seen from the origin
+
+        Locations (or an origin) without coordinates get sector -1.
+        """
+        sectors = np.full(len(locations), -1, dtype=np.int64)
+        origin_coords = self.resolve(origin)
+        if origin_coords is None:
+            return sectors
+
+        coords = [self.resolve(location) for location in locations]
+        known = np.array([c is not None for c in coords], dtype=bool)
+        if known.any():
+            lats, lons = zip(*[c for c in coords if c is not None])
+            bearings = bearing_degrees(origin_coords[0], origin_coords[1], lats, lons)
+            sectors[known] = (bearings // sector_degrees).astype(np.int64)
+        return sectors
+
+    def prepare(self, origin, locations):
+        """
+        Build the distance matrix for an origin and all stops it may serve
+
+        Args:
+            origin: Origin location string
+            locations: Iterable of destination location strings
+
+        Returns:
+            Tuple of (key -> index dict, road-mile distance matrix)
+        """
+        origin_key = location_key(origin)
+        keys = [origin_key]
+        seen = {origin_key}
+        for location in locations:
+            key = location_key(location)
+            if key not in seen and key in self.coordinates:
+                seen.add(key)
+                keys.append(key)
+
+        index = {}
+        points = []
+        for key in keys:
+            if key in self.coordinates:
+                index[key] = len(points)
+                points.append(self.coordinates[key])
+
+        if points:
+            lats, lons = zip(*points)
+            matrix = haversine_matrix(lats, lons) * ROAD_DISTANCE_FACTOR
+        else:
+            matrix = np.zeros((0, 0))
+
+        self._matrices[origin_key] = (index, matrix)
+        return index, matrix
+
+    def _matrix_for(self, origin, locations):
+        """Reuse the origin's matrix unless it is missing a resolvable stop"""
+        cached = self._matrices.get(location_key(origin))
+        if cached:
+            index = cached[0]
+            if all(location_key(loc) in index or location_key(loc) not in self.coordinates for loc in locations):
+                return cached
+            locations = list(locations) + list(index)
+        return self.prepare(origin, locations)
+
+    def sequence(self, origin, locations):
+        """
+        Sequence unique stops from an origin
+
+        Args:
+            origin: Origin location string
+            locations: List of stop location strings (duplicates are one stop)
+
+        Returns:
+            Dictionary with 'stops' (unique locations in visiting order),
+            'legs' (miles from the previous stop), 'total_miles' and
+            'unresolved' (stops without coordinates, appended at the end)
+        """
+        unique = list(dict.fromkeys(locations))
+        index, matrix = self._matrix_for(origin, unique)
+        origin_idx = index.get(location_key(origin))
+
+        resolved = [loc for loc in unique if location_key(loc) in index and origin_idx is not None]
+        unresolved = [loc for loc in unique if loc not in resolved]
+
+        stops = []
+        legs = []
+        if resolved:
+            nodes = np.array([origin_idx] + [index[location_key(loc)] for loc in resolved])
+            # Plain nested lists are faster than array indexing inside the 2-opt loops
+            sub = matrix[nodes][:, nodes].tolist()
+            path = two_opt(nearest_neighbour_path(sub), sub)
+            for prev, node in zip(path, path[1:]):
+                stops.append(resolved[node - 1])
+                legs.append(round(sub[prev][node], 1))
+
+        stops.extend(unresolved)
+        legs.extend([None] * len(unresolved))
+
+        return {
+            'stops': stops,
+            'legs': legs,
+            'total_miles': round(sum(leg for leg in legs if leg is not None), 1),
+            'unresolved': unresolved
+        }
+
+    def leg_miles(self, origin, stops):
+        """
+        Road miles of each leg when visiting stops in the given order
+
+        Returns:
+            List with one entry per stop (None where either end is unknown)
+        """
+        index, matrix = self._matrix_for(origin, stops)
+        legs = []
+        prev = index.get(location_key(origin))
+        for stop in stops:
+            node = index.get(location_key(stop))
+            legs.append(round(float(matrix[prev, node]), 1) if prev is not None and node is not None else None)
+            if node is not None:
+                prev = node
+        return legs
+
+    def direct_miles(self, origin, location):
+        """Road miles straight from the origin to a single stop (None if unknown)"""
+        result = self.sequence(origin, [location])
+        return result['legs'][0] if result['legs'] else None
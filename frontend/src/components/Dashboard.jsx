@@ -18,14 +18,15 @@ function Dashboard() {
   const fetchDashboardData = async () => {
     try {
       setLoading(true)
-      const ordersResponse = await tmsAPI.getOrders()
-      const orders = ordersResponse.data?.data || ordersResponse.data || []
+      // KPIs are aggregated (and cached) server-side - one small response
+      const response = await tmsAPI.getDashboard()
+      const kpis = response.data || {}
       
       setStats({
-        totalOrders: orders.length,
-        activeShipments: orders.filter(o => o.status === 'Pending').length,
-        avgUtilization: 0,
-        costSavings: 0
+        totalOrders: kpis.total_orders || 0,
+        activeShipments: kpis.active_shipments || 0,
+        avgUtilization: kpis.avg_utilization || 0,
+        costSavings: Math.round(kpis.cost_savings_ytd || 0).toLocaleString()
       })
     } catch (error) {
       console.error('Error fetching dashboard:', error)
@@ -50,7 +51,7 @@ function Dashboard() {
 
         <div className="stat-card">
           <div className="stat-value">{stats.activeShipments}</div>
-          <div className="stat-label">Pending Orders</div>
+          <div className="stat-label">Active Shipments</div>
         </div>
 
         <div className="stat-card">
@@ -60,7 +61,7 @@ function Dashboard() {
 
         <div className="stat-card">
           <div className="stat-value">${stats.costSavings}</div>
-          <div className="stat-label">Cost Savings</div>
+          <div className="stat-label">Cost Savings YTD</div>
         </div>
       </div>
 